@@ -1,20 +1,34 @@
 """Subway Shame — Flask API server (read-only).
 
 All MTA polling and state accumulation happens in the ingest worker.
-This server reads from Postgres only. No globals, no file I/O, no MTA calls.
+This server makes no MTA calls and writes no state. It reads Postgres and
+the files ingest publishes, by default under /dev/shm: the mmap'd status
+snapshot and the share card. It also serves the frontend build from its
+precompressed static index. Module-level, per-process caches sit in front of
+these reads: the status document and its encoded bodies, /api/history and
+/api/day responses, and the station index.
 """
 
 import logging
 import os
 import time
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, redirect, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.wsgi import wrap_file
 from flask_cors import CORS
 
 import db
-from mta import ALL_LINES
+import encoding
+from delta import DeltaLog
+from og_image import OgImageReader
+from response_cache import ResponseCache
+from snapshot import SnapshotReader, variant_name
+from static_files import StaticIndex, choose
+from stations import StationLookup
+from status import build_status_document
 
 # ---------------------------------------------------------------------------
 # Config
@@ -29,8 +43,50 @@ ET = ZoneInfo("America/New_York")
 # In-process response cache (safe: it's read-only, just avoids repeated DB reads)
 _cache: dict = {}
 _cache_time: float = 0
+_deltas = DeltaLog()
+_snapshots = SnapshotReader()
+_og_image = OgImageReader()
+# (document timestamp, {mimetype: bytes}) for the current build only. A new
+# build swaps in a new pair rather than clearing the dict, so request threads
+# never see it change size under them.
+_encoded: tuple[str | None, dict[str, bytes]] = (None, {})
+_stations: StationLookup | None = None
+_stations_time: float = 0
+# Encoded /api/history bodies keyed by (hours, resolution, generation, mimetype)
+_history_cache = ResponseCache(maxsize=32)
+# Sealed /api/day archives, (body, etag) by (date, mimetype); they never change
+_day_cache = ResponseCache(maxsize=64)
+
+# Projection vocabulary for ?fields= on /api/status and /api/line/<id>
+STATUS_FIELDS = (
+    "generation", "timestamp", "date", "winner", "podium", "lines", "timeseries",
+)
+LINE_FIELDS = (
+    "id", "score", "daily_score", "status", "alerts", "peak_alerts",
+    "breakdown", "live_breakdown", "by_direction", "live_by_direction",
+    "trip_count", "metrics",
+)
 
-# Whether to start the ingest worker in-process (for single-dyno deploys)
+# /api/trends range -> (rollup resolution, window)
+TREND_RANGES = {
+    "24h": ("15m", timedelta(hours=24)),
+    "7d": ("1h", timedelta(days=7)),
+    "30d": ("1h", timedelta(days=30)),
+    "365d": ("1d", timedelta(days=365)),
+}
+
+# /api/history: ?hours= is rounded up to one of these windows, so the response
+# cache holds a bounded set of keys; ?resolution= picks the point spacing.
+# "raw" keeps every ingest cycle, the others are db.ROLLUP_RESOLUTIONS.
+HISTORY_WINDOWS = (6, 12, 24, 48, 72, 24 * 7, 24 * 14, 24 * 30)
+HISTORY_MAX_HOURS = HISTORY_WINDOWS[-1]
+HISTORY_RESOLUTIONS = ("raw", "15m", "1h")
+# Default resolution by window: raw points up to 3 days, then coarser
+HISTORY_AUTO_RESOLUTION = ((72, "raw"), (24 * 7, "15m"), (HISTORY_MAX_HOURS, "1h"))
+
+# Whether to start the ingest worker in-process (for single-dyno deploys).
+# RUN_INGEST=process is handled by gunicorn.conf.py instead: the master runs
+# ingest as a supervised child process, so workers never host it.
 RUN_INGEST = os.environ.get("RUN_INGEST", "").lower() in ("1", "true", "yes")
 
 
@@ -38,97 +94,131 @@ RUN_INGEST = os.environ.get("RUN_INGEST", "").lower() in ("1", "true", "yes")
 # API response builder (read-only)
 # ---------------------------------------------------------------------------
 
-def _empty_line_daily():
-    return {
-        "daily_score": 0,
-        "breakdown": {},
-        "by_direction": {
-            "uptown": {"score": 0, "breakdown": {}},
-            "downtown": {"score": 0, "breakdown": {}},
-        },
-        "peak_alerts": [],
-    }
-
-
 def build_status() -> dict:
-    """Build the full API response by reading from Postgres.
+    """Return the full API response.
 
-    No MTA calls, no global state mutation.
+    Served from the snapshot ingest publishes each cycle when one is fresh;
+    otherwise rebuilt from Postgres at most once per CACHE_TTL. No MTA calls.
     """
     global _cache, _cache_time
 
+    snap = _snapshots.current()
+    if snap is not None:
+        if not _cache or _cache.get("generation") != snap.generation:
+            result = snap.document()
+            _deltas.record(_cache, result)
+            _cache = result
+            _cache_time = time.time()
+        return _cache
+
     now = time.time()
     if _cache and (now - _cache_time) < CACHE_TTL:
         return _cache
 
-    et_now = datetime.now(ET)
-    today = et_now.strftime("%Y-%m-%d")
-
-    # Read latest live snapshot
-    live_rows = db.read_live_snapshot()
-    live_by_line = {row["line_id"]: row for row in live_rows}
-
-    # Read daily accumulated scores
-    daily_data = db.read_daily_scores(today)
-
-    # Read timeseries
-    timeseries = db.read_timeseries(today)
-
-    lines = []
-    for line_id in ALL_LINES:
-        live = live_by_line.get(line_id, {})
-        dd = daily_data.get(line_id, {})
-
-        lines.append({
-            "id": line_id,
-            "score": live.get("score", 0),
-            "daily_score": dd.get("daily_score", 0),
-            "status": live.get("status", "Good Service"),
-            "alerts": live.get("alerts", []),
-            "peak_alerts": dd.get("peak_alerts", []),
-            "breakdown": dd.get("breakdown", {}),
-            "live_breakdown": live.get("breakdown", {}),
-            "by_direction": dd.get("by_direction", {
-                "uptown": {"score": 0, "breakdown": {}},
-                "downtown": {"score": 0, "breakdown": {}},
-            }),
-            "live_by_direction": live.get("by_direction", {
-                "uptown": {"score": 0, "breakdown": {}},
-                "downtown": {"score": 0, "breakdown": {}},
-            }),
-            "trip_count": live.get("trip_count", 0),
-        })
-
-    lines.sort(key=lambda l: (-l["daily_score"], -l["score"], l["id"]))
-
-    # Build podium
-    scored = [l for l in lines if l["daily_score"] > 0]
-    podium = []
-    place = 0
-    prev_score = None
-    for l in scored:
-        if l["daily_score"] != prev_score:
-            place = len(podium) + 1
-            prev_score = l["daily_score"]
-        if place > 3:
-            break
-        podium.append(l)
-    winner = lines[0] if lines and lines[0]["daily_score"] > 0 else None
-
-    result = {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "date": et_now.strftime("%A, %B %-d"),
-        "winner": winner,
-        "podium": podium,
-        "lines": lines,
-        "timeseries": timeseries,
-    }
+    result = build_status_document()
 
+    _deltas.record(_cache, result)
     _cache = result
     _cache_time = time.time()
     return result
 
 
+def _split_param(name: str) -> list[str] | None:
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    return [p.strip() for p in raw.split(",") if p.strip()]
+
+
+def parse_fields() -> tuple[set | None, set | None]:
+    """Parse ?fields= into (top-level keys, line keys); None means "all".
+
+    Raises ValueError naming the first unknown field.
+    """
+    fields = _split_param("fields")
+    if not fields:
+        return None, None
+    top, per_line = set(), set()
+    for f in fields:
+        if f in STATUS_FIELDS:
+            top.add(f)
+        elif f in LINE_FIELDS:
+            per_line.add(f)
+        else:
+            raise ValueError(f"Unknown field: {f}")
+    return top or None, ({"id"} | per_line) if per_line else None
+
+
+def _project_line(line: dict | None, keys: set | None) -> dict | None:
+    if line is None or keys is None:
+        return line
+    return {k: v for k, v in line.items() if k in keys}
+
+
+def project_status(
+    status: dict, top: set | None, per_line: set | None, lines: set | None
+) -> dict:
+    """Cut the cached status document down to the requested slice.
+
+    Builds new outer containers only; line dicts are shared with the cache
+    unless they need trimming, so this never copies the full payload.
+    """
+    if top is None and per_line is None and lines is None:
+        return status
+    out = {}
+    for key in STATUS_FIELDS:
+        if top is not None and key not in top and key not in ("generation", "timestamp"):
+            continue
+        value = status[key]
+        if key == "lines":
+            value = [
+                _project_line(l, per_line) for l in value
+                if lines is None or l["id"] in lines
+            ]
+        elif key == "podium":
+            value = [_project_line(l, per_line) for l in value]
+        elif key == "winner":
+            value = _project_line(value, per_line)
+        out[key] = value
+    return out
+
+
+def project_patch(
+    patch: dict, top: set | None, per_line: set | None, lines: set | None
+) -> dict:
+    """The same slice as project_status, applied to a ?since= patch (see delta.py)."""
+    if top is None and per_line is None and lines is None:
+        return patch
+    out = {}
+    for key, value in patch.items():
+        section = "lines" if key == "order" else key  # the ranking is part of "lines"
+        if top is not None and section in STATUS_FIELDS and section not in top:
+            if section not in ("generation", "timestamp"):
+                continue
+        if key == "lines":
+            value = {
+                line_id: _project_line(l, per_line) for line_id, l in value.items()
+                if lines is None or line_id in lines
+            }
+        elif key == "order" and lines is not None:
+            value = [line_id for line_id in value if line_id in lines]
+        out[key] = value
+    return out
+
+
+def station_lookup() -> StationLookup:
+    """Return the station index from the last ingest cycle, cached like status."""
+    global _stations, _stations_time
+
+    now = time.time()
+    if _stations is not None and (now - _stations_time) < CACHE_TTL:
+        return _stations
+
+    _stations = StationLookup(db.read_station_index())
+    _stations_time = time.time()
+    return _stations
+
+
 # ---------------------------------------------------------------------------
 # Flask app
 # ---------------------------------------------------------------------------
@@ -137,27 +227,266 @@ _static = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
 if not os.path.isdir(_static):
     _static = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend", "dist")
 
-app = Flask(
-    __name__,
-    static_folder=_static,
-    static_url_path="",
-)
+# Static files are served by serve_frontend from StaticIndex, not Flask's
+# static view, so the SPA fallback and caching live in one place.
+app = Flask(__name__, static_folder=None)
 CORS(app)
 
 
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify through encoding.dumps (orjson when installed, RawJSON-aware)."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return encoding.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return encoding.loads(s)
+
+
+app.json = FastJSONProvider(app)
+_static_index = StaticIndex(_static)
+
+
+def respond(obj, cache_key: str | None = None) -> Response:
+    """Encode obj as JSON or MessagePack per the request's Accept header.
+
+    With a cache_key (the status document's timestamp) the encoded bytes are
+    kept until the next rebuild, so each build is serialised once per format.
+    """
+    global _encoded
+    mimetype = encoding.negotiate(request.accept_mimetypes, request.args.get("format"))
+    build, bodies = _encoded
+    body = bodies.get(mimetype) if cache_key and build == cache_key else None
+    if body is None:
+        body = encoding.encode(obj, mimetype)
+        if cache_key:
+            if build == cache_key:
+                bodies[mimetype] = body
+            else:
+                _encoded = (cache_key, {mimetype: body})
+    resp = Response(body, mimetype=mimetype)
+    resp.vary.add("Accept")
+    return resp
+
+
+def serve_snapshot(snap) -> Response:
+    """Send a pre-encoded variant straight from the shared snapshot mapping.
+
+    No DB read, no decode, no encode; the only work is the copy into the
+    response (gunicorn's write path takes bytes, not buffers).
+    """
+    mimetype = encoding.negotiate(request.accept_mimetypes, request.args.get("format"))
+    gzipped = request.accept_encodings["gzip"] > 0
+    body = snap.body(variant_name(mimetype, gzipped))
+    if body is None:
+        gzipped = False
+        body = snap.body(variant_name(mimetype, False))
+    resp = Response(bytes(body), mimetype=mimetype)
+    if gzipped:
+        resp.headers["Content-Encoding"] = "gzip"
+    resp.vary.update(("Accept", "Accept-Encoding"))
+    return resp
+
+
 @app.route("/api/status")
 def api_status():
-    return jsonify(build_status())
+    """Full status document; ?fields= and ?lines= select a slice of it.
+
+    ?since=<generation> returns only what changed after that generation, or
+    the full document (with "full": true) when the client is too far behind;
+    either way cut to the same slice.
+    """
+    try:
+        top, per_line = parse_fields()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    lines = _split_param("lines")
+    lines = {l.upper() for l in lines} if lines else None
+    status = build_status()
+
+    since = request.args.get("since")
+    if since is not None:
+        try:
+            patch = _deltas.since(int(since), status)
+        except ValueError:
+            return jsonify({"error": "since must be an integer generation"}), 400
+        if patch is not None:
+            return respond(project_patch(patch, top, per_line, lines))
+        return respond({**project_status(status, top, per_line, lines), "full": True})
+
+    projected = project_status(status, top, per_line, lines)
+    if projected is status:
+        snap = _snapshots.current()
+        if snap is not None and snap.generation == status["generation"]:
+            return serve_snapshot(snap)
+    return respond(projected, status["timestamp"] if projected is status else None)
+
+
+@app.route("/api/line/<line_id>")
+def api_line(line_id):
+    """One line's entry from the status document, plus its current rank."""
+    try:
+        _, per_line = parse_fields()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    line_id = line_id.upper()
+    status = build_status()
+    for rank, line in enumerate(status["lines"], start=1):
+        if line["id"] == line_id:
+            return jsonify({
+                "timestamp": status["timestamp"],
+                "rank": rank,
+                "line": _project_line(line, per_line),
+            })
+    return jsonify({"error": "Unknown line", "line_id": line_id}), 404
+
+
+def current_generation() -> int:
+    """The latest ingest generation: from the shared snapshot, else Postgres."""
+    snap = _snapshots.current()
+    if snap is not None:
+        return snap.generation
+    return db.read_generation()
 
 
 @app.route("/api/history")
 def api_history():
-    """Return last N hours of per-line score snapshots + record badges."""
+    """Return last N hours of per-line score snapshots + record badges.
+
+    ?hours= is rounded up to the next of HISTORY_WINDOWS (at most
+    HISTORY_MAX_HOURS). Responses are cached per ingest generation, and
+    concurrent identical requests share one read.
+    """
     try:
         hours = int(request.args.get("hours", 72))
     except (ValueError, TypeError):
         hours = 72
-    return jsonify(db.read_history(hours))
+    hours = next((w for w in HISTORY_WINDOWS if hours <= w), HISTORY_MAX_HOURS)
+    resolution = request.args.get("resolution") or next(
+        res for limit, res in HISTORY_AUTO_RESOLUTION if hours <= limit
+    )
+    if resolution not in HISTORY_RESOLUTIONS:
+        return jsonify({
+            "error": f"resolution must be one of {', '.join(HISTORY_RESOLUTIONS)}"
+        }), 400
+    mimetype = encoding.negotiate(request.accept_mimetypes, request.args.get("format"))
+
+    def compute() -> bytes:
+        history = db.read_history(hours, None if resolution == "raw" else resolution)
+        return encoding.encode({"hours": hours, "resolution": resolution, **history}, mimetype)
+
+    key = (hours, resolution, current_generation(), mimetype)
+    resp = Response(_history_cache.get(key, compute), mimetype=mimetype)
+    resp.vary.add("Accept")
+    return resp
+
+
+@app.route("/api/station/<stop_id>")
+def api_station(stop_id):
+    """Active alerts and serving lines for one station (platform ids collapse)."""
+    station = station_lookup().get(stop_id)
+    if station is None:
+        return jsonify({"error": "Unknown station", "stop_id": stop_id}), 404
+    return jsonify(station)
+
+
+@app.route("/api/stations")
+def api_stations():
+    """Search stations by stop id prefix or name prefix (?q=...)."""
+    q = request.args.get("q", "").strip()
+    if not q:
+        return jsonify({"error": "Missing q parameter"}), 400
+    try:
+        limit = min(int(request.args.get("limit", 20)), 100)
+    except (ValueError, TypeError):
+        limit = 20
+    return jsonify({"results": station_lookup().search(q, limit)})
+
+
+@app.route("/api/trends")
+def api_trends():
+    """Per-line max/mean/sum series from the rollup matching ?range=."""
+    rng = request.args.get("range", "7d")
+    if rng not in TREND_RANGES:
+        return jsonify({"error": f"range must be one of {', '.join(TREND_RANGES)}"}), 400
+    resolution, window = TREND_RANGES[rng]
+    since = db.rollup_buckets(datetime.now(ET) - window)[resolution]
+    return respond({
+        "range": rng,
+        "resolution": resolution,
+        "lines": db.read_rollups(resolution, since),
+    })
+
+
+@app.route("/api/leaderboard")
+def api_leaderboard():
+    """Hall of Shame for ?period=week|month|all (optional ?key=2026-W02 / 2026-01).
+
+    Closed periods never change again, so they are served as immutable.
+    """
+    period = request.args.get("period", "week")
+    if period not in db.LEADERBOARD_PERIODS:
+        return jsonify({"error": f"period must be one of {', '.join(db.LEADERBOARD_PERIODS)}"}), 400
+    key = request.args.get("key") or db.period_keys(datetime.now(ET).strftime("%Y-%m-%d"))[period]
+    board = db.read_leaderboard(period, key)
+    resp = respond({"period": period, "key": key, **board})
+    if board["closed"]:
+        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resp
+
+
+@app.route("/api/day/<day>")
+def api_day(day):
+    """A finished ET day's sealed archive: final ranking, podium, timeseries.
+
+    Archives are written once at rollover, so they are served as immutable
+    with a content-hash ETag and never read from the live tables.
+    """
+    try:
+        datetime.strptime(day, "%Y-%m-%d")
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+    mimetype = encoding.negotiate(request.accept_mimetypes, request.args.get("format"))
+
+    def load() -> tuple[bytes, str]:
+        archive = db.read_day_archive(day)
+        if archive is None:
+            raise LookupError(day)  # not cached: it may be sealed later
+        body, etag = archive
+        if mimetype != encoding.JSON:
+            body = encoding.encode(encoding.loads(body), mimetype)
+            etag = f"{etag}-{mimetype.rsplit('/', 1)[-1]}"
+        return body, etag
+
+    try:
+        body, etag = _day_cache.get((day, mimetype), load)
+    except LookupError:
+        return jsonify({"error": "No archive for date", "date": day}), 404
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype=mimetype)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    resp.vary.add("Accept")
+    return resp
+
+
+@app.route("/api/og.png")
+def api_og_image():
+    """The share card ingest last rendered; the static og.png until there is one."""
+    image = _og_image.current()
+    if image is None:
+        return redirect("/og.png")
+    png, etag = image
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(png, mimetype="image/png")
+    resp.set_etag(etag)
+    # Unfurlers revalidate; a repeat costs a stat() and a 304
+    resp.headers["Cache-Control"] = "public, no-cache"
+    return resp
 
 
 @app.route("/api/health")
@@ -176,16 +505,36 @@ def api_health():
         "db": db.db_available(),
         "last_ingest_age_seconds": int(age_seconds) if age_seconds is not None else None,
         "ingest_stale": stale,
+        "history_cache": _history_cache.stats(),
     })
 
 
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve_frontend(path):
-    try:
-        return send_from_directory(app.static_folder, path)
-    except Exception:
-        return send_from_directory(app.static_folder, "index.html")
+    """Built frontend from the startup index; unknown paths get index.html."""
+    asset = _static_index.lookup(path)
+    if asset is None:
+        return jsonify({"error": "Not found"}), 404
+    content_encoding, variant = choose(
+        asset, lambda name: request.accept_encodings[name] > 0
+    )
+    if request.if_none_match.contains_weak(variant.etag.strip('"')):
+        resp = Response(status=304)
+    elif variant.data is not None:
+        resp = Response(variant.data, content_type=asset.content_type)
+    else:
+        f = open(variant.path, "rb")
+        resp = Response(wrap_file(request.environ, f), content_type=asset.content_type,
+                        direct_passthrough=True)
+        resp.content_length = variant.size
+    resp.headers["ETag"] = variant.etag
+    resp.headers["Cache-Control"] = asset.cache_control
+    if content_encoding:
+        resp.headers["Content-Encoding"] = content_encoding
+    if asset.encoded:
+        resp.vary.add("Accept-Encoding")
+    return resp
 
 
 # ---------------------------------------------------------------------------
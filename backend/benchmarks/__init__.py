@@ -0,0 +1,9 @@
+"""Benchmarks for the backend hot paths.
+
+Run from `backend/` so the app modules import the same way gunicorn sees them:
+
+    python -m benchmarks.bench_headways
+
+Each module prints a small table and exits non-zero if a budget is blown.
+Not shipped in the Docker image (see .dockerignore).
+"""
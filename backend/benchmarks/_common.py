@@ -0,0 +1,168 @@
+"""Shared helpers: timing and synthetic GTFS-realtime feeds."""
+
+import random
+import statistics
+import time
+
+from google.transit import gtfs_realtime_pb2
+
+from mta import ALL_LINES
+
+
+def timeit(fn, repeat: int = 20) -> dict:
+    """Call fn `repeat` times; return best/median wall time in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"best_ms": min(samples), "median_ms": statistics.median(samples)}
+
+
+def report(name: str, stats: dict, budget_ms: float | None = None) -> bool:
+    """Print one result row; return False if it is over budget."""
+    ok = budget_ms is None or stats["median_ms"] <= budget_ms
+    budget = f"  (budget {budget_ms:g}ms)" if budget_ms is not None else ""
+    flag = "" if ok else "  OVER BUDGET"
+    print(
+        f"{name:<40} best {stats['best_ms']:8.2f}ms  "
+        f"median {stats['median_ms']:8.2f}ms{budget}{flag}"
+    )
+    return ok
+
+
+def synthetic_feed(
+    trips_per_line: int = 120,
+    stops_per_trip: int = 20,
+    now: int | None = None,
+    seed: int = 7,
+    vehicles: bool = False,
+) -> gtfs_realtime_pb2.FeedMessage:
+    """Build a FeedMessage shaped like the NYCT trip feeds.
+
+    Trips run both directions on a shared set of stops with jittered
+    headways, so the analysis sees realistic gaps and bunching. With
+    `vehicles`, each trip also gets a vehicle position entity, as in the
+    live feeds.
+    """
+    rng = random.Random(seed)
+    now = int(now or time.time())
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "1.0"
+    feed.header.timestamp = now
+    for line in ALL_LINES:
+        route_id = "GS" if line == "S" else line
+        for n in range(trips_per_line):
+            direction = "N" if n % 2 == 0 else "S"
+            trip_id = f"{n:06d}_{route_id}..{direction}{rng.randint(1, 99):02d}R"
+            entity = feed.entity.add()
+            entity.id = f"{line}-{n}"
+            tu = entity.trip_update
+            tu.trip.trip_id = trip_id
+            tu.trip.route_id = route_id
+            t = now + (n // 2) * rng.randint(60, 900) - 1800
+            for s in range(stops_per_trip):
+                stu = tu.stop_time_update.add()
+                stu.stop_id = f"{line}{s:02d}{direction}"
+                stu.arrival.time = t
+                stu.departure.time = t + 30
+                t += rng.randint(90, 150)
+            if vehicles:
+                vehicle = feed.entity.add()
+                vehicle.id = f"{line}-{n}-vehicle"
+                vehicle.vehicle.trip.CopyFrom(tu.trip)
+                vehicle.vehicle.current_stop_sequence = rng.randint(1, stops_per_trip)
+                vehicle.vehicle.stop_id = tu.stop_time_update[0].stop_id
+                vehicle.vehicle.timestamp = now
+    return feed
+
+
+_ALERT_TEXTS = [
+    ("Delays", 30, "[F] trains are running with delays in both directions while we address a signal problem"),
+    ("No Service", 50, "No [G] trains between Court Sq and Bedford-Nostrand Avs"),
+    ("Skip Stop", 15, "Downtown [4] trains skip 33 St, 28 St and 23 St"),
+    ("Slow Speeds", 20, "Uptown [A] trains are running at reduced speeds"),
+]
+
+
+def synthetic_alerts(
+    routes: list[str] | None = None, alerts: int = 60, seed: int = 7
+) -> gtfs_realtime_pb2.FeedMessage:
+    """An alerts FeedMessage: each alert names one or two routes and a stop."""
+    rng = random.Random(seed)
+    routes = routes or ALL_LINES
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "1.0"
+    for n in range(alerts):
+        entity = feed.entity.add()
+        entity.id = f"alert-{n}"
+        _, _, text = rng.choice(_ALERT_TEXTS)
+        translation = entity.alert.header_text.translation.add()
+        translation.text = f"{text} ({n % 7})"
+        translation.language = "en"
+        for route in {rng.choice(routes), rng.choice(routes)}:
+            entity.alert.informed_entity.add().route_id = route
+        entity.alert.informed_entity.add().stop_id = f"{rng.randint(100, 999)}N"
+    return feed
+
+
+def synthetic_status(seed: int = 7) -> dict:
+    """A bad-service-day /api/status document: every line scored, full day of buckets."""
+    rng = random.Random(seed)
+
+    def by_dir():
+        return {
+            d: {"score": rng.randint(0, 400), "breakdown": {"Delays": rng.randint(0, 300)}}
+            for d in ("uptown", "downtown")
+        }
+
+    lines = []
+    for line in ALL_LINES:
+        alerts = [
+            {"text": t, "category": c, "score": s, "direction": "both"}
+            for c, s, t in rng.sample(_ALERT_TEXTS, rng.randint(0, 3))
+        ]
+        lines.append({
+            "id": line,
+            "score": sum(a["score"] for a in alerts),
+            "daily_score": rng.randint(0, 3000),
+            "status": "Delays" if alerts else "Good Service",
+            "alerts": alerts,
+            "peak_alerts": alerts,
+            "breakdown": {"Delays": rng.randint(0, 2000), "Skip Stop": rng.randint(0, 500)},
+            "live_breakdown": {a["category"]: a["score"] for a in alerts},
+            "by_direction": by_dir(),
+            "live_by_direction": by_dir(),
+            "trip_count": rng.randint(10, 60),
+        })
+    lines.sort(key=lambda l: -l["daily_score"])
+    timeseries = [
+        {
+            "time": f"{h:02d}:{m:02d}",
+            "scores": {l: rng.randint(1, 120) for l in rng.sample(ALL_LINES, 8)},
+        }
+        for h in range(24) for m in (0, 15, 30, 45)
+    ]
+    return {
+        "generation": 1000,
+        "timestamp": "2026-01-06T23:59:00+00:00",
+        "date": "Tuesday, January 6",
+        "winner": lines[0],
+        "podium": lines[:3],
+        "lines": lines,
+        "timeseries": timeseries,
+    }
+
+
+def synthetic_history(hours: int = 72, seed: int = 7) -> dict:
+    """A read_history()-shaped payload: one point per line per minute."""
+    rng = random.Random(seed)
+    history = {
+        line: [
+            {"t": f"2026-01-0{1 + m // 1440}T{m // 60 % 24:02d}:{m % 60:02d}:00Z",
+             "score": rng.choice((0, 0, 0, 15, 30, 50))}
+            for m in range(hours * 60)
+        ]
+        for line in ALL_LINES
+    }
+    return {"history": history, "records": {}}
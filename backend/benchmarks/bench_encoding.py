@@ -0,0 +1,33 @@
+"""Response encodings: JSON vs MessagePack size and client decode time.
+
+Decode time is what downstream pollers pay on every request; encode time is
+paid once per build thanks to the response cache in app.respond.
+"""
+
+import json
+import sys
+
+import msgpack
+
+from benchmarks._common import report, synthetic_history, synthetic_status, timeit
+
+
+def compare(name: str, doc: dict):
+    as_json = json.dumps(doc, separators=(",", ":"), sort_keys=True).encode()
+    as_msgpack = msgpack.packb(doc, use_bin_type=True)
+    print(f"\n{name}: JSON {len(as_json):,} B, MessagePack {len(as_msgpack):,} B "
+          f"({len(as_msgpack) / len(as_json):.0%})")
+    report("  json.loads", timeit(lambda: json.loads(as_json)))
+    report("  msgpack.unpackb", timeit(lambda: msgpack.unpackb(as_msgpack)))
+    report("  json.dumps", timeit(lambda: json.dumps(doc, separators=(",", ":"), sort_keys=True)))
+    report("  msgpack.packb", timeit(lambda: msgpack.packb(doc, use_bin_type=True)))
+
+
+def main() -> int:
+    compare("/api/status", synthetic_status())
+    compare("/api/history?hours=72", synthetic_history())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
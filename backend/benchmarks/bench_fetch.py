@@ -0,0 +1,61 @@
+"""Fetch scheduling: cycle time as the feed registry grows.
+
+No network: each fetch sleeps for a simulated latency. Compares the subway
+registry (10 feeds) with 10x that spread over a few hosts, including a slice
+of feeds slower than the cycle budget, and a registry listed host by host,
+where one host's feeds come first and must not hold up the others.
+"""
+
+import random
+import sys
+import time
+
+from benchmarks._common import report, timeit
+from feeds import Feed
+from mta import FeedScheduler
+
+LATENCY = (0.05, 0.4)  # seconds, uniform
+SLOW_LATENCY = 3.0     # a feed that has stalled
+BUDGET = 1.5
+
+
+class SimulatedScheduler(FeedScheduler):
+    def __init__(self, slow: set[str], **kwargs):
+        super().__init__(**kwargs)
+        self.slow = slow
+        self.rng = random.Random(7)
+
+    def fetch(self, feed: Feed) -> bytes:
+        time.sleep(SLOW_LATENCY if feed.name in self.slow else self.rng.uniform(*LATENCY))
+        return b""
+
+
+def registry(n: int, hosts: int, interval: int = 0, grouped: bool = False) -> list[Feed]:
+    """n feeds over `hosts` origins: interleaved, or `grouped` host by host."""
+    return [
+        Feed(f"feed-{i}", "sim", "trips",
+             f"https://host{i * hosts // n if grouped else i % hosts}.example/feed{i}", {},
+             accept_unmapped=True, interval=interval if i >= n // 2 else 0)
+        for i in range(n)
+    ]
+
+
+def main() -> int:
+    parse = lambda feed, data: data
+    cases = [
+        ("10 feeds, 1 host", registry(10, 1), set()),
+        ("100 feeds, 4 hosts", registry(100, 4), set()),
+        ("100 feeds, 4 hosts, half on a 60s interval", registry(100, 4, interval=60), set()),
+        ("100 feeds, 4 hosts, 3 stalled", registry(100, 4), {"feed-3", "feed-7", "feed-11"}),
+        ("100 feeds, 4 hosts, listed host by host", registry(100, 4, grouped=True), set()),
+    ]
+    print(f"latency {LATENCY[0]}-{LATENCY[1]}s, budget {BUDGET}s\n")
+    for name, feeds, slow in cases:
+        sched = SimulatedScheduler(slow, concurrency=32, per_host=8, budget=BUDGET)
+        sched.run(feeds, parse)  # warm: fills last results for interval feeds
+        report(name, timeit(lambda: sched.run(feeds, parse), 3))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
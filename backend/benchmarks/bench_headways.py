@@ -0,0 +1,56 @@
+"""Headway analysis: the whole trip stage for a full system cycle.
+
+A full cycle is about 3k trips and 60k stop times, decoded into the trimmed
+message ingest uses. Budgets, per stage:
+
+  - collecting stop_time_updates: COLLECT_BUDGET_MS. This is a Python loop
+    over protobuf rows, about 1µs of field access per stop time, and is the
+    bulk of the stage (about 60ms here). It runs on the feed pool, one feed
+    at a time as each arrives.
+  - building the NumPy batch: BATCH_BUDGET_MS.
+  - headways.analyze: ANALYZE_BUDGET_MS, the single-digit-millisecond
+    vectorised part.
+"""
+
+import sys
+import time
+from datetime import datetime
+
+import headways
+import trip_feed
+from benchmarks._common import report, synthetic_feed, timeit
+import feeds
+from mta import _collect_trips, stop_times_batch
+
+COLLECT_BUDGET_MS = 100
+BATCH_BUDGET_MS = 10
+ANALYZE_BUDGET_MS = 10
+
+SOURCE = feeds.DEFAULT_FEEDS[1]  # any subway trip feed: same route map
+
+
+def main() -> int:
+    now = time.time()
+    feed = trip_feed.parse(synthetic_feed(now=int(now)).SerializeToString(), stop_times=True)
+    collected = _collect_trips(feed, SOURCE)
+    st = stop_times_batch(*collected[1:])
+    scheduled = headways.scheduled_headways(datetime.now())
+    print(f"{len(feed.entity)} trips, {len(st)} stop times\n")
+
+    stages = [
+        ("collect stop_time_updates", lambda: _collect_trips(feed, SOURCE), COLLECT_BUDGET_MS),
+        ("build NumPy batch", lambda: stop_times_batch(*collected[1:]), BATCH_BUDGET_MS),
+        ("headways.analyze", lambda: headways.analyze(st, now, scheduled), ANALYZE_BUDGET_MS),
+    ]
+    ok = True
+    total = 0.0
+    for name, fn, budget in stages:
+        stats = timeit(fn, 10)
+        total += stats["median_ms"]
+        ok &= report(name, stats, budget)
+    print(f"{'whole stage (sum of medians)':<40} {total:8.2f}ms")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
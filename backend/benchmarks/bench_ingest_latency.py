@@ -0,0 +1,119 @@
+"""API latency while an ingest cycle runs, per RUN_INGEST mode.
+
+One client thread requests /api/status?lines=... (projection and JSON
+encoding on every request) for WINDOW_SECONDS, three times:
+
+  - idle: no ingest.
+  - thread (RUN_INGEST=1): ingest's CPU work on a thread in the web process.
+  - process (RUN_INGEST=process): the same work in a separate process.
+
+The ingest work is the CPU-bound part of a cycle, back to back for the
+whole window: parsing a full system of trip feeds, collecting stop times,
+headways.analyze. A real cycle spends most of its time waiting on the
+network, so this is the worst case. Fails if p99 in process mode is more
+than P99_SLACK_MS over idle. On a single CPU the ingest process still
+competes for the core, so expect some slack to be used there.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["RUN_INGEST"] = ""  # importing app must not start a worker
+import app  # noqa: E402
+from benchmarks._common import synthetic_feed, synthetic_status  # noqa: E402
+from snapshot import SnapshotReader  # noqa: E402
+
+WINDOW_SECONDS = 3.0
+P99_SLACK_MS = 10
+REQUEST = "/api/status?lines=A,C,E,F,L"
+
+
+def ingest_load(seconds: float):
+    """Run ingest's CPU-bound stages back to back for `seconds`."""
+    from datetime import datetime
+
+    import feeds
+    import headways
+    import trip_feed
+    from mta import _collect_trips, stop_times_batch
+
+    now = time.time()
+    data = synthetic_feed(now=int(now)).SerializeToString()
+    scheduled = headways.scheduled_headways(datetime.now())
+    source = feeds.DEFAULT_FEEDS[1]
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        collected = _collect_trips(trip_feed.parse(data, stop_times=True), source)
+        headways.analyze(stop_times_batch(*collected[1:]), now, scheduled)
+
+
+def _requests(seconds: float) -> list[float]:
+    client = app.app.test_client()
+    samples = []
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        t0 = time.perf_counter()
+        client.get(REQUEST)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def _thread_mode() -> list[float]:
+    ingest_load(0.2)  # imports and warm-up outside the window
+    t = threading.Thread(target=ingest_load, args=(WINDOW_SECONDS + 1,), daemon=True)
+    t.start()
+    samples = _requests(WINDOW_SECONDS)
+    t.join()
+    return samples
+
+
+def _process_mode() -> list[float]:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_ingest_latency", "--load", str(WINDOW_SECONDS + 1)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    proc.stdout.readline()  # "ready": imports done, load starting
+    samples = _requests(WINDOW_SECONDS)
+    proc.wait()
+    return samples
+
+
+def _report(name: str, samples: list[float], budget_ms: float | None = None) -> bool:
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99)]
+    ok = budget_ms is None or p99 <= budget_ms
+    budget = f"  (budget {budget_ms:.2f}ms)" if budget_ms is not None else ""
+    print(
+        f"{name:<12} {len(samples):6d} requests  median {statistics.median(samples):7.2f}ms  "
+        f"p99 {p99:7.2f}ms  max {samples[-1]:7.2f}ms{budget}{'' if ok else '  OVER BUDGET'}"
+    )
+    return ok
+
+
+def main() -> int:
+    app._snapshots = SnapshotReader(os.path.join(tempfile.gettempdir(), "no-snapshot"))
+    app._cache, app._cache_time = synthetic_status(), time.time()  # served, never rebuilt
+    app.CACHE_TTL = float("inf")
+    print(f"{os.cpu_count()} CPU(s), {WINDOW_SECONDS:g}s per mode, GET {REQUEST}\n")
+
+    _requests(0.2)  # warm-up
+    idle = _requests(WINDOW_SECONDS)
+    _report("idle", idle)
+    _report("thread", _thread_mode())
+    idle_p99 = sorted(idle)[int(len(idle) * 0.99)]
+    ok = _report("process", _process_mode(), idle_p99 + P99_SLACK_MS)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--load"]:
+        ingest_load(0.2)
+        print("ready", flush=True)
+        ingest_load(float(sys.argv[2]))
+        sys.exit(0)
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Per-cycle allocation of the ingest line state: slotted records vs dicts.
+
+Scores one alerts feed into per-line state the way fetch_alerts + run_once
+do, once with model.py records and once with the nested-dict pipeline they
+replaced (kept below as the baseline). Reports tracemalloc peak and retained
+bytes per cycle, retained bytes for a window of cycles held in memory (as a
+replay would), time per cycle, and the JSON encode at the edge.
+"""
+
+import sys
+import time
+import tracemalloc
+
+import encoding
+import mta
+from benchmarks._common import report, synthetic_alerts, timeit
+from feeds import Feed, SUBWAY_ROUTES
+from model import LineState
+from routes import ALL_LINES, DEFAULT_AGENCY
+
+REPLAY_CYCLES = 60
+
+
+def records_cycle(source: Feed, message, line_ids: list[str]) -> list[LineState]:
+    result = {line: LineState(line) for line in line_ids}
+    mta._score_alerts(source, message, time.time(), result, {})
+    for state in result.values():
+        state.round_directions()
+        state.status = mta.status_label(state.alerts)
+    return list(result.values())
+
+
+def dict_cycle(source: Feed, message, line_ids: list[str]) -> list[dict]:
+    """The pre-slots pipeline: an empty() tree per line, dicts all the way down."""
+    def empty():
+        return {
+            "score": 0, "alerts": [], "breakdown": {},
+            "by_direction": {
+                "uptown": {"score": 0, "breakdown": {}},
+                "downtown": {"score": 0, "breakdown": {}},
+            },
+        }
+
+    result = {line: empty() for line in line_ids}
+    for entity in message.entity:
+        header = entity.alert.header_text.translation[0].text
+        category, score, direction = mta.classify_alert(header)
+        routes = {source.line_key(ie.route_id) for ie in entity.alert.informed_entity if ie.route_id}
+        alert = {"text": header, "category": category, "score": score, "direction": direction}
+        for route in filter(None, routes):
+            r = result.setdefault(route, empty())
+            r["score"] += score
+            if not any(a["text"] == header for a in r["alerts"]):
+                r["alerts"].append(alert)
+            mta.add_to_breakdown(r["breakdown"], category, score)
+            dirs = ("uptown", "downtown") if direction == "both" else (direction,)
+            for d in dirs:
+                pts = score / len(dirs)
+                r["by_direction"][d]["score"] += pts
+                mta.add_to_breakdown(r["by_direction"][d]["breakdown"], category, pts)
+    for r in result.values():
+        for d in ("uptown", "downtown"):
+            dd = r["by_direction"][d]
+            dd["score"] = int(round(dd["score"]))
+            dd["breakdown"] = {k: int(round(v)) for k, v in dd["breakdown"].items()}
+    # run_once then rebuilt every line into the live-snapshot row shape
+    return [
+        {
+            "id": line_id, "score": ad["score"], "status": _dict_status(ad["alerts"]),
+            "alerts": ad["alerts"], "breakdown": ad["breakdown"],
+            "by_direction": ad["by_direction"], "trip_count": 0, "metrics": {},
+        }
+        for line_id, ad in result.items()
+    ]
+
+
+def _dict_status(alerts: list[dict]) -> str:
+    if not alerts:
+        return "Good Service"
+    worst = max(alerts, key=lambda a: mta.CATEGORY_SCORES.get(a["category"], 0))
+    return mta.STATUS_LABEL_MAP.get(worst["category"], "Issues")
+
+
+def allocation(fn, keep: int = 1) -> tuple[int, int]:
+    """(peak, retained) bytes for `keep` consecutive cycles held in memory."""
+    fn()  # warm caches (regexes, interned strings) outside the measurement
+    tracemalloc.start()
+    held = [fn() for _ in range(keep)]
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return peak, retained
+
+
+def main() -> int:
+    bus_routes = [f"B{n}" for n in range(1, 501)]
+    cases = [
+        ("subway: 24 lines, 60 alerts",
+         Feed("subway-alerts", DEFAULT_AGENCY, "alerts", "", SUBWAY_ROUTES),
+         synthetic_alerts(alerts=60), ALL_LINES),
+        ("multi-agency: 524 lines, 600 alerts",
+         Feed("bus-alerts", "bus", "alerts", "", {r: r for r in bus_routes}),
+         synthetic_alerts(bus_routes, alerts=600),
+         ALL_LINES + [f"bus:{r}" for r in bus_routes]),
+    ]
+    for name, source, message, line_ids in cases:
+        print(f"\n{name}")
+        for label, cycle in (("dicts", dict_cycle), ("records", records_cycle)):
+            run = lambda: cycle(source, message, line_ids)
+            peak, retained = allocation(run)
+            _, replay = allocation(run, REPLAY_CYCLES)
+            print(f"  {label:<8} peak {peak / 1024:8.1f} KiB  retained {retained / 1024:8.1f} KiB"
+                  f"  x{REPLAY_CYCLES} cycles {replay / 1024 / 1024:6.2f} MiB")
+            report(f"  {label} cycle", timeit(run))
+            state = run()
+            report(f"  {label} encode", timeit(lambda: encoding.dumps(state)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""Query regression suite against a seeded large-history database.
+
+    DATABASE_URL=... python -m benchmarks.seed_history --months 12
+    DATABASE_URL=... python -m benchmarks.bench_queries [--update-baseline] [--plans DIR]
+
+Times every db.read_* / db.write_* path the API and ingest use, with the
+arguments the endpoints pass. It captures each statement they run and
+EXPLAIN (ANALYZE, BUFFERS)es it in a rolled-back transaction. A case is
+flagged when:
+
+  - its plan has a sequential scan on a table with more than
+    SEQ_SCAN_MIN_ROWS rows, unless the baseline already records that scan, or
+  - its median is over LATENCY_RATIO x the baseline and at least
+    LATENCY_SLACK_MS slower.
+
+The baseline (query_baseline.json) records the row counts it was measured
+at. If the seeded database is a different size, neither check applies: new
+seq scans are listed in parentheses and latency is only reported. Without a
+baseline, any seq scan on a large table is flagged.
+Writers commit as they do in ingest, so each run adds a few cycles to the
+seeded data. The suite refuses to run on a database that seed_history
+didn't fill.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+import db
+from benchmarks.seed_history import ET, is_seeded
+from model import Alert, Cycle, LineState
+from routes import ALL_LINES
+
+os.environ["RUN_INGEST"] = ""  # importing app must not start a worker
+from app import HISTORY_AUTO_RESOLUTION, TREND_RANGES  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_baseline.json")
+SEQ_SCAN_MIN_ROWS = 10_000
+LATENCY_RATIO = 1.5
+LATENCY_SLACK_MS = 5.0
+SIZE_TOLERANCE = 0.1  # row counts within 10% of the baseline's are comparable
+REPEAT = 10
+
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class RecordingCursor(psycopg2.extensions.cursor):
+    """Cursor that keeps the interpolated text of every statement while recording."""
+
+    statements: list[bytes] | None = None
+
+    def execute(self, query, vars=None):
+        if RecordingCursor.statements is not None:
+            RecordingCursor.statements.append(self.mogrify(query, vars))
+        return super().execute(query, vars)
+
+
+# ---------------------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------------------
+
+def _states() -> list[LineState]:
+    lines = [LineState(line) for line in ALL_LINES]
+    for state in lines[:6]:
+        state.add_alert(Alert(f"[{state.id}] Delays", "Delays", 30, "both"))
+        state.round_directions()
+        state.status = "Delays"
+    return lines
+
+
+def _cycle() -> Cycle:
+    return Cycle(uuid.uuid4().hex, datetime.now(ET), _states())
+
+
+def cases(today: str, archived_day: str) -> dict:
+    """name -> zero-argument call, in the order the report lists them."""
+    now = datetime.now(ET)
+    out = {
+        "read_live_snapshot": db.read_live_snapshot,
+        "read_daily_scores": lambda: db.read_daily_scores(today),
+        "read_timeseries": lambda: db.read_timeseries(today),
+        "read_station_index": db.read_station_index,
+        "read_generation": db.read_generation,
+        "read_last_ingest_time": db.read_last_ingest_time,
+        "read_day_archive": lambda: db.read_day_archive(archived_day),
+    }
+    for rng, (resolution, window) in TREND_RANGES.items():
+        since = db.rollup_buckets(now - window)[resolution]
+        out[f"read_rollups[{rng}]"] = lambda r=resolution, s=since: db.read_rollups(r, s)
+    for period, key in db.period_keys(today).items():
+        out[f"read_leaderboard[{period}]"] = lambda p=period, k=key: db.read_leaderboard(p, k)
+    # Each default /api/history window at its auto resolution
+    for hours, resolution in HISTORY_AUTO_RESOLUTION:
+        rollup = None if resolution == "raw" else resolution
+        out[f"read_history[{hours}h,{resolution}]"] = lambda h=hours, r=rollup: db.read_history(h, r)
+    out.update({
+        "write_raw_snapshot": lambda: db.write_raw_snapshot({"alerts": []}, {"1": 24}),
+        "write_live_snapshot": lambda: db.write_live_snapshot(_states()),
+        "write_station_index": lambda: db.write_station_index({}),
+        "record_ingest_cycle": db.record_ingest_cycle,
+        "apply_cycles[1]": lambda: db.apply_cycles([_cycle()]),
+    })
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Plans
+# ---------------------------------------------------------------------------
+
+def _seq_scans(node: dict, big: dict[str, int]) -> list[str]:
+    found = []
+    if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in big:
+        found.append(node["Relation Name"])
+    for child in node.get("Plans", []):
+        found.extend(_seq_scans(child, big))
+    return found
+
+
+def explain(conn, statements: list[bytes], big: dict[str, int]) -> tuple[list[dict], list[str]]:
+    """EXPLAIN ANALYZE each statement in one rolled-back transaction.
+
+    Returns the plans and the large tables they scan sequentially.
+    """
+    plans, scans = [], []
+    with conn.cursor() as cur:
+        for sql in statements:
+            text = sql.decode()
+            if not text.lstrip().upper().startswith(_EXPLAINABLE):
+                continue  # COPY, SAVEPOINT, ...
+            cur.execute(b"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql)
+            plan = cur.fetchone()[0][0]
+            plans.append({"sql": text, "plan": plan})
+            scans.extend(_seq_scans(plan["Plan"], big))
+    conn.rollback()
+    return plans, sorted(set(scans))
+
+
+def _buffers(plans: list[dict]) -> int:
+    return sum(p["plan"]["Plan"].get("Shared Hit Blocks", 0)
+               + p["plan"]["Plan"].get("Shared Read Blocks", 0) for p in plans)
+
+
+# ---------------------------------------------------------------------------
+# Run
+# ---------------------------------------------------------------------------
+
+def table_rows(cur) -> dict[str, int]:
+    cur.execute(
+        """SELECT relname, GREATEST(reltuples, 0)::bigint FROM pg_class
+           WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace"""
+    )
+    return dict(cur.fetchall())
+
+
+def _comparable(rows: dict[str, int], baseline_rows: dict[str, int]) -> bool:
+    base = baseline_rows.get("scores_history", 0)
+    return bool(base) and abs(rows.get("scores_history", 0) - base) <= base * SIZE_TOLERANCE
+
+
+def run(plans_dir: str | None) -> tuple[dict, dict[str, int]]:
+    db._pool = psycopg2.pool.ThreadedConnectionPool(
+        1, 5, dsn=db.DATABASE_URL, cursor_factory=RecordingCursor,
+    )
+    conn = psycopg2.connect(db.DATABASE_URL)
+    with conn.cursor() as cur:
+        if not is_seeded(cur):
+            raise SystemExit("Not a seeded database: run python -m benchmarks.seed_history first")
+        rows = table_rows(cur)
+        cur.execute("SELECT value FROM mta_ingest_state WHERE key = 'last_day'")
+        today = cur.fetchone()[0]
+        cur.execute("SELECT MIN(score_date)::text FROM mta_day_archives")
+        archived = cur.fetchone()[0] or today
+    conn.commit()
+    big = {t: n for t, n in rows.items() if n > SEQ_SCAN_MIN_ROWS}
+
+    results = {}
+    for name, call in cases(today, archived).items():
+        RecordingCursor.statements = []
+        call()  # warm-up, and the statements to explain
+        statements, RecordingCursor.statements = RecordingCursor.statements, None
+        samples = []
+        for _ in range(REPEAT):
+            t0 = time.perf_counter()
+            call()
+            samples.append((time.perf_counter() - t0) * 1000)
+        plans, scans = explain(conn, statements, big)
+        results[name] = {
+            "median_ms": round(statistics.median(samples), 2),
+            "best_ms": round(min(samples), 2),
+            "statements": len(statements),
+            "buffers": _buffers(plans),
+            "seq_scans": scans,
+        }
+        if plans_dir:
+            os.makedirs(plans_dir, exist_ok=True)
+            safe = name.replace("[", "_").replace("]", "").replace(",", "_")
+            with open(os.path.join(plans_dir, f"{safe}.json"), "w") as f:
+                json.dump(plans, f, indent=2)
+    conn.close()
+    return results, rows
+
+
+def compare(results: dict, rows: dict[str, int], baseline: dict | None) -> int:
+    """Print the report; return the number of flagged cases."""
+    cases_base = (baseline or {}).get("cases", {})
+    sized = baseline is None or _comparable(rows, baseline["meta"]["rows"])
+    timed = baseline is not None and sized
+    if not sized:
+        print(f"baseline measured at {baseline['meta']['rows'].get('scores_history', 0):,} "
+              f"history rows, this database has {rows.get('scores_history', 0):,}: "
+              "latency and seq scans not compared")
+    print(f"{'case':<32} {'median':>10} {'baseline':>10} {'buffers':>9}  flags")
+    flagged = 0
+    for name, r in results.items():
+        base = cases_base.get(name)
+        scans = [f"seq scan {t}" for t in r["seq_scans"]
+                 if not base or t not in base.get("seq_scans", [])]
+        # The planner's choice depends on table size: on a smaller seed a seq
+        # scan can be the right plan, so it only counts at the baseline's size.
+        flags = scans if sized else []
+        if timed and base and r["median_ms"] > max(base["median_ms"] * LATENCY_RATIO,
+                                                   base["median_ms"] + LATENCY_SLACK_MS):
+            flags.append(f"{r['median_ms'] / base['median_ms']:.1f}x slower")
+        flagged += bool(flags)
+        notes = flags or [f"({s})" for s in scans]
+        was = f"{base['median_ms']:8.2f}ms" if base else f"{'-':>10}"
+        print(f"{name:<32} {r['median_ms']:8.2f}ms {was} {r['buffers']:>9}  {', '.join(notes)}")
+    return flagged
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--update-baseline", action="store_true",
+                        help=f"write this run to {os.path.basename(BASELINE_PATH)}")
+    parser.add_argument("--plans", metavar="DIR", help="dump each case's EXPLAIN plans here")
+    args = parser.parse_args()
+
+    if not db.DATABASE_URL:
+        print("DATABASE_URL is not set", file=sys.stderr)
+        return 2
+    results, rows = run(args.plans)
+    baseline = None
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+    flagged = compare(results, rows, baseline)
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({
+                "meta": {"rows": rows, "measured": datetime.now(ET).date().isoformat()},
+                "cases": results,
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {BASELINE_PATH}")
+        return 0
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""JSON serialisation: stdlib vs encoding.dumps, and JSONB passthrough.
+
+The passthrough rows model what read_live_snapshot & co. now return: JSONB
+columns as RawJSON text, spliced into the response without a parse/re-dump
+round trip. With DATABASE_URL set, also times the real read paths.
+"""
+
+import json
+import os
+import sys
+
+import encoding
+from benchmarks._common import report, synthetic_history, synthetic_status, timeit
+from encoding import RawJSON
+
+# Line fields that come straight from JSONB columns
+_JSONB_FIELDS = (
+    "alerts", "peak_alerts", "breakdown", "live_breakdown",
+    "by_direction", "live_by_direction", "metrics",
+)
+
+
+def _as_passthrough(doc: dict) -> dict:
+    """The status document as the DB read helpers now build it."""
+    def line(l):
+        return {k: RawJSON(json.dumps(v)) if k in _JSONB_FIELDS else v for k, v in l.items()}
+
+    lines = [line(l) for l in doc["lines"]]
+    by_id = {l["id"]: l for l in lines}
+    return {
+        **doc,
+        "lines": lines,
+        "podium": [by_id[l["id"]] for l in doc["podium"]],
+        "winner": by_id[doc["winner"]["id"]] if doc["winner"] else None,
+        "timeseries": [
+            {"time": b["time"], "scores": RawJSON(json.dumps(b["scores"]))}
+            for b in doc["timeseries"]
+        ],
+    }
+
+
+def _stdlib(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), sort_keys=True).encode()
+
+
+def main() -> int:
+    print(f"orjson: {'yes' if encoding.ORJSON_AVAILABLE else 'no (stdlib fallback)'}")
+    for name, doc in (("/api/status", synthetic_status()),
+                      ("/api/history?hours=72", synthetic_history())):
+        print(f"\n{name}")
+        report("  json.dumps (stdlib)", timeit(lambda: _stdlib(doc)))
+        report("  encoding.dumps", timeit(lambda: encoding.dumps(doc)))
+        if name == "/api/status":
+            raw = _as_passthrough(doc)
+            # What a parsed JSONB read costs before the encoder runs at all
+            texts = [json.dumps(v) for l in doc["lines"]
+                     for k, v in l.items() if k in _JSONB_FIELDS]
+            report("  JSONB parse (json.loads per column)",
+                   timeit(lambda: [json.loads(t) for t in texts]))
+            report("  encoding.dumps (RawJSON passthrough)", timeit(lambda: encoding.dumps(raw)))
+
+    if os.environ.get("DATABASE_URL"):
+        import db
+        from status import build_status_document
+
+        db.init_db()
+        print("\nPostgres read paths")
+        report("  build_status_document", timeit(build_status_document, 50))
+        report("  read_history(72)", timeit(lambda: db.read_history(72), 5))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
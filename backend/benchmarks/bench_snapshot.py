@@ -0,0 +1,37 @@
+"""Shared status snapshot: publish cost per cycle, serve cost per request.
+
+Compares serving the pre-encoded variant out of the mapping with what a
+worker pays without it (JSON-encoding the cached document per request).
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import snapshot
+from benchmarks._common import report, synthetic_status, timeit
+
+
+def main() -> int:
+    doc = synthetic_status()
+    path = os.path.join(tempfile.mkdtemp(), "status.snap")
+    reader = snapshot.SnapshotReader(path)
+
+    report("publish (encode 4 variants + replace)",
+           timeit(lambda: snapshot.publish(doc["generation"], doc, path)))
+    snap = reader.current()
+    sizes = ", ".join(f"{n} {snap.variants[n][1]:,} B" for n in snap.variants)
+    print(f"  {sizes}")
+
+    def serve():
+        bytes(reader.current().body("application/json+gzip"))
+
+    report("serve from snapshot (stat + copy)", timeit(serve, 200))
+    report("serve by encoding per request",
+           timeit(lambda: json.dumps(doc, separators=(",", ":"), sort_keys=True).encode(), 200))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
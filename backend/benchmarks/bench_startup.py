@@ -0,0 +1,57 @@
+"""Cold start: time from interpreter start to the first /api/status response.
+
+Each sample is a fresh interpreter, like a new gunicorn replica. Uses
+DATABASE_URL if set (schema already migrated is the normal case), otherwise
+measures the no-DB path. Also fails if the web tier pulls in ingest-only
+modules.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks._common import report
+
+BUDGET_MS = 1000
+INGEST_ONLY = ("mta", "ingest", "headways", "requests", "google.protobuf", "numpy", "PIL")
+
+_PROBE = f"""
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.app.test_client().get("/api/status")
+t2 = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (t1 - t0) * 1000,
+    "first_response_ms": (t2 - t0) * 1000,
+    "loaded": [m for m in {INGEST_ONLY!r} if m in sys.modules],
+}}))
+"""
+
+
+def _sample() -> dict:
+    env = {**os.environ, "RUN_INGEST": ""}
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE], env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(repeat: int = 5) -> int:
+    samples = [_sample() for _ in range(repeat)]
+    ok = True
+    for key in ("import_ms", "first_response_ms"):
+        values = sorted(s[key] for s in samples)
+        stats = {"best_ms": values[0], "median_ms": values[len(values) // 2]}
+        ok &= report(key, stats, BUDGET_MS if key == "first_response_ms" else None)
+    loaded = samples[0]["loaded"]
+    if loaded:
+        print(f"ingest-only modules loaded by the web tier: {', '.join(loaded)}")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""Seed a scratch Postgres with months of synthetic ingest history.
+
+    DATABASE_URL=... python -m benchmarks.seed_history --months 12
+
+Fills every table ingest writes as if it had run once a minute for
+`--months`, ending now: scores_history (24 lines x 1440 cycles a day),
+daily scores, timeseries, rollups, leaderboards, ingest generations, the
+applied-cycle ledger, the live snapshot and the sealed day archives.
+
+Scores come from simulated incidents, not uniform noise. Each line has its
+own incident rate, with more incidents at rush hour and fewer overnight and
+at weekends. Each incident has a category, a score and a lognormal duration,
+and incidents overlap. Some line-days are quiet and some stretches go
+incident-free for days, so plans see the skew real data has.
+
+Destructive: it truncates the app's tables. It refuses to run on a database
+that has ingest data unless an earlier seed left its marker there.
+bench_queries checks for the same marker.
+"""
+
+import argparse
+import io
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import psycopg2.extras
+
+import db
+import encoding
+from routes import ALL_LINES
+
+ET = ZoneInfo("America/New_York")
+SEED_MARKER = ("seeded_by", "benchmarks.seed_history")
+
+# (category, points, status label, relative frequency)
+INCIDENTS = (
+    ("Delays", 30, "Delays", 0.45),
+    ("Slow Speeds", 20, "Slow Speeds", 0.20),
+    ("No Service", 50, "Suspended", 0.08),
+    ("Skip Stop", 15, "Skip Stop", 0.10),
+    ("Rerouted", 15, "Rerouted", 0.10),
+    ("Reduced Freq", 10, "Fewer Trains", 0.07),
+)
+_WEIGHTS = np.array([i[3] for i in INCIDENTS]) / sum(i[3] for i in INCIDENTS)
+# Worst category first, for the status label of overlapping incidents
+_SEVERITY = sorted(range(len(INCIDENTS)), key=lambda i: -INCIDENTS[i][1])
+
+# Incidents per line per hour, by ET hour of day (before the line's own factor)
+_HOURLY = np.array([
+    0.02, 0.02, 0.02, 0.02, 0.03, 0.05, 0.10, 0.18, 0.20, 0.15, 0.08, 0.07,
+    0.07, 0.07, 0.08, 0.10, 0.16, 0.20, 0.18, 0.10, 0.07, 0.05, 0.04, 0.03,
+])
+QUIET_DAY_SHARE = 0.15  # line-days with almost no incidents
+
+_TABLES = (
+    "scores_history", "mta_live_snapshot", "mta_daily_scores", "mta_timeseries",
+    "raw_mta_snapshots", "mta_station_index", "mta_rollups",
+    "mta_leaderboard", "mta_ingest_state", "mta_applied_cycles", "mta_day_archives",
+)
+
+
+def simulate(minutes: np.ndarray, rng: np.random.Generator):
+    """Per-line (score, category index of the worst active incident or -1, per-category points).
+
+    `minutes` are the cycles' ET wall times as datetime64[m] (naive).
+    """
+    n = len(minutes)
+    hours = minutes.astype("datetime64[h]").astype(np.int64) % 24
+    days = minutes.astype("datetime64[D]")
+    weekday = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    day_index = (days - days[0]).astype(np.int64)
+    n_days = int(day_index[-1]) + 1
+
+    out = {}
+    for line in ALL_LINES:
+        propensity = rng.lognormal(0, 0.5)
+        quiet = rng.random(n_days) < QUIET_DAY_SHARE
+        # A multi-day incident-free stretch somewhere in most lines' history
+        if n_days > 14 and rng.random() < 0.7:
+            start = rng.integers(0, n_days - 7)
+            quiet[start:start + rng.integers(3, 8)] = True
+        rate = _HOURLY[hours] / 60 * propensity
+        rate = rate * np.where(weekday >= 5, 0.6, 1.0) * np.where(quiet[day_index], 0.05, 1.0)
+
+        starts = np.flatnonzero(rng.random(n) < rate)
+        kinds = rng.choice(len(INCIDENTS), size=len(starts), p=_WEIGHTS)
+        durations = np.clip(rng.lognormal(np.log(40), 0.8, len(starts)), 5, 360).astype(np.int64)
+        ends = np.minimum(starts + durations, n)
+
+        active = np.zeros((len(INCIDENTS), n + 1), np.int32)
+        np.add.at(active, (kinds, starts), 1)
+        np.add.at(active, (kinds, ends), -1)
+        active = np.cumsum(active, axis=1)[:, :n]
+        points = active * np.array([i[1] for i in INCIDENTS])[:, None]
+        score = points.sum(axis=0)
+        worst = np.full(n, -1, np.int8)
+        for k in reversed(_SEVERITY):
+            worst[active[k] > 0] = k
+        out[line] = (score, worst, points)
+    return out
+
+
+def _copy(cur, table: str, columns: tuple[str, ...], rows):
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(db._copy_text(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+
+
+def _aware(minute: np.datetime64) -> datetime:
+    """ET-aware datetime for a naive ET wall-time minute."""
+    return minute.astype(datetime).replace(tzinfo=ET)
+
+
+def _buckets(wall: np.ndarray, width: int) -> tuple[np.ndarray, np.ndarray]:
+    """(bucket starts, bucket index per minute) for `width`-minute wall-time buckets."""
+    keys = wall.astype(np.int64) // width * width
+    starts, inverse = np.unique(keys, return_inverse=True)
+    return starts.astype("datetime64[m]"), inverse
+
+
+def _rollup_rows(resolution: str, wall: np.ndarray, width: int, lines: dict, sl: slice):
+    starts, inverse = _buckets(wall, width)
+    samples = np.bincount(inverse, minlength=len(starts))
+    stamps = [_aware(s).isoformat() for s in starts]
+    for line, (score, _, _) in lines.items():
+        s = score[sl]
+        peak = np.zeros(len(starts), np.int64)
+        np.maximum.at(peak, inverse, s)
+        total = np.bincount(inverse, weights=s, minlength=len(starts)).astype(np.int64)
+        for i, bucket in enumerate(stamps):
+            yield resolution, bucket, line, int(peak[i]), int(total[i]), int(samples[i])
+
+
+def seed(conn, months: int, seed_value: int):
+    rng = np.random.default_rng(seed_value)
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    first_day = (now.astimezone(ET) - timedelta(days=30 * months)).date()
+    start = datetime.combine(first_day, datetime.min.time(), ET).astimezone(timezone.utc)
+
+    # One cycle a minute; `et_wall` is each cycle's naive ET wall time
+    n = int((now - start).total_seconds() // 60) + 1
+    utc = np.datetime64(start.replace(tzinfo=None), "m") + np.arange(n)
+    hourly = [
+        np.datetime64((start + timedelta(hours=h)).astimezone(ET).replace(tzinfo=None), "m")
+        for h in range((n + 59) // 60)
+    ]
+    # The ET offset only changes on the hour, so hourly samples are enough
+    offsets = np.repeat(np.array(hourly) - utc[::60], 60)[:n]
+    et_wall = utc + offsets
+    lines = simulate(et_wall, rng)
+    print(f"simulated {n:,} cycles x {len(ALL_LINES)} lines")
+
+    cur = conn.cursor()
+    cur.execute(f"TRUNCATE {', '.join(_TABLES)} RESTART IDENTITY")
+    cur.execute("SELECT setval('mta_generation', %s)", (n,))  # one generation per cycle
+
+    days = et_wall.astype("datetime64[D]")
+    bounds = np.flatnonzero(np.diff(days.astype(np.int64))) + 1
+    ledger_from = n - db.CYCLE_LEDGER_DAYS * 1440
+    daily_totals: dict[str, dict[str, int]] = {}
+    t0 = time.perf_counter()
+
+    for a, b in zip([0, *bounds], [*bounds, n]):
+        sl = slice(a, b)
+        day = str(days[a])
+        wall = et_wall[sl]
+        stamps = [f"{s}Z" for s in np.datetime_as_string(utc[sl], unit="m")]
+        statuses = {
+            line: [INCIDENTS[k][2] if k >= 0 else "Good Service" for k in worst[sl]]
+            for line, (_, worst, _) in lines.items()
+        }
+        # scores_history in capture order, as ingest writes it
+        _copy(cur, "scores_history", ("line_id", "captured_at", "score", "status", "trip_count"), (
+            (line, stamps[j], int(score[a + j]), statuses[line][j],
+             0 if worst[a + j] == 2 else 24)
+            for j in range(b - a)
+            for line, (score, worst, _) in lines.items()
+        ))
+        if b > ledger_from:
+            _copy(cur, "mta_applied_cycles", ("cycle_id", "cycle_at"), (
+                (f"seed-{i}", stamps[i - a]) for i in range(max(a, ledger_from), b)
+            ))
+
+        # Daily scores: the sum of every cycle's points, by category
+        rows = []
+        for line, (score, worst, points) in lines.items():
+            breakdown = {
+                INCIDENTS[k][0]: int(points[k, sl].sum())
+                for k in range(len(INCIDENTS)) if points[k, sl].any()
+            }
+            total = int(score[sl].sum())
+            half = {c: p // 2 for c, p in breakdown.items()}
+            peak = [
+                {"text": f"[{line}] {INCIDENTS[k][0]}", "category": INCIDENTS[k][0],
+                 "score": INCIDENTS[k][1], "direction": "both"}
+                for k in np.unique(worst[sl][worst[sl] >= 0])
+            ]
+            daily_totals.setdefault(day, {})[line] = total
+            rows.append((line, day, total, encoding.dumps_text(breakdown), encoding.dumps_text({
+                "uptown": {"score": total // 2, "breakdown": half},
+                "downtown": {"score": total - total // 2, "breakdown": half},
+            }), encoding.dumps_text(peak)))
+        psycopg2.extras.execute_values(
+            cur,
+            """INSERT INTO mta_daily_scores
+                   (line_id, score_date, daily_score, breakdown, by_direction, peak_alerts)
+               VALUES %s""",
+            rows,
+        )
+
+        # Timeseries: the first cycle in each 15-minute bucket
+        starts, first = np.unique(wall.astype(np.int64) // 15, return_index=True)
+        ts_rows = []
+        for key, j in zip(starts, first):
+            minute = int(key) * 15 % 1440
+            scores = {l: int(s[a + j]) for l, (s, _, _) in lines.items() if s[a + j] > 0}
+            ts_rows.append((day, f"{minute // 60:02d}:{minute % 60:02d}",
+                            encoding.dumps_text(scores), stamps[j]))
+        psycopg2.extras.execute_values(
+            cur,
+            """INSERT INTO mta_timeseries (score_date, bucket, scores, captured_at) VALUES %s
+               ON CONFLICT (score_date, bucket) DO NOTHING""",
+            ts_rows, page_size=500,
+        )
+
+        _copy(cur, "mta_rollups",
+              ("resolution", "bucket_start", "line_id", "max_score", "sum_score", "samples"),
+              [*_rollup_rows("15m", wall, 15, lines, sl), *_rollup_rows("1h", wall, 60, lines, sl),
+               *_rollup_rows("1d", wall, 1440, lines, sl)])
+        conn.commit()
+        print(f"\r{day}  {time.perf_counter() - t0:6.0f}s", end="", flush=True)
+    print()
+
+    today = str(days[-1])
+    _seed_leaderboards(cur, daily_totals, today)
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO mta_live_snapshot (line_id, score, status, trip_count) VALUES %s",
+        [
+            (line, int(s[-1]), INCIDENTS[w[-1]][2] if w[-1] >= 0 else "Good Service", 24)
+            for line, (s, w, _) in lines.items()
+        ],
+    )
+    cur.execute("INSERT INTO mta_station_index (id, stations) VALUES (1, '{}')")
+    cur.execute(
+        "INSERT INTO mta_ingest_state (key, value) VALUES ('last_day', %s), (%s, %s)",
+        (today, *SEED_MARKER),
+    )
+    sealed = db._seal_days(cur, today)
+    conn.commit()
+    print(f"sealed {len(sealed)} day archives")
+
+    conn.autocommit = True
+    cur.execute("VACUUM ANALYZE")
+    cur.execute("SELECT pg_size_pretty(pg_database_size(current_database()))")
+    print(f"database size {cur.fetchone()[0]}")
+
+
+def _seed_leaderboards(cur, daily_totals: dict[str, dict[str, int]], today: str):
+    current = db.period_keys(today)
+    boards: dict[tuple, dict] = {}
+    for day, totals in daily_totals.items():
+        top = max(totals.values())
+        for period, key in db.period_keys(day).items():
+            for line, total in totals.items():
+                b = boards.setdefault((period, key, line), {
+                    "total": 0, "worst_day": None, "worst": 0, "won": 0,
+                })
+                b["total"] += total
+                if total > b["worst"]:
+                    b["worst"], b["worst_day"] = total, day
+                if day < today and top > 0 and total == top:
+                    b["won"] += 1
+    psycopg2.extras.execute_values(
+        cur,
+        """INSERT INTO mta_leaderboard
+               (period, period_key, line_id, total_score, worst_day, worst_day_score,
+                days_won, closed)
+           VALUES %s""",
+        [
+            (period, key, line, b["total"], b["worst_day"], b["worst"], b["won"],
+             period != "all" and key != current[period])
+            for (period, key, line), b in boards.items()
+        ],
+    )
+
+
+def is_seeded(cur) -> bool:
+    cur.execute("SELECT value FROM mta_ingest_state WHERE key = %s", (SEED_MARKER[0],))
+    row = cur.fetchone()
+    return bool(row) and row[0] == SEED_MARKER[1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if not db.DATABASE_URL:
+        print("DATABASE_URL is not set", file=sys.stderr)
+        return 2
+    db.init_db()
+    conn = psycopg2.connect(db.DATABASE_URL)
+    with conn.cursor() as cur:
+        cur.execute("SELECT is_called FROM mta_generation")
+        if cur.fetchone()[0] and not is_seeded(cur):
+            print("Refusing to truncate a database with real ingest data", file=sys.stderr)
+            return 2
+    conn.commit()
+    seed(conn, args.months, args.seed)
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
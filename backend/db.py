@@ -5,11 +5,16 @@ All state lives in Postgres — no globals, no files.
 """
 
 import hashlib
-import json
+import io
 import logging
 import os
 from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
+from itertools import groupby
+
+import encoding
+from encoding import RawJSON
+from model import DIRECTIONS, ET, Cycle, LineState
 
 log = logging.getLogger(__name__)
 
@@ -20,6 +25,10 @@ try:
     import psycopg2.extras
     import psycopg2.pool
 
+    # JSONB columns we do parse (daily score folding, station index) go through
+    # the same fast decoder as everything else.
+    psycopg2.extras.register_default_jsonb(loads=encoding.loads, globally=True)
+
     PSYCOPG2_AVAILABLE = True
 except ImportError:
     PSYCOPG2_AVAILABLE = False
@@ -74,11 +83,29 @@ def db_available() -> bool:
     return PSYCOPG2_AVAILABLE and DATABASE_URL is not None
 
 
+def ping() -> bool:
+    """Whether a pooled connection answers right now."""
+    try:
+        with get_conn() as conn:
+            if conn is None:
+                return False
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+
 # ---------------------------------------------------------------------------
 # Schema
 # ---------------------------------------------------------------------------
 
-_SCHEMA_SQL = """
+# Ordered, append-only. Each entry runs once, in its own transaction, and is
+# recorded in schema_version; never edit one that has shipped, add a new one.
+# Version 1 is the original schema, written with IF NOT EXISTS so databases
+# created before versioning adopt it without changes.
+MIGRATIONS: list[tuple[int, str, str]] = [
+    (1, "baseline schema", """
 -- Existing history table (kept for backward compat with /api/history)
 CREATE TABLE IF NOT EXISTS scores_history (
     id SERIAL PRIMARY KEY,
@@ -134,11 +161,141 @@ CREATE TABLE IF NOT EXISTS raw_mta_snapshots (
 );
 CREATE INDEX IF NOT EXISTS idx_raw_snapshots_time
     ON raw_mta_snapshots(captured_at DESC);
-"""
+"""),
+    (2, "headway metrics on live snapshot", """
+ALTER TABLE mta_live_snapshot
+    ADD COLUMN IF NOT EXISTS metrics JSONB NOT NULL DEFAULT '{}';
+"""),
+    (3, "station index", """
+-- Single row, replaced every ingest cycle
+CREATE TABLE IF NOT EXISTS mta_station_index (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    stations JSONB NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""),
+    (4, "ingest generations", """
+-- One row per completed ingest cycle; generation numbers the status document
+CREATE TABLE IF NOT EXISTS mta_ingest_cycles (
+    generation BIGSERIAL PRIMARY KEY,
+    completed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""),
+    (5, "score rollups", """
+-- Pre-aggregated per-line rollups at 15m / 1h / 1d (ET-aligned buckets),
+-- fed from every ingest cycle. mean = sum_score / samples.
+CREATE TABLE IF NOT EXISTS mta_rollups (
+    resolution TEXT NOT NULL,
+    bucket_start TIMESTAMPTZ NOT NULL,
+    line_id TEXT NOT NULL,
+    max_score INTEGER NOT NULL DEFAULT 0,
+    sum_score BIGINT NOT NULL DEFAULT 0,
+    samples INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (resolution, bucket_start, line_id)
+);
+"""),
+    (6, "leaderboards", """
+-- Hall of Shame: per-line aggregates per week / month / all time.
+-- Updated every cycle while open; closed rows are final.
+CREATE TABLE IF NOT EXISTS mta_leaderboard (
+    period TEXT NOT NULL,
+    period_key TEXT NOT NULL,
+    line_id TEXT NOT NULL,
+    total_score BIGINT NOT NULL DEFAULT 0,
+    worst_day DATE,
+    worst_day_score INTEGER NOT NULL DEFAULT 0,
+    days_won INTEGER NOT NULL DEFAULT 0,
+    closed BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (period, period_key, line_id)
+);
+
+-- Small key/value bookkeeping for the ingest worker (e.g. last rollover date)
+CREATE TABLE IF NOT EXISTS mta_ingest_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""),
+    (7, "applied cycle ledger", """
+-- Ids of ingest cycles already folded into the cumulative tables, so a
+-- cycle replayed from the local WAL is never counted twice. Pruned after
+-- CYCLE_LEDGER_DAYS.
+CREATE TABLE IF NOT EXISTS mta_applied_cycles (
+    cycle_id TEXT PRIMARY KEY,
+    cycle_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_applied_cycles_at ON mta_applied_cycles(cycle_at);
+"""),
+    (8, "sealed day archives", """
+-- One row per finished ET day, written once at rollover and never updated:
+-- the encoded /api/day/<date> JSON body and its content-hash ETag.
+CREATE TABLE IF NOT EXISTS mta_day_archives (
+    score_date DATE PRIMARY KEY,
+    body BYTEA NOT NULL,
+    etag TEXT NOT NULL,
+    sealed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""),
+    (9, "history time index", """
+-- /api/history windows filter on captured_at alone. Rows arrive in time
+-- order, so a BRIN index narrows the scan to the window's pages at a
+-- fraction of a btree's size.
+CREATE INDEX IF NOT EXISTS idx_scores_history_time_brin
+    ON scores_history USING brin (captured_at);
+"""),
+    (10, "backfill score rollups", """
+-- /api/history's 15m and 1h windows read mta_rollups, which ingest only
+-- started filling at migration 5. Rebuild the days before its first bucket
+-- from scores_history, with the same ET-aligned buckets as db.rollup_buckets.
+INSERT INTO mta_rollups (resolution, bucket_start, line_id, max_score, sum_score, samples)
+SELECT b.resolution, b.bucket_start, h.line_id, MAX(h.score), SUM(h.score), COUNT(*)
+FROM scores_history h
+CROSS JOIN LATERAL (
+    SELECT h.captured_at AT TIME ZONE 'America/New_York' AS wall
+) w
+CROSS JOIN LATERAL (VALUES
+    ('15m', (date_trunc('hour', w.wall)
+             + floor(extract(minute FROM w.wall) / 15) * INTERVAL '15 minutes')
+            AT TIME ZONE 'America/New_York'),
+    ('1h', date_trunc('hour', w.wall) AT TIME ZONE 'America/New_York'),
+    ('1d', date_trunc('day', w.wall) AT TIME ZONE 'America/New_York')
+) b (resolution, bucket_start)
+WHERE h.captured_at < COALESCE(
+    (SELECT MIN(bucket_start) FROM mta_rollups WHERE resolution = '1d'), 'infinity')
+GROUP BY b.resolution, b.bucket_start, h.line_id
+ON CONFLICT (resolution, bucket_start, line_id) DO NOTHING;
+"""),
+    (11, "generation sequence", """
+-- The generation only needs to be a counter: a sequence, continuing from the
+-- last row of mta_ingest_cycles, replaces one stored row per cycle.
+CREATE SEQUENCE IF NOT EXISTS mta_generation;
+SELECT setval('mta_generation', GREATEST(MAX(generation), 1), MAX(generation) IS NOT NULL)
+FROM mta_ingest_cycles;
+DROP TABLE mta_ingest_cycles;
+"""),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Arbitrary app-wide key so concurrent boots don't race on the same migration
+_MIGRATION_LOCK_ID = 0x5B7A_5EA3
+
+
+def _current_version(cur) -> int:
+    cur.execute("SELECT to_regclass('schema_version')")
+    if cur.fetchone()[0] is None:
+        return 0
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cur.fetchone()[0]
 
 
 def init_db():
-    """Run schema migration."""
+    """Apply any pending migrations.
+
+    An up-to-date database costs two catalog reads and no DDL, so this is
+    cheap on every boot; only a replica that finds pending work takes the
+    advisory lock and runs them.
+    """
     if not db_available():
         log.info("DATABASE_URL not set or psycopg2 unavailable — skipping DB init")
         return
@@ -148,8 +305,38 @@ def init_db():
         conn.autocommit = True
         try:
             with conn.cursor() as cur:
-                cur.execute(_SCHEMA_SQL)
-            log.info("DB schema init complete")
+                if _current_version(cur) >= SCHEMA_VERSION:
+                    return
+                cur.execute("SELECT pg_advisory_lock(%s)", (_MIGRATION_LOCK_ID,))
+                try:
+                    cur.execute(
+                        """CREATE TABLE IF NOT EXISTS schema_version (
+                               version INTEGER PRIMARY KEY,
+                               description TEXT NOT NULL,
+                               applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                           )"""
+                    )
+                    current = _current_version(cur)
+                    for version, description, sql in MIGRATIONS:
+                        if version <= current:
+                            continue
+                        conn.autocommit = False
+                        try:
+                            cur.execute(sql)
+                            cur.execute(
+                                "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                                (version, description),
+                            )
+                            conn.commit()
+                        except Exception:
+                            conn.rollback()
+                            raise
+                        finally:
+                            conn.autocommit = True
+                        log.info("Applied migration %d: %s", version, description)
+                finally:
+                    cur.execute("SELECT pg_advisory_unlock(%s)", (_MIGRATION_LOCK_ID,))
+            log.info("DB schema at version %d", SCHEMA_VERSION)
         except Exception as e:
             log.warning("DB schema init failed: %s", e)
 
@@ -160,8 +347,8 @@ def init_db():
 
 def write_raw_snapshot(alerts_data: dict, trip_counts: dict):
     """Store a raw MTA snapshot with content hash."""
-    payload = json.dumps({"alerts": alerts_data, "trips": trip_counts}, sort_keys=True)
-    content_hash = hashlib.sha256(payload.encode()).hexdigest()[:16]
+    payload = encoding.dumps({"alerts": alerts_data, "trips": trip_counts})
+    content_hash = hashlib.sha256(payload).hexdigest()[:16]
 
     with get_conn() as conn:
         if conn is None:
@@ -171,11 +358,11 @@ def write_raw_snapshot(alerts_data: dict, trip_counts: dict):
             cur.execute(
                 """INSERT INTO raw_mta_snapshots (content_hash, alerts_data, trip_counts)
                    VALUES (%s, %s, %s)""",
-                (content_hash, json.dumps(alerts_data), json.dumps(trip_counts)),
+                (content_hash, encoding.dumps_text(alerts_data), encoding.dumps_text(trip_counts)),
             )
 
 
-def write_live_snapshot(lines: list[dict]):
+def write_live_snapshot(lines: list[LineState]):
     """Upsert the latest live snapshot for all lines."""
     with get_conn() as conn:
         if conn is None:
@@ -185,8 +372,9 @@ def write_live_snapshot(lines: list[dict]):
             for line in lines:
                 cur.execute(
                     """INSERT INTO mta_live_snapshot
-                           (line_id, score, status, alerts, breakdown, by_direction, trip_count, updated_at)
-                       VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+                           (line_id, score, status, alerts, breakdown, by_direction,
+                            trip_count, metrics, updated_at)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW())
                        ON CONFLICT (line_id) DO UPDATE SET
                            score = EXCLUDED.score,
                            status = EXCLUDED.status,
@@ -194,188 +382,548 @@ def write_live_snapshot(lines: list[dict]):
                            breakdown = EXCLUDED.breakdown,
                            by_direction = EXCLUDED.by_direction,
                            trip_count = EXCLUDED.trip_count,
+                           metrics = EXCLUDED.metrics,
                            updated_at = NOW()""",
                     (
-                        line["id"],
-                        line["score"],
-                        line["status"],
-                        json.dumps(line["alerts"]),
-                        json.dumps(line["breakdown"]),
-                        json.dumps(line["by_direction"]),
-                        line["trip_count"],
+                        line.id,
+                        line.score,
+                        line.status,
+                        encoding.dumps_text(line.alerts),
+                        encoding.dumps_text(line.breakdown),
+                        encoding.dumps_text(line.by_direction_json()),
+                        line.trip_count,
+                        encoding.dumps_text(line.metrics),
                     ),
                 )
 
 
-def accumulate_daily(alerts_data: dict, today: str):
-    """Add current alert scores to daily totals.
+ROLLUP_RESOLUTIONS = ("15m", "1h", "1d")
+
+
+def rollup_buckets(et_now: datetime) -> dict[str, datetime]:
+    """Bucket start for each resolution containing the ET wall time et_now."""
+    return {
+        "15m": et_now.replace(minute=et_now.minute // 15 * 15, second=0, microsecond=0),
+        "1h": et_now.replace(minute=0, second=0, microsecond=0),
+        "1d": et_now.replace(hour=0, minute=0, second=0, microsecond=0),
+    }
+
+
+LEADERBOARD_PERIODS = ("week", "month", "all")
+
+
+def period_keys(day: str) -> dict[str, str]:
+    """Leaderboard period keys ("2026-W02", "2026-01", "all") for a YYYY-MM-DD date."""
+    d = datetime.strptime(day, "%Y-%m-%d").date()
+    year, week, _ = d.isocalendar()
+    return {"week": f"{year}-W{week:02d}", "month": d.strftime("%Y-%m"), "all": "all"}
+
+
+# ---------------------------------------------------------------------------
+# Cumulative tables (daily scores, history, rollups, leaderboards, timeseries)
+# ---------------------------------------------------------------------------
+
+# How long applied cycle ids are remembered. WAL records older than this are
+# no longer protected against double-counting.
+CYCLE_LEDGER_DAYS = 30
+
+
+def _rollover_day(cur, today: str) -> str | None:
+    """Close out the previous ET day once, the first cycle after midnight.
+
+    Credits the day's #1 subway line(s) with a day won and closes any week /
+    month that has ended. Returns the finished date, or None if no rollover
+    was due. The state row is locked, so concurrent callers roll over once.
+    """
+    from routes import ALL_LINES
+
+    cur.execute("SELECT value FROM mta_ingest_state WHERE key = 'last_day' FOR UPDATE")
+    row = cur.fetchone()
+    cur.execute(
+        """INSERT INTO mta_ingest_state (key, value) VALUES ('last_day', %s)
+           ON CONFLICT (key) DO UPDATE
+               SET value = GREATEST(mta_ingest_state.value, EXCLUDED.value)""",
+        (today,),
+    )
+    finished = row[0] if row and row[0] < today else None
+    if finished:
+        keys = period_keys(finished)
+        cur.execute(
+            """UPDATE mta_leaderboard SET days_won = days_won + 1, updated_at = NOW()
+               WHERE (period, period_key) IN (('week', %s), ('month', %s), ('all', 'all'))
+                 AND line_id IN (
+                     SELECT line_id FROM mta_daily_scores
+                     WHERE score_date = %s AND daily_score > 0
+                       AND daily_score = (SELECT MAX(daily_score)
+                                          FROM mta_daily_scores
+                                          WHERE score_date = %s
+                                            AND line_id = ANY(%s)))""",
+            (keys["week"], keys["month"], finished, finished, ALL_LINES),
+        )
+        current = period_keys(today)
+        cur.execute(
+            """UPDATE mta_leaderboard SET closed = TRUE, updated_at = NOW()
+               WHERE NOT closed AND (
+                   (period = 'week' AND period_key <> %s)
+                   OR (period = 'month' AND period_key <> %s))""",
+            (current["week"], current["month"]),
+        )
+        # A failed seal must not block the rollover; the next one retries it
+        cur.execute("SAVEPOINT seal_days")
+        try:
+            for day in _seal_days(cur, today):
+                log.info("Sealed day archive %s", day)
+        except Exception as e:
+            cur.execute("ROLLBACK TO SAVEPOINT seal_days")
+            log.warning("Failed to seal day archives: %s", e)
+    return finished
+
+
+def _seal_days(cur, today: str) -> list[str]:
+    """Archive every finished day that has scores but no archive yet.
 
-    Uses Postgres as the single source of truth — no globals.
+    Normally that's just the day that finished; the first rollover after
+    the archive table appears backfills all earlier days.
     """
+    from status import build_day_summary
+
+    cur.execute(
+        """SELECT DISTINCT d.score_date::text
+           FROM mta_daily_scores d
+           LEFT JOIN mta_day_archives a ON a.score_date = d.score_date
+           WHERE d.score_date < %s AND a.score_date IS NULL
+           ORDER BY 1""",
+        (today,),
+    )
+    days = [r[0] for r in cur.fetchall()]
+    for day in days:
+        summary = build_day_summary(day, _select_daily_scores(cur, day), _select_timeseries(cur, day))
+        body = encoding.dumps(summary)
+        cur.execute(
+            """INSERT INTO mta_day_archives (score_date, body, etag) VALUES (%s, %s, %s)
+               ON CONFLICT (score_date) DO NOTHING""",
+            (day, psycopg2.Binary(body), hashlib.sha256(body).hexdigest()[:32]),
+        )
+    return days
+
+
+def _copy_text(value) -> str:
+    """One field in COPY text format."""
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def _copy_history(cur, cycles: list[Cycle]):
+    buf = io.StringIO()
+    for cycle in cycles:
+        at = cycle.at.isoformat()
+        for line in cycle.lines:
+            buf.write("\t".join(_copy_text(v) for v in (
+                line.id, at, line.score, line.status, line.trip_count,
+            )))
+            buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(
+        "COPY scores_history (line_id, captured_at, score, status, trip_count) FROM STDIN",
+        buf,
+    )
+
+
+def _fold_daily(cur, today: str, cycles: list[Cycle]) -> dict[str, int]:
+    """Add the cycles' alert scores to today's rows; return each line's new total."""
     from mta import ALL_LINES, add_to_breakdown
 
-    with get_conn() as conn:
-        if conn is None:
-            return
-        conn.autocommit = True
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            # Read current daily state for all lines
-            cur.execute(
-                """SELECT line_id, daily_score, breakdown, by_direction, peak_alerts
-                   FROM mta_daily_scores
-                   WHERE score_date = %s""",
-                (today,),
+    cur.execute(
+        """SELECT line_id, daily_score, breakdown, by_direction, peak_alerts
+           FROM mta_daily_scores
+           WHERE score_date = %s
+           FOR UPDATE""",
+        (today,),
+    )
+    rows = {
+        line_id: {"daily_score": score, "breakdown": bd, "by_direction": by_dir, "peak_alerts": peak}
+        for line_id, score, bd, by_dir, peak in cur.fetchall()
+    }
+    for cycle in cycles:
+        states = {l.id: l for l in cycle.lines}
+        for line_id in dict.fromkeys([*ALL_LINES, *states]):
+            state = states.get(line_id) or LineState(line_id)
+            row = rows.get(line_id)
+            if row is None:
+                # First entry for this line today
+                rows[line_id] = {
+                    "daily_score": state.score,
+                    "breakdown": state.breakdown.to_json(),
+                    "by_direction": state.by_direction_json(),
+                    "peak_alerts": state.alerts,
+                }
+                continue
+            row["daily_score"] += state.score
+            for cat, pts in state.breakdown.items():
+                add_to_breakdown(row["breakdown"], cat, pts)
+            for direction in DIRECTIONS:
+                dir_data = state.direction(direction)
+                merged = row["by_direction"].setdefault(direction, {"score": 0, "breakdown": {}})
+                merged["score"] = merged.get("score", 0) + dir_data.score
+                for cat, pts in dir_data.breakdown.items():
+                    add_to_breakdown(merged.setdefault("breakdown", {}), cat, pts)
+            # Peak alerts: keep the set with more alerts
+            if len(state.alerts) > len(row["peak_alerts"]):
+                row["peak_alerts"] = state.alerts
+
+    psycopg2.extras.execute_values(
+        cur,
+        """INSERT INTO mta_daily_scores AS d
+               (line_id, score_date, daily_score, breakdown, by_direction, peak_alerts)
+           VALUES %s
+           ON CONFLICT (line_id, score_date) DO UPDATE SET
+               daily_score = EXCLUDED.daily_score,
+               breakdown = EXCLUDED.breakdown,
+               by_direction = EXCLUDED.by_direction,
+               peak_alerts = EXCLUDED.peak_alerts,
+               updated_at = NOW()""",
+        [
+            (
+                line_id, today, row["daily_score"],
+                encoding.dumps_text(row["breakdown"]),
+                encoding.dumps_text(row["by_direction"]),
+                encoding.dumps_text(row["peak_alerts"]),
             )
-            existing = {row["line_id"]: row for row in cur.fetchall()}
-
-            for line_id in ALL_LINES:
-                ad = alerts_data.get(line_id, {})
-                snapshot_score = ad.get("score", 0)
-                snapshot_breakdown = ad.get("breakdown", {})
-                snapshot_by_dir = ad.get("by_direction", {
-                    "uptown": {"score": 0, "breakdown": {}},
-                    "downtown": {"score": 0, "breakdown": {}},
-                })
-                snapshot_alerts = ad.get("alerts", [])
-
-                if line_id in existing:
-                    row = existing[line_id]
-                    new_score = row["daily_score"] + snapshot_score
-
-                    # Merge breakdowns
-                    merged_bd = dict(row["breakdown"])
-                    for cat, pts in snapshot_breakdown.items():
-                        add_to_breakdown(merged_bd, cat, pts)
-
-                    # Merge by_direction
-                    merged_dir = dict(row["by_direction"])
-                    for direction in ("uptown", "downtown"):
-                        dir_data = snapshot_by_dir.get(direction, {"score": 0, "breakdown": {}})
-                        merged_dir.setdefault(direction, {"score": 0, "breakdown": {}})
-                        merged_dir[direction]["score"] = merged_dir[direction].get("score", 0) + dir_data.get("score", 0)
-                        for cat, pts in dir_data.get("breakdown", {}).items():
-                            merged_dir[direction].setdefault("breakdown", {})
-                            add_to_breakdown(merged_dir[direction]["breakdown"], cat, pts)
-
-                    # Peak alerts: keep the set with more alerts
-                    peak = row["peak_alerts"]
-                    if len(snapshot_alerts) > len(peak):
-                        peak = snapshot_alerts
+            for line_id, row in rows.items()
+        ],
+    )
+    return {line_id: row["daily_score"] for line_id, row in rows.items()}
 
-                    cur.execute(
-                        """UPDATE mta_daily_scores
-                           SET daily_score = %s, breakdown = %s, by_direction = %s,
-                               peak_alerts = %s, updated_at = NOW()
-                           WHERE line_id = %s AND score_date = %s""",
-                        (
-                            new_score,
-                            json.dumps(merged_bd),
-                            json.dumps(merged_dir),
-                            json.dumps(peak),
-                            line_id,
-                            today,
-                        ),
-                    )
+
+def _fold_leaderboards(cur, today: str, cycles: list[Cycle], daily_totals: dict[str, int]):
+    """Add the cycles to the open week / month / all-time rows (subway lines only).
+
+    Daily totals only grow, so the day's worst-day candidate is its final total.
+    """
+    from routes import ALL_LINES
+
+    scores = dict.fromkeys(ALL_LINES, 0)
+    for cycle in cycles:
+        for line in cycle.lines:
+            if line.id in scores:
+                scores[line.id] += line.score
+    keys = period_keys(today)
+    psycopg2.extras.execute_values(
+        cur,
+        """INSERT INTO mta_leaderboard AS lb
+               (period, period_key, line_id, total_score, worst_day, worst_day_score)
+           VALUES %s
+           ON CONFLICT (period, period_key, line_id) DO UPDATE SET
+               total_score = lb.total_score + EXCLUDED.total_score,
+               worst_day = CASE WHEN EXCLUDED.worst_day_score > lb.worst_day_score
+                                THEN EXCLUDED.worst_day ELSE lb.worst_day END,
+               worst_day_score = GREATEST(lb.worst_day_score, EXCLUDED.worst_day_score),
+               updated_at = NOW()
+           WHERE NOT lb.closed""",
+        [
+            (period, keys[period], line_id, score, today, daily_totals.get(line_id, 0))
+            for period in LEADERBOARD_PERIODS
+            for line_id, score in scores.items()
+        ],
+        template="(%s, %s, %s, %s, %s::date, %s)",
+    )
+
+
+def _fold_rollups(cur, cycles: list[Cycle]):
+    """Fold every cycle's per-line scores into each rollup resolution."""
+    agg: dict[tuple, list[int]] = {}  # (res, bucket, line) -> [max, sum, samples]
+    for cycle in cycles:
+        buckets = rollup_buckets(cycle.at)
+        for res in ROLLUP_RESOLUTIONS:
+            for line in cycle.lines:
+                a = agg.get((res, buckets[res], line.id))
+                if a is None:
+                    agg[(res, buckets[res], line.id)] = [line.score, line.score, 1]
                 else:
-                    # First entry for this line today
-                    peak = snapshot_alerts if snapshot_alerts else []
-                    cur.execute(
-                        """INSERT INTO mta_daily_scores
-                               (line_id, score_date, daily_score, breakdown, by_direction, peak_alerts)
-                           VALUES (%s, %s, %s, %s, %s, %s)""",
-                        (
-                            line_id,
-                            today,
-                            snapshot_score,
-                            json.dumps(snapshot_breakdown),
-                            json.dumps(snapshot_by_dir),
-                            json.dumps(peak),
-                        ),
-                    )
+                    a[0] = max(a[0], line.score)
+                    a[1] += line.score
+                    a[2] += 1
+    psycopg2.extras.execute_values(
+        cur,
+        """INSERT INTO mta_rollups
+               (resolution, bucket_start, line_id, max_score, sum_score, samples)
+           VALUES %s
+           ON CONFLICT (resolution, bucket_start, line_id) DO UPDATE SET
+               max_score = GREATEST(mta_rollups.max_score, EXCLUDED.max_score),
+               sum_score = mta_rollups.sum_score + EXCLUDED.sum_score,
+               samples = mta_rollups.samples + EXCLUDED.samples""",
+        [(*key, *a) for key, a in agg.items()],
+    )
+
+
+def _record_timeseries(cur, today: str, cycles: list[Cycle]):
+    """One point per 15-minute bucket: the first cycle in it wins."""
+    from routes import ALL_LINES
 
+    points = {}
+    for cycle in cycles:
+        if cycle.bucket not in points:
+            scores = {l.id: l.score for l in cycle.lines if l.id in ALL_LINES and l.score > 0}
+            points[cycle.bucket] = (today, cycle.bucket, encoding.dumps_text(scores), cycle.at)
+    psycopg2.extras.execute_values(
+        cur,
+        """INSERT INTO mta_timeseries (score_date, bucket, scores, captured_at)
+           VALUES %s
+           ON CONFLICT (score_date, bucket) DO NOTHING""",
+        list(points.values()),
+    )
 
-def record_timeseries(alerts_data: dict, today: str, bucket: str):
-    """Record a timeseries data point. Skips if bucket already exists."""
-    from mta import ALL_LINES
 
-    scores = {}
-    for line_id, data in alerts_data.items():
-        if line_id in ALL_LINES and data.get("score", 0) > 0:
-            scores[line_id] = data["score"]
+def apply_cycles(cycles: list[Cycle]) -> int | None:
+    """Fold ingest cycles into the cumulative tables, each exactly once.
 
+    Covers scores_history (via COPY), mta_daily_scores, mta_leaderboard,
+    mta_rollups and mta_timeseries, plus the day rollover. Cycles are applied
+    in order, one transaction per ET date; each transaction first claims its
+    cycle ids in mta_applied_cycles and skips any already there. Works the
+    same for the live cycle and for a backlog replayed from the WAL.
+
+    Returns how many cycles were newly applied, or None without a database.
+    """
+    with get_conn() as conn:
+        if conn is None:
+            return None
+        conn.autocommit = False
+        applied = 0
+        try:
+            with conn.cursor() as cur:
+                for today, group in groupby(cycles, key=lambda c: c.today):
+                    group = list(group)
+                    cur.execute(
+                        """INSERT INTO mta_applied_cycles (cycle_id, cycle_at)
+                           SELECT * FROM unnest(%s::text[], %s::timestamptz[])
+                           ON CONFLICT (cycle_id) DO NOTHING
+                           RETURNING cycle_id""",
+                        ([c.cycle_id for c in group], [c.at for c in group]),
+                    )
+                    new = {r[0] for r in cur.fetchall()}
+                    group = [c for c in group if c.cycle_id in new]
+                    if group:
+                        finished = _rollover_day(cur, today)
+                        if finished:
+                            log.info("Rolled over %s", finished)
+                        _copy_history(cur, group)
+                        totals = _fold_daily(cur, today, group)
+                        _fold_leaderboards(cur, today, group, totals)
+                        _fold_rollups(cur, group)
+                        _record_timeseries(cur, today, group)
+                    conn.commit()
+                    applied += len(group)
+                cur.execute(
+                    "DELETE FROM mta_applied_cycles WHERE cycle_at < NOW() - %s * INTERVAL '1 day'",
+                    (CYCLE_LEDGER_DAYS,),
+                )
+            conn.commit()
+            return applied
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if not conn.closed:
+                conn.autocommit = True
+
+
+def write_station_index(index: dict):
+    """Replace the stored station -> alerts/lines index."""
     with get_conn() as conn:
         if conn is None:
             return
         conn.autocommit = True
         with conn.cursor() as cur:
             cur.execute(
-                """INSERT INTO mta_timeseries (score_date, bucket, scores)
-                   VALUES (%s, %s, %s)
-                   ON CONFLICT (score_date, bucket) DO NOTHING""",
-                (today, bucket, json.dumps(scores)),
+                """INSERT INTO mta_station_index (id, stations, updated_at)
+                   VALUES (1, %s, NOW())
+                   ON CONFLICT (id) DO UPDATE SET
+                       stations = EXCLUDED.stations,
+                       updated_at = NOW()""",
+                (encoding.dumps_text(index),),
             )
 
 
-def write_history_rows(lines: list[dict]):
-    """Insert rows into scores_history (backward compat with /api/history)."""
+def record_ingest_cycle() -> int | None:
+    """Mark an ingest cycle complete and return its generation number."""
     with get_conn() as conn:
         if conn is None:
-            return
+            return None
         conn.autocommit = True
-        rows = [
-            (line["id"], line["score"], line["status"], line.get("trip_count", 0))
-            for line in lines
-        ]
         with conn.cursor() as cur:
-            psycopg2.extras.execute_values(
-                cur,
-                """INSERT INTO scores_history (line_id, score, status, trip_count)
-                   VALUES %s""",
-                rows,
-            )
+            cur.execute("SELECT nextval('mta_generation')")
+            return cur.fetchone()[0]
 
 
 # ---------------------------------------------------------------------------
 # Read helpers (used by Flask API)
 # ---------------------------------------------------------------------------
 
+def _fetch_passthrough(cur, json_columns: tuple[str, ...]) -> list[dict]:
+    """Rows as dicts, with the named columns (selected as ::text) wrapped in RawJSON.
+
+    Those values are spliced into API responses as-is, never parsed.
+    """
+    names = [d[0] for d in cur.description]
+    raw = [i for i, n in enumerate(names) if n in json_columns]
+    rows = []
+    for row in cur.fetchall():
+        row = list(row)
+        for i in raw:
+            row[i] = RawJSON(row[i])
+        rows.append(dict(zip(names, row)))
+    return rows
+
+
 def read_live_snapshot() -> list[dict]:
-    """Read the latest live snapshot for all lines."""
+    """Read the latest live snapshot for all lines (JSONB columns as RawJSON)."""
     with get_conn() as conn:
         if conn is None:
             return []
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("SELECT * FROM mta_live_snapshot ORDER BY line_id")
-            return [dict(row) for row in cur.fetchall()]
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT line_id, score, status, trip_count, updated_at,
+                          alerts::text AS alerts, breakdown::text AS breakdown,
+                          by_direction::text AS by_direction, metrics::text AS metrics
+                   FROM mta_live_snapshot ORDER BY line_id"""
+            )
+            return _fetch_passthrough(cur, ("alerts", "breakdown", "by_direction", "metrics"))
+
+
+def _select_daily_scores(cur, day: str) -> dict[str, dict]:
+    cur.execute(
+        """SELECT line_id, score_date, daily_score, updated_at,
+                  breakdown::text AS breakdown, by_direction::text AS by_direction,
+                  peak_alerts::text AS peak_alerts
+           FROM mta_daily_scores WHERE score_date = %s""",
+        (day,),
+    )
+    rows = _fetch_passthrough(cur, ("breakdown", "by_direction", "peak_alerts"))
+    return {row["line_id"]: row for row in rows}
+
+
+def _select_timeseries(cur, day: str) -> list[dict]:
+    cur.execute(
+        """SELECT bucket AS time, scores::text AS scores
+           FROM mta_timeseries
+           WHERE score_date = %s
+           ORDER BY bucket""",
+        (day,),
+    )
+    return _fetch_passthrough(cur, ("scores",))
 
 
 def read_daily_scores(today: str) -> dict[str, dict]:
-    """Read daily accumulated scores for all lines."""
+    """Read daily accumulated scores for all lines (JSONB columns as RawJSON)."""
     with get_conn() as conn:
         if conn is None:
             return {}
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(
-                "SELECT * FROM mta_daily_scores WHERE score_date = %s",
-                (today,),
-            )
-            return {row["line_id"]: dict(row) for row in cur.fetchall()}
+        with conn.cursor() as cur:
+            return _select_daily_scores(cur, today)
 
 
 def read_timeseries(today: str) -> list[dict]:
-    """Read timeseries buckets for today."""
+    """Read timeseries buckets for today (scores as RawJSON)."""
     with get_conn() as conn:
         if conn is None:
             return []
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        with conn.cursor() as cur:
+            return _select_timeseries(cur, today)
+
+
+def read_day_archive(day: str) -> tuple[bytes, str] | None:
+    """Return a sealed day's (JSON body, etag), or None if it isn't sealed."""
+    with get_conn() as conn:
+        if conn is None:
+            return None
+        with conn.cursor() as cur:
             cur.execute(
-                """SELECT bucket AS time, scores
-                   FROM mta_timeseries
-                   WHERE score_date = %s
-                   ORDER BY bucket""",
-                (today,),
+                "SELECT body, etag FROM mta_day_archives WHERE score_date = %s",
+                (day,),
             )
-            return [dict(row) for row in cur.fetchall()]
+            row = cur.fetchone()
+            return (bytes(row[0]), row[1]) if row else None
+
+
+def read_station_index() -> dict[str, dict]:
+    """Read the station index written by the last ingest cycle."""
+    with get_conn() as conn:
+        if conn is None:
+            return {}
+        with conn.cursor() as cur:
+            cur.execute("SELECT stations FROM mta_station_index WHERE id = 1")
+            row = cur.fetchone()
+            return row[0] if row else {}
+
+
+def read_rollups(resolution: str, since: datetime) -> dict[str, list[dict]]:
+    """Read one rollup resolution from `since` onward, grouped by line."""
+    with get_conn() as conn:
+        if conn is None:
+            return {}
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT line_id, bucket_start, max_score, sum_score, samples
+                   FROM mta_rollups
+                   WHERE resolution = %s AND bucket_start >= %s
+                   ORDER BY line_id, bucket_start""",
+                (resolution, since),
+            )
+            series: dict[str, list[dict]] = {}
+            for line_id, bucket_start, max_score, sum_score, samples in cur.fetchall():
+                series.setdefault(line_id, []).append({
+                    "t": bucket_start.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "max": max_score,
+                    "mean": round(sum_score / samples, 1) if samples else 0,
+                    "sum": sum_score,
+                })
+            return series
+
+
+def read_leaderboard(period: str, period_key: str) -> dict:
+    """Read one leaderboard (all lines, worst first) and whether it is closed."""
+    with get_conn() as conn:
+        if conn is None:
+            return {"closed": False, "lines": []}
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT line_id, total_score, worst_day, worst_day_score, days_won, closed
+                   FROM mta_leaderboard
+                   WHERE period = %s AND period_key = %s
+                   ORDER BY total_score DESC, line_id""",
+                (period, period_key),
+            )
+            rows = cur.fetchall()
+    return {
+        "closed": bool(rows) and all(r[5] for r in rows),
+        "lines": [
+            {
+                "id": line_id,
+                "total_score": total,
+                "worst_day": worst_day.isoformat() if worst_day else None,
+                "worst_day_score": worst_score,
+                "days_won": days_won,
+            }
+            for line_id, total, worst_day, worst_score, days_won, _ in rows
+        ],
+    }
+
+
+def read_generation() -> int:
+    """Return the generation of the most recent completed ingest cycle (0 if none)."""
+    with get_conn() as conn:
+        if conn is None:
+            return 0
+        with conn.cursor() as cur:
+            # last_value is shared across sessions; is_called is false until
+            # the first nextval
+            cur.execute("SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM mta_generation")
+            row = cur.fetchone()
+            return row[0] if row else 0
 
 
 def read_last_ingest_time() -> datetime | None:
@@ -389,56 +937,86 @@ def read_last_ingest_time() -> datetime | None:
             return row[0] if row and row[0] else None
 
 
-def read_history(hours: int = 72) -> dict:
-    """Read score history for /api/history endpoint."""
+def read_history(hours: int = 72, resolution: str | None = None) -> dict:
+    """Read score history for /api/history endpoint.
+
+    With a rollup resolution ("15m" or "1h"), each line's points are the max
+    score per bucket (stamped with the bucket start), read from mta_rollups
+    rather than aggregated from scores_history.
+    """
     with get_conn() as conn:
         if conn is None:
             return {"history": {}, "records": {}}
         try:
-            cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
-            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute(
-                    """SELECT line_id,
-                              captured_at AT TIME ZONE 'UTC' AS t,
-                              score
-                       FROM scores_history
-                       WHERE captured_at >= %s
-                       ORDER BY line_id, captured_at ASC""",
-                    (cutoff,),
-                )
+            now = datetime.now(timezone.utc)
+            cutoff = now - timedelta(hours=hours)
+            # Timestamps are formatted by Postgres and rows come back as plain
+            # tuples: no per-row datetime or dict objects on 100k-row windows.
+            with conn.cursor() as cur:
+                if resolution:
+                    # Starting from the bucket the cutoff falls in, as the raw
+                    # window's first points would be
+                    cur.execute(
+                        """SELECT line_id,
+                                  to_char(bucket_start AT TIME ZONE 'UTC',
+                                          'YYYY-MM-DD"T"HH24:MI:SS"Z"') AS t,
+                                  max_score
+                           FROM mta_rollups
+                           WHERE resolution = %s AND bucket_start >= %s
+                           ORDER BY line_id, bucket_start""",
+                        (resolution, rollup_buckets(cutoff.astimezone(ET))[resolution]),
+                    )
+                else:
+                    cur.execute(
+                        """SELECT line_id,
+                                  to_char(captured_at AT TIME ZONE 'UTC',
+                                          'YYYY-MM-DD"T"HH24:MI:SS"Z"') AS t,
+                                  score
+                           FROM scores_history
+                           WHERE captured_at >= %s
+                           ORDER BY line_id, captured_at ASC""",
+                        (cutoff,),
+                    )
                 rows = cur.fetchall()
 
+                # Latest score per line: one probe of (line_id, captured_at)
+                # per line, rather than DISTINCT ON over the whole table
                 cur.execute(
-                    """SELECT DISTINCT ON (line_id)
-                           line_id, score AS current_score
-                       FROM scores_history
-                       ORDER BY line_id, captured_at DESC""",
+                    """WITH RECURSIVE latest AS (
+                           (SELECT line_id, score FROM scores_history
+                            ORDER BY line_id, captured_at DESC LIMIT 1)
+                           UNION ALL
+                           SELECT s.line_id, s.score
+                           FROM latest l
+                           CROSS JOIN LATERAL (
+                               SELECT line_id, score FROM scores_history
+                               WHERE line_id > l.line_id
+                               ORDER BY line_id, captured_at DESC LIMIT 1) s
+                       )
+                       SELECT line_id, score AS current_score FROM latest""",
                 )
                 current_rows = cur.fetchall()
 
             if rows:
-                oldest = min(r["t"] for r in rows)
-                days_back = max(1, int((datetime.now(timezone.utc) - oldest).total_seconds() / 86400) + 1)
+                # ISO strings in one format sort chronologically
+                oldest = datetime.strptime(min(r[1] for r in rows), "%Y-%m-%dT%H:%M:%SZ")
+                oldest = oldest.replace(tzinfo=timezone.utc)
+                days_back = max(1, int((now - oldest).total_seconds() / 86400) + 1)
             else:
                 days_back = 0
 
             history: dict = {}
-            for row in rows:
-                lid = row["line_id"]
-                history.setdefault(lid, []).append({
-                    "t": row["t"].strftime("%Y-%m-%dT%H:%M:%SZ"),
-                    "score": row["score"],
-                })
-
-            current_scores = {r["line_id"]: r["current_score"] for r in current_rows}
             max_in_window: dict = {}
-            for row in rows:
-                lid = row["line_id"]
-                if lid not in max_in_window or row["score"] > max_in_window[lid]["worst_score"]:
-                    max_in_window[lid] = {
-                        "worst_score": row["score"],
-                        "worst_at": row["t"].strftime("%Y-%m-%dT%H:%M:%SZ"),
-                    }
+            for lid, t, score in rows:
+                points = history.get(lid)
+                if points is None:
+                    points = history[lid] = []
+                points.append({"t": t, "score": score})
+                worst = max_in_window.get(lid)
+                if worst is None or score > worst["worst_score"]:
+                    max_in_window[lid] = {"worst_score": score, "worst_at": t}
+
+            current_scores = dict(current_rows)
 
             records: dict = {}
             for lid, curr in current_scores.items():
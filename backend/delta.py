@@ -0,0 +1,113 @@
+"""Generation-to-generation patches of the /api/status document.
+
+Pure module — no DB, no Flask. The API records a diff every time it rebuilds
+the status document for a new ingest generation; clients polling with
+`?since=<gen>` get the merged diffs instead of the full document.
+
+Patch shape (every key optional except generation/since/timestamp):
+
+    {
+        "generation": 812, "since": 810, "timestamp": "...",
+        "lines": {"F": {...full line...}},   # changed line objects
+        "order": ["F", "A", ...],            # new ranking, if it moved
+        "podium": ["F", "A", "C"],           # podium ids, if they moved
+        "winner": "F",                        # winner id (or None), if it moved
+        "timeseries": [{"time": "08:15", "scores": {...}}],  # new/changed buckets
+    }
+"""
+
+import threading
+from collections import deque
+
+# How many generations of patches to keep. At one cycle a minute this covers
+# an hour; clients further behind get the full document.
+DELTA_HISTORY = 60
+
+
+def _ids(lines: list[dict]) -> list[str]:
+    return [l["id"] for l in lines]
+
+
+def diff_status(prev: dict, new: dict) -> dict | None:
+    """Changes from `prev` to `new`, or None if they can't be patched (new day)."""
+    if prev.get("date") != new.get("date"):
+        return None
+
+    patch: dict = {}
+    old_lines = {l["id"]: l for l in prev["lines"]}
+    changed = {l["id"]: l for l in new["lines"] if old_lines.get(l["id"]) != l}
+    if changed:
+        patch["lines"] = changed
+
+    order = _ids(new["lines"])
+    if order != _ids(prev["lines"]):
+        patch["order"] = order
+    podium = _ids(new["podium"])
+    if podium != _ids(prev["podium"]):
+        patch["podium"] = podium
+    winner = new["winner"]["id"] if new["winner"] else None
+    if winner != (prev["winner"]["id"] if prev["winner"] else None):
+        patch["winner"] = winner
+
+    old_buckets = {b["time"]: b["scores"] for b in prev["timeseries"]}
+    buckets = [b for b in new["timeseries"] if old_buckets.get(b["time"]) != b["scores"]]
+    if buckets:
+        patch["timeseries"] = buckets
+    return patch
+
+
+def _merge(into: dict, patch: dict):
+    """Fold a later patch into an earlier one, in place."""
+    if "lines" in patch:
+        into.setdefault("lines", {}).update(patch["lines"])
+    for key in ("order", "podium", "winner"):
+        if key in patch:
+            into[key] = patch[key]
+    if "timeseries" in patch:
+        buckets = {b["time"]: b for b in into.get("timeseries", [])}
+        buckets.update((b["time"], b) for b in patch["timeseries"])
+        into["timeseries"] = sorted(buckets.values(), key=lambda b: b["time"])
+
+
+class DeltaLog:
+    """Bounded ring of (from_gen, to_gen, patch) entries for one process."""
+
+    def __init__(self, maxlen: int = DELTA_HISTORY):
+        self._ring: deque = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, prev: dict | None, new: dict):
+        """Diff two consecutive documents; a non-patchable pair clears the ring."""
+        if not prev or prev.get("generation") == new.get("generation"):
+            return
+        patch = diff_status(prev, new)
+        with self._lock:
+            if patch is None:
+                self._ring.clear()
+            else:
+                self._ring.append((prev["generation"], new["generation"], patch))
+
+    def since(self, gen: int, current: dict) -> dict | None:
+        """Merged patch from `gen` up to `current`, or None if out of range.
+
+        Only exact generation boundaries we recorded are patchable: a client
+        holding some other generation could miss a value that changed and
+        changed back, so it gets the full document instead.
+        """
+        patch: dict = {
+            "generation": current.get("generation"),
+            "since": gen,
+            "timestamp": current["timestamp"],
+        }
+        if gen == current.get("generation"):
+            return patch
+        with self._lock:
+            entries = list(self._ring)
+        for i, (from_gen, _, _) in enumerate(entries):
+            if from_gen == gen:
+                break
+        else:
+            return None
+        for _, _, p in entries[i:]:
+            _merge(patch, p)
+        return patch
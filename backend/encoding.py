@@ -0,0 +1,124 @@
+"""Serialisation for DB writes and API responses.
+
+JSON goes through orjson when it is installed, with the stdlib as fallback.
+MessagePack is offered to clients that ask for it via the Accept header (or
+?format=); without the `msgpack` package every request is answered as JSON.
+
+`RawJSON` wraps JSON text read straight from a JSONB column. The JSON
+encoders splice it into the output verbatim instead of parsing and
+re-serialising it; other consumers can use `.value` to get the parsed object.
+Objects with a `to_json()` method (the ingest records in model.py) are
+converted to their stored shape as they are encoded.
+
+No Flask dependency.
+"""
+
+import json
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = hasattr(orjson, "Fragment")
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+# Accept values clients send for MessagePack in the wild
+_MSGPACK_TYPES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+
+class RawJSON:
+    """Already-encoded JSON text, e.g. a JSONB column selected as ::text."""
+
+    __slots__ = ("text", "_value")
+
+    def __init__(self, text: str):
+        self.text = text
+        self._value = _MISSING
+
+    @property
+    def value(self):
+        if self._value is _MISSING:
+            self._value = loads(self.text)
+        return self._value
+
+    def __eq__(self, other):
+        if isinstance(other, RawJSON):
+            return self.text == other.text or self.value == other.value
+        return self.value == other
+
+    def __repr__(self):
+        return f"RawJSON({self.text[:40]!r})"
+
+
+_MISSING = object()
+
+
+def _unserializable(obj) -> TypeError:
+    # Callers format dates, decimals etc. themselves; anything else reaching
+    # the encoder is a bug that should fail loudly, not ship as str(obj).
+    return TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _default(obj):
+    if isinstance(obj, RawJSON):
+        return orjson.Fragment(obj.text) if ORJSON_AVAILABLE else obj.value
+    if hasattr(obj, "to_json"):  # model.py records
+        return obj.to_json()
+    raise _unserializable(obj)
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, RawJSON):
+        return obj.value
+    if hasattr(obj, "to_json"):
+        return obj.to_json()
+    raise _unserializable(obj)
+
+
+def dumps(obj, sort_keys: bool = True) -> bytes:
+    """Compact JSON bytes; sorted keys match Flask's jsonify output."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            obj, default=_default, option=orjson.OPT_SORT_KEYS if sort_keys else 0
+        )
+    return json.dumps(
+        obj, separators=(",", ":"), sort_keys=sort_keys, default=_default
+    ).encode()
+
+
+def dumps_text(obj) -> str:
+    """JSON as str, for psycopg2 JSONB parameters (key order irrelevant)."""
+    return dumps(obj, sort_keys=False).decode()
+
+
+def loads(data):
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def negotiate(accept_mimetypes, fmt: str | None = None) -> str:
+    """Pick JSON or MSGPACK from a werkzeug MIMEAccept and optional ?format=."""
+    if not MSGPACK_AVAILABLE:
+        return JSON
+    if fmt is not None:
+        return MSGPACK if fmt.lower() in ("msgpack", "mpk") else JSON
+    best = accept_mimetypes.best_match((JSON,) + _MSGPACK_TYPES, default=JSON)
+    return MSGPACK if best in _MSGPACK_TYPES else JSON
+
+
+def encode(obj, mimetype: str) -> bytes:
+    """Serialise a response body in the negotiated format."""
+    if mimetype == MSGPACK:
+        return msgpack.packb(obj, use_bin_type=True, default=_msgpack_default)
+    return dumps(obj)
@@ -0,0 +1,158 @@
+"""Feed registry: which GTFS-realtime feeds ingest polls, and how.
+
+Standard library only. The built-in registry is the NYCT subway (one alerts
+feed, nine trip feeds). FEED_REGISTRY_FILE names a JSON file that adds feeds
+for other agencies, or replaces a built-in feed with the same name:
+
+    {"feeds": [
+        {"name": "lirr-alerts", "agency": "lirr", "kind": "alerts",
+         "url": "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/camsys%2Flirr-alerts",
+         "accept_unmapped": true, "interval": 120}
+    ]}
+
+Per-feed fields: `routes` maps feed route ids to route names (unlisted ids
+are dropped unless `accept_unmapped`), `interval` is the minimum seconds
+between polls (0 = every cycle), `stop_times` feeds NYCT platform arrivals
+into headway analysis. Scores are keyed by `routes.line_key(agency, route)`.
+"""
+
+import json
+import logging
+import os
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+from routes import ALL_LINES, DEFAULT_AGENCY, line_key
+
+log = logging.getLogger(__name__)
+
+FEED_REGISTRY_FILE = os.environ.get("FEED_REGISTRY_FILE")
+
+KINDS = ("alerts", "trips")
+
+# ---------------------------------------------------------------------------
+# Built-in NYCT subway feeds
+# ---------------------------------------------------------------------------
+
+_MTA_FEEDS = "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/"
+
+ROUTE_NORMALIZE = {
+    "GS": "S", "FS": "S", "H": "S",
+    "SI": "SI", "SIR": "SI",
+    "5X": "5", "6X": "6", "7X": "7", "FX": "F",
+}
+
+SUBWAY_ROUTES = {**{line: line for line in ALL_LINES}, **ROUTE_NORMALIZE}
+
+# One trip feed per trunk-line group: 1-6 + shuttle, ACE, BDFM, G, JZ, L, NQRW, SIR, 7
+_SUBWAY_TRIP_FEEDS = (
+    "gtfs", "gtfs-ace", "gtfs-bdfm", "gtfs-g", "gtfs-jz",
+    "gtfs-l", "gtfs-nqrw", "gtfs-si", "gtfs-7",
+)
+
+
+class Feed(NamedTuple):
+    name: str
+    agency: str
+    kind: str                      # "alerts" or "trips"
+    url: str
+    routes: dict[str, str]         # feed route_id -> route name
+    accept_unmapped: bool = False  # keep route ids missing from `routes` as-is
+    interval: int = 0              # min seconds between polls; 0 = every cycle
+    stop_times: bool = False       # NYCT platform arrivals for headway analysis
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.url).netloc
+
+    def line_key(self, route_id: str) -> str | None:
+        """Storage key for a feed route id, or None if the feed ignores it."""
+        route = self.routes.get(route_id)
+        if route is None:
+            if not (self.accept_unmapped and route_id):
+                return None
+            route = route_id
+        return line_key(self.agency, route)
+
+
+DEFAULT_FEEDS = [
+    Feed("subway-alerts", DEFAULT_AGENCY, "alerts",
+         _MTA_FEEDS + "camsys%2Fsubway-alerts", SUBWAY_ROUTES),
+] + [
+    Feed(f"nyct-{path}", DEFAULT_AGENCY, "trips",
+         _MTA_FEEDS + "nyct%2F" + path, SUBWAY_ROUTES, stop_times=True)
+    for path in _SUBWAY_TRIP_FEEDS
+]
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+def _parse_feed(entry: dict) -> Feed:
+    if entry.get("kind") not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    agency = entry.get("agency", DEFAULT_AGENCY)
+    routes = entry.get("routes")
+    if routes is None:
+        routes = SUBWAY_ROUTES if agency == DEFAULT_AGENCY else {}
+    return Feed(
+        name=entry["name"],
+        agency=agency,
+        kind=entry["kind"],
+        url=entry["url"],
+        routes={str(k): str(v) for k, v in routes.items()},
+        accept_unmapped=bool(entry.get("accept_unmapped", False)),
+        interval=int(entry.get("interval", 0)),
+        stop_times=bool(entry.get("stop_times", False)) and agency == DEFAULT_AGENCY,
+    )
+
+
+def load_registry(path: str | None = FEED_REGISTRY_FILE) -> list[Feed]:
+    """Built-in feeds plus (or overridden by) the entries in `path`."""
+    by_name = {f.name: f for f in DEFAULT_FEEDS}
+    if not path:
+        return list(by_name.values())
+    try:
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)["feeds"]
+    except Exception as e:
+        log.warning("Failed to load feed registry %s: %s", path, e)
+        return list(by_name.values())
+    for entry in entries:
+        try:
+            feed = _parse_feed(entry)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            log.warning("Skipping feed %s in %s: %s", entry.get("name", "?"), path, e)
+            continue
+        by_name[feed.name] = feed
+    feeds = list(by_name.values())
+    log.info(
+        "Feed registry: %d feeds across %d agencies",
+        len(feeds), len({f.agency for f in feeds}),
+    )
+    return feeds
+
+
+_registry: list[Feed] | None = None
+
+
+def registry() -> list[Feed]:
+    """The process-wide registry, loaded once."""
+    global _registry
+    if _registry is None:
+        _registry = load_registry()
+    return _registry
+
+
+def known_lines(feeds: list[Feed] | None = None) -> list[str]:
+    """Every line key the registry maps explicitly: the subway first, in order."""
+    keys = dict.fromkeys(ALL_LINES)
+    extra = {
+        feed.line_key(rid)
+        for feed in feeds or registry()
+        if feed.agency != DEFAULT_AGENCY
+        for rid in feed.routes
+    }
+    keys.update(dict.fromkeys(sorted(extra)))
+    return list(keys)
@@ -0,0 +1,25 @@
+"""gunicorn settings and hooks for subway-shame.
+
+Bind, workers and threads still come from the command line. With
+RUN_INGEST=process the master also supervises an `ingest.py` child (see
+supervisor.py) instead of each worker running ingest on a thread.
+"""
+
+import os
+
+from supervisor import IngestSupervisor
+
+_ingest: IngestSupervisor | None = None
+
+
+def when_ready(server):
+    global _ingest
+    if os.environ.get("RUN_INGEST", "").lower() == "process":
+        _ingest = IngestSupervisor()
+        _ingest.start()
+        server.log.info("Supervising ingest process (RUN_INGEST=process)")
+
+
+def on_exit(server):
+    if _ingest is not None:
+        _ingest.stop()
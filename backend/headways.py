@@ -0,0 +1,197 @@
+"""Headway and measured-delay analysis from trip-update stop times.
+
+Pure computation module — no network, no DB, no Flask. `mta.fetch_trip_data`
+produces a `StopTimes` batch; `analyze` turns it into per-line metrics and a
+"Measured Delay" score that ingest folds into the line score.
+
+Everything is vectorised over the whole batch: one lexsort groups arrivals by
+(route, direction, stop), one diff yields every observed headway, and per-line
+aggregates come from bincount and sorted-run indexing, not Python loops.
+
+Only `analyze` runs in milliseconds, about 3ms for a full system cycle of
+~60k stop times. Building the batch is not vectorised: mta._collect_trips
+reads each stop_time_update through protobuf in a Python loop, about 50-85ms
+per cycle (see benchmarks/bench_headways.py).
+"""
+
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+
+from model import DIRECTIONS, LineState
+from routes import ALL_LINES
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+MEASURED_DELAY = "Measured Delay"
+
+# Nominal off-peak headways (seconds) from the published NYCT timetables.
+# Peak and overnight service scale from these (see scheduled_headways).
+SCHEDULED_HEADWAY_SECONDS = {
+    "1": 360, "2": 480, "3": 480, "4": 480, "5": 480, "6": 360, "7": 360,
+    "A": 480, "C": 600, "E": 480, "B": 600, "D": 600, "F": 480, "M": 600,
+    "N": 600, "Q": 480, "R": 600, "W": 600, "G": 600, "J": 600, "Z": 600,
+    "L": 360, "S": 300, "SI": 1800,
+}
+
+PEAK_FACTOR = 0.6        # weekday 6-10am and 4-8pm run ~40% more often
+OVERNIGHT_HEADWAY = 1200  # midnight-6am: every line runs about every 20 min
+
+# Only predicted arrivals inside this window count; the tail of every feed is
+# sparse and would read as huge gaps.
+HORIZON_SECONDS = 30 * 60
+
+GAP_FACTOR = 2.0         # headway >= 2x schedule counts as a service gap
+BUNCH_FACTOR = 0.25      # headway <= 1/4 schedule counts as bunched trains
+MIN_HEADWAYS = 8         # fewer observations than this and we don't score
+POINTS_PER_MINUTE = 5    # score per minute of mean excess wait
+MAX_POINTS = 50          # never outweigh a full suspension
+
+
+class StopTimes(NamedTuple):
+    """Flat arrays of predicted arrivals, one element per stop_time_update.
+
+    `route` indexes ALL_LINES, `direction` indexes model.DIRECTIONS (0 for
+    N-bound stops, 1 for S-bound), `stop` indexes `stops` (parent stop ids,
+    N/S suffix stripped), `arrival` is epoch seconds.
+    """
+
+    route: np.ndarray      # int16
+    direction: np.ndarray  # int8
+    stop: np.ndarray       # int32
+    arrival: np.ndarray    # int64
+    stops: list[str]
+
+    @classmethod
+    def empty(cls) -> "StopTimes":
+        return cls(
+            np.empty(0, np.int16), np.empty(0, np.int8),
+            np.empty(0, np.int32), np.empty(0, np.int64), [],
+        )
+
+    def __len__(self) -> int:
+        return len(self.arrival)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def scheduled_headways(when: datetime) -> np.ndarray:
+    """Scheduled headway (seconds) per ALL_LINES index at an ET wall time."""
+    base = np.array([SCHEDULED_HEADWAY_SECONDS[l] for l in ALL_LINES], np.float64)
+    hour = when.hour
+    if hour < 6:
+        return np.maximum(base, OVERNIGHT_HEADWAY)
+    if when.weekday() < 5 and (6 <= hour < 10 or 16 <= hour < 20):
+        return base * PEAK_FACTOR
+    return base
+
+
+def _headways(st: StopTimes, now: float) -> tuple[np.ndarray, np.ndarray]:
+    """Return (group, headway) for every consecutive arrival pair.
+
+    group = route * 2 + direction, so it can be split back out with divmod.
+    """
+    keep = (st.arrival >= now) & (st.arrival <= now + HORIZON_SECONDS)
+    group = st.route[keep].astype(np.int64) * 2 + st.direction[keep]
+    stop = st.stop[keep]
+    arrival = st.arrival[keep]
+
+    order = np.lexsort((arrival, stop, group))
+    group, stop, arrival = group[order], stop[order], arrival[order]
+
+    same = (group[1:] == group[:-1]) & (stop[1:] == stop[:-1])
+    headway = np.diff(arrival)[same]
+    # Two trips predicted at the same second are a feed artefact, not a bunch.
+    valid = headway > 0
+    return group[1:][same][valid], headway[valid].astype(np.float64)
+
+
+# ---------------------------------------------------------------------------
+# Analysis
+# ---------------------------------------------------------------------------
+
+def analyze(st: StopTimes, now: float, scheduled: np.ndarray) -> dict[str, dict]:
+    """Compute per-line headway metrics and measured-delay points.
+
+    `scheduled` is the per-line baseline from `scheduled_headways`. Returns a
+    dict keyed by line id; lines with no observations get zeroed metrics.
+    """
+    n_groups = len(ALL_LINES) * 2
+    group, headway = _headways(st, now)
+    baseline = np.repeat(scheduled, 2)[group]
+
+    count = np.bincount(group, minlength=n_groups)
+    total = np.bincount(group, weights=headway, minlength=n_groups)
+    excess = np.bincount(
+        group, weights=np.maximum(headway - baseline, 0), minlength=n_groups
+    )
+    gaps = np.bincount(group, weights=headway >= baseline * GAP_FACTOR, minlength=n_groups)
+    bunched = np.bincount(group, weights=headway <= baseline * BUNCH_FACTOR, minlength=n_groups)
+
+    # Max and median need sorted groups: sort by (group, headway), then index
+    # each group's run directly.
+    order = np.lexsort((headway, group))
+    sorted_hw = headway[order]
+    starts = np.concatenate(([0], np.cumsum(count)[:-1]))
+    present = count > 0
+    max_hw = np.zeros(n_groups)
+    median_hw = np.zeros(n_groups)
+    max_hw[present] = sorted_hw[starts[present] + count[present] - 1]
+    median_hw[present] = sorted_hw[starts[present] + (count[present] - 1) // 2]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_excess = np.where(count > 0, excess / count, 0.0)
+    points = np.where(
+        count >= MIN_HEADWAYS,
+        np.minimum(np.round(mean_excess / 60 * POINTS_PER_MINUTE), MAX_POINTS),
+        0,
+    )
+
+    result: dict[str, dict] = {}
+    for i, line_id in enumerate(ALL_LINES):
+        by_direction = {}
+        for d, name in enumerate(DIRECTIONS):
+            g = i * 2 + d
+            by_direction[name] = {
+                "headways": int(count[g]),
+                "median_headway": int(median_hw[g]),
+                "max_headway": int(max_hw[g]),
+                "excess_wait": int(round(mean_excess[g])),
+                "gaps": int(gaps[g]),
+                "bunched": int(bunched[g]),
+                "score": int(points[g]),
+            }
+        up, down = by_direction["uptown"], by_direction["downtown"]
+        n = up["headways"] + down["headways"]
+        result[line_id] = {
+            "scheduled_headway": int(scheduled[i]),
+            "headways": n,
+            "mean_headway": int(round((total[i * 2] + total[i * 2 + 1]) / n)) if n else 0,
+            "max_headway": max(up["max_headway"], down["max_headway"]),
+            "gaps": up["gaps"] + down["gaps"],
+            "bunched": up["bunched"] + down["bunched"],
+            # Line score is the mean of both directions so a one-way meltdown
+            # still registers but can't double the number.
+            "score": int(round((up["score"] + down["score"]) / 2)),
+            "by_direction": by_direction,
+        }
+    return result
+
+
+def apply_measured_delay(alerts_data: dict[str, LineState], metrics: dict[str, dict]):
+    """Fold measured-delay points into fetch_alerts output, in place."""
+    for line_id, m in metrics.items():
+        state = alerts_data.get(line_id)
+        if state is None or not m["score"]:
+            continue
+        state.score += m["score"]
+        state.breakdown.add(MEASURED_DELAY, m["score"])
+        for d in DIRECTIONS:
+            pts = m["by_direction"][d]["score"]
+            if pts:
+                state.direction(d).add(MEASURED_DELAY, int(round(pts / 2)))
@@ -3,19 +3,36 @@
 Polls MTA feeds on a fixed cadence and writes all state to Postgres.
 Can run standalone (`python ingest.py`) or as a background thread.
 
-No Flask dependency — this module only uses mta.py and db.py.
+Each cycle fetches and scores the feeds (mta, feeds, model), measures
+headways (headways) and rebuilds the station index (stations), then folds
+everything into Postgres (db). Cycles Postgres can't take wait in a local
+write-ahead log (wal). Last, it publishes the files the web workers serve:
+the status snapshot (status, snapshot) and the share card (og_image).
+
+No Flask dependency.
 """
 
 import logging
+import os
 import signal
 import sys
 import threading
 import time
+import uuid
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-from mta import ALL_LINES, fetch_alerts, fetch_trip_counts, status_label
+from model import Alert, Cycle, LineState
+from mta import fetch_alerts, fetch_trip_data, status_label
+from wal import WriteAheadLog
 import db
+import feeds
+import headways
+import og_image
+import snapshot
+import stations
+from status import build_status_document
+from trip_feed import TripCount
 
 logging.basicConfig(
     level=logging.INFO,
@@ -30,42 +47,155 @@ INGEST_INTERVAL = int(
 
 ET = ZoneInfo("America/New_York")
 
+# Set by supervisor.py when gunicorn runs us as a child process; if the
+# master goes away without signalling us, we exit instead of ingesting forever.
+_PARENT_PID = int(os.environ.get("INGEST_PARENT_PID", "0"))
+
 _shutdown = threading.Event()
 
+# Cycles Postgres didn't take, waiting to be replayed
+_wal = WriteAheadLog()
+
+
+def _apply(cycles: list[Cycle]):
+    if db.apply_cycles(cycles) is None:
+        raise ConnectionError("no database connection")
+
+
+def _quarantine(record: dict, what: str, error: Exception):
+    try:
+        log.warning("Quarantined %s (%s): %s", what, error, _wal.quarantine(record))
+    except OSError as e:
+        log.warning("Failed to quarantine %s (%s): %s", what, error, e)
+
+
+def _clear_wal():
+    try:
+        _wal.clear()
+    except OSError as e:
+        log.warning("Failed to clear buffered cycles: %s", e)
+
+
+def _replay(backlog: list[Cycle]) -> bool:
+    """Apply buffered cycles one at a time, quarantining any that fail.
+
+    Returns False, leaving the rest buffered, if the database goes away
+    part way through.
+    """
+    for old in backlog:
+        try:
+            _apply([old])
+        except Exception as e:
+            if not db.ping():
+                log.warning("Database went away while replaying buffered cycles: %s", e)
+                return False
+            _quarantine(old.to_json(), f"buffered cycle {old.cycle_id}", e)
+    return True
+
+
+def _fold_cycle(cycle: Cycle):
+    """Apply the buffered backlog and this cycle; buffer this cycle on failure.
+
+    Backlog records that can't be decoded, or that fail to apply while the
+    database is up, are quarantined, so a bad record can't hold up the live
+    cycle or keep the buffer growing. Buffered cycles always go in before the
+    live one, oldest first: the live cycle may roll the day over, which seals
+    the previous day's archive and awards it.
+    """
+    try:
+        records = _wal.records()
+    except OSError as e:
+        log.warning("Failed to read buffered cycles: %s", e)
+        records = []
+    backlog = []
+    for record in records:
+        try:
+            backlog.append(Cycle.from_json(record))
+        except Exception as e:
+            _quarantine(record, "undecodable buffered cycle", e)
+    backlog.sort(key=lambda c: c.at)
+
+    error = None
+    try:
+        _apply([*backlog, cycle])
+    except Exception as e:
+        error = e
+    if error is not None and backlog and db.ping():
+        # The database is up, so a buffered cycle is at fault
+        log.warning("Buffered cycles failed to apply (%s); replaying them one at a time", error)
+        if _replay(backlog):
+            log.info("Replayed %d buffered cycles", len(backlog))
+            _clear_wal()
+            records = []
+            try:
+                _apply([cycle])
+                error = None
+            except Exception as e:
+                error = e
+    if error is not None:
+        if db.db_available():
+            pending = (len(backlog) if records else 0) + 1
+            log.warning("Failed to apply cycle, buffering (%d pending): %s", pending, error)
+            try:
+                _wal.append(cycle.to_json())
+            except Exception as e:
+                log.warning("Failed to buffer cycle: %s", e)
+        else:
+            log.warning("Failed to apply cycle: %s", error)
+        return
+    if records:
+        log.info("Replayed %d buffered cycles", len(backlog))
+        _clear_wal()
+
 
 def run_once():
     """Execute a single ingest cycle: fetch → compute → write."""
     start = time.monotonic()
 
     # 1. Fetch raw data from MTA
-    alerts_data = fetch_alerts()
-    trip_counts = fetch_trip_counts()
+    station_alerts: dict[str, list[Alert]] = {}
+    alerts_data = fetch_alerts(station_alerts)
+    trip_counts, stop_times = fetch_trip_data()
+    et_now = datetime.now(ET)
+
+    # 1b. Measure real headways and fold the delay component into line scores
+    t0 = time.monotonic()
+    metrics = headways.analyze(
+        stop_times, time.time(), headways.scheduled_headways(et_now)
+    )
+    headways.apply_measured_delay(alerts_data, metrics)
+    log.info(
+        "Headway analysis: %d stop times in %.1fms",
+        len(stop_times),
+        (time.monotonic() - t0) * 1000,
+    )
+
+    # 1c. Station index: stop -> active alerts and serving lines
+    try:
+        db.write_station_index(stations.build_index(station_alerts, stop_times))
+    except Exception as e:
+        log.warning("Failed to write station index: %s", e)
 
     # 2. Store raw snapshot
     try:
-        db.write_raw_snapshot(alerts_data, trip_counts)
+        db.write_raw_snapshot(alerts_data, {k: c.trips for k, c in trip_counts.items()})
     except Exception as e:
         log.warning("Failed to write raw snapshot: %s", e)
 
-    # 3. Compute live snapshot rows
+    # 3. Complete each line's state for the live snapshot (agency-keyed)
     lines = []
-    for line_id in ALL_LINES:
-        ad = alerts_data.get(line_id, {
-            "score": 0, "alerts": [], "breakdown": {},
-            "by_direction": {
-                "uptown": {"score": 0, "breakdown": {}},
-                "downtown": {"score": 0, "breakdown": {}},
-            },
-        })
-        lines.append({
-            "id": line_id,
-            "score": ad["score"],
-            "status": status_label(ad["alerts"]),
-            "alerts": ad["alerts"],
-            "breakdown": ad["breakdown"],
-            "by_direction": ad["by_direction"],
-            "trip_count": trip_counts.get(line_id, 0),
-        })
+    for line_id in dict.fromkeys([*feeds.known_lines(), *alerts_data, *trip_counts]):
+        state = alerts_data.get(line_id)
+        if state is None:
+            state = alerts_data[line_id] = LineState(line_id)
+        state.status = status_label(state.alerts)
+        count = trip_counts.get(line_id, TripCount())
+        state.trip_count = count.trips
+        state.metrics = metrics.get(line_id, {})
+        if "by_direction" in state.metrics:
+            state.metrics["by_direction"]["uptown"]["trips"] = count.north
+            state.metrics["by_direction"]["downtown"]["trips"] = count.south
+        lines.append(state)
 
     # 4. Write live snapshot
     try:
@@ -73,35 +203,44 @@ def run_once():
     except Exception as e:
         log.warning("Failed to write live snapshot: %s", e)
 
-    # 5. Accumulate daily scores
-    et_now = datetime.now(ET)
-    today = et_now.strftime("%Y-%m-%d")
+    # 5. Fold the cycle into the cumulative tables (rollover, daily scores,
+    # Hall of Shame, timeseries, rollups, scores_history) in one transaction.
+    # If Postgres can't take it, buffer it locally and replay it, oldest first,
+    # on the next cycle that reaches the database.
     try:
-        db.accumulate_daily(alerts_data, today)
+        _fold_cycle(Cycle(uuid.uuid4().hex, et_now, lines))
     except Exception as e:
-        log.warning("Failed to accumulate daily: %s", e)
+        log.warning("Failed to fold cycle: %s", e)
 
-    # 6. Record timeseries bucket
-    minute = (et_now.minute // 15) * 15
-    bucket = et_now.strftime("%H:") + f"{minute:02d}"
+    # 6. Bump the generation so API readers can tell this cycle apart
+    generation = None
     try:
-        db.record_timeseries(alerts_data, today, bucket)
+        generation = db.record_ingest_cycle()
     except Exception as e:
-        log.warning("Failed to record timeseries: %s", e)
+        log.warning("Failed to record ingest cycle: %s", e)
 
-    # 7. Write to scores_history (backward compat with /api/history)
-    try:
-        db.write_history_rows([
-            {"id": l["id"], "score": l["score"], "status": l["status"], "trip_count": l["trip_count"]}
-            for l in lines
-        ])
-    except Exception as e:
-        log.warning("Failed to write history rows: %s", e)
+    # 7. Publish the finished status document for the web workers to serve
+    document = None
+    if generation is not None:
+        try:
+            document = build_status_document(generation)
+            snapshot.publish(generation, document)
+        except Exception as e:
+            log.warning("Failed to publish status snapshot: %s", e)
+
+    # 8. Redraw the share card, only if its winner, podium, tier or date changed
+    if document is not None:
+        try:
+            if og_image.publish(document):
+                log.info("Share card updated: %s", og_image.card_key(document))
+        except Exception as e:
+            log.warning("Failed to render share card: %s", e)
 
     elapsed = time.monotonic() - start
-    active = sum(1 for l in lines if l["score"] > 0)
+    active = sum(1 for l in lines if l.score > 0)
     log.info(
-        "Ingest cycle complete: %d lines with alerts, %.1fs elapsed",
+        "Ingest cycle %s complete: %d lines with alerts, %.1fs elapsed",
+        generation,
         active,
         elapsed,
     )
@@ -118,6 +257,10 @@ def run_loop():
 
         _shutdown.wait(timeout=INGEST_INTERVAL)
 
+        if _PARENT_PID and os.getppid() != _PARENT_PID:
+            log.warning("Supervisor process %d is gone, stopping", _PARENT_PID)
+            stop()
+
     log.info("Ingest loop stopped")
 
 
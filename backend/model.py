@@ -0,0 +1,213 @@
+"""Ingest-side records for per-line alert state.
+
+Pure data module — no network, no DB, no Flask. `mta.fetch_alerts` fills one
+`LineState` per line, headway analysis adds to it, and `run_once` hands the
+same objects to the db writers. Nothing is converted to the stored JSON shape
+until it is serialised: `encoding` calls `to_json()` on these records.
+
+Breakdowns are category-indexed arrays allocated on first use, so an idle
+line costs a few slotted objects rather than a tree of dicts.
+"""
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+ET = ZoneInfo("America/New_York")
+
+# Fixed order for category-indexed breakdowns. Covers every category
+# mta.classify_alert can return plus headways.MEASURED_DELAY.
+CATEGORIES = (
+    "No Service", "Delays", "Slow Speeds", "Skip Stop", "Rerouted",
+    "Runs Local", "Reduced Freq", "Planned Work", "Platform Change", "Other",
+    "Measured Delay",
+)
+CATEGORY_INDEX = {c: i for i, c in enumerate(CATEGORIES)}
+
+DIRECTIONS = ("uptown", "downtown")
+
+
+class Breakdown:
+    """Points per category. `present` is a bitmask of categories ever added."""
+
+    __slots__ = ("points", "present")
+
+    def __init__(self):
+        self.points: list | None = None
+        self.present = 0
+
+    def add(self, category: str, score: int | float):
+        i = CATEGORY_INDEX[category]
+        if self.points is None:
+            self.points = [0] * len(CATEGORIES)
+        self.points[i] += score
+        self.present |= 1 << i
+
+    def items(self):
+        present, points = self.present, self.points
+        for i, category in enumerate(CATEGORIES):
+            if present >> i & 1:
+                yield category, points[i]
+
+    def round(self):
+        if self.points is not None:
+            self.points = [int(round(p)) for p in self.points]
+
+    def to_json(self) -> dict:
+        return dict(self.items()) if self.present else {}
+
+
+class Direction:
+    __slots__ = ("score", "breakdown")
+
+    def __init__(self):
+        self.score: int | float = 0
+        self.breakdown = Breakdown()
+
+    def add(self, category: str, score: int | float):
+        self.score += score
+        self.breakdown.add(category, score)
+
+    def to_json(self) -> dict:
+        return {"score": self.score, "breakdown": self.breakdown.to_json()}
+
+
+class Alert:
+    """A classified alert. `lines` is only set on the copies filed under stations."""
+
+    __slots__ = ("text", "category", "score", "direction", "lines")
+
+    def __init__(self, text: str, category: str, score: int, direction: str,
+                 lines: list[str] | None = None):
+        self.text = text
+        self.category = category
+        self.score = score
+        self.direction = direction
+        self.lines = lines
+
+    def to_json(self) -> dict:
+        d = {
+            "text": self.text,
+            "category": self.category,
+            "score": self.score,
+            "direction": self.direction,
+        }
+        if self.lines is not None:
+            d["lines"] = self.lines
+        return d
+
+
+class LineState:
+    """One line's state for a cycle: alert score plus what ingest adds to it."""
+
+    __slots__ = (
+        "id", "score", "alerts", "breakdown", "uptown", "downtown",
+        "status", "trip_count", "metrics",
+    )
+
+    def __init__(self, line_id: str):
+        self.id = line_id
+        self.score: int | float = 0
+        self.alerts: list[Alert] = []
+        self.breakdown = Breakdown()
+        self.uptown = Direction()
+        self.downtown = Direction()
+        self.status = "Good Service"
+        self.trip_count = 0
+        self.metrics: dict = {}
+
+    def direction(self, name: str) -> Direction:
+        return self.uptown if name == "uptown" else self.downtown
+
+    def add_alert(self, alert: Alert):
+        """Score an alert against this line; the same text is listed once."""
+        if not any(a.text == alert.text for a in self.alerts):
+            self.alerts.append(alert)
+        self.add(alert.category, alert.score, alert.direction)
+
+    def add(self, category: str, score: int | float, direction: str = "both"):
+        """Add points to the line and split them across directions."""
+        self.score += score
+        self.breakdown.add(category, score)
+        if direction == "both":
+            half = score / 2
+            self.uptown.add(category, half)
+            self.downtown.add(category, half)
+        else:
+            self.direction(direction).add(category, score)
+
+    def round_directions(self):
+        for d in (self.uptown, self.downtown):
+            d.score = int(round(d.score))
+            d.breakdown.round()
+
+    def by_direction_json(self) -> dict:
+        return {"uptown": self.uptown.to_json(), "downtown": self.downtown.to_json()}
+
+    def to_json(self) -> dict:
+        """The fetch_alerts per-line shape stored in raw snapshots."""
+        return {
+            "score": self.score,
+            "alerts": [a.to_json() for a in self.alerts],
+            "breakdown": self.breakdown.to_json(),
+            "by_direction": self.by_direction_json(),
+        }
+
+    @classmethod
+    def from_json(cls, line_id: str, d: dict) -> "LineState":
+        """Rebuild a record from its to_json() shape plus the row fields."""
+        state = cls(line_id)
+        state.score = d["score"]
+        state.alerts = [Alert(**a) for a in d["alerts"]]
+        for category, points in d["breakdown"].items():
+            state.breakdown.add(category, points)
+        for name, dd in d["by_direction"].items():
+            direction = state.direction(name)
+            direction.score = dd["score"]
+            for category, points in dd["breakdown"].items():
+                direction.breakdown.add(category, points)
+        state.status = d.get("status", state.status)
+        state.trip_count = d.get("trip_count", 0)
+        return state
+
+
+class Cycle:
+    """One ingest cycle's contribution to the cumulative tables.
+
+    `at` is the cycle's ET wall time. `cycle_id` is unique per cycle so the
+    database can apply each one exactly once (see db.apply_cycles).
+    """
+
+    __slots__ = ("cycle_id", "at", "lines")
+
+    def __init__(self, cycle_id: str, at: datetime, lines: list[LineState]):
+        self.cycle_id = cycle_id
+        self.at = at
+        self.lines = lines
+
+    @property
+    def today(self) -> str:
+        return self.at.strftime("%Y-%m-%d")
+
+    @property
+    def bucket(self) -> str:
+        """The 15-minute timeseries bucket ("HH:MM")."""
+        return f"{self.at.hour:02d}:{self.at.minute // 15 * 15:02d}"
+
+    def to_json(self) -> dict:
+        return {
+            "cycle_id": self.cycle_id,
+            "at": self.at.isoformat(),
+            "lines": [
+                {**l.to_json(), "id": l.id, "status": l.status, "trip_count": l.trip_count}
+                for l in self.lines
+            ],
+        }
+
+    @classmethod
+    def from_json(cls, d: dict) -> "Cycle":
+        return cls(
+            d["cycle_id"],
+            # A fixed-offset time would put DST-day midnights in the wrong place
+            datetime.fromisoformat(d["at"]).astimezone(ET),
+            [LineState.from_json(l["id"], l) for l in d["lines"]],
+        )
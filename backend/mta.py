@@ -1,54 +1,37 @@
 """MTA feed fetching and alert classification.
 
-Pure data-fetching module — no state, no DB, no Flask.
+Data-fetching module — no DB, no Flask. Which feeds to poll comes from the
+registry in feeds.py; the only state is FeedScheduler's connection pool and
+each feed's last result.
 """
 
 import logging
+import os
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING
 
 import requests as http_requests
 from google.transit import gtfs_realtime_pb2
 
+import feeds
+import trip_feed
+from feeds import Feed
+from model import Alert, LineState
+from routes import ALL_LINES, DEFAULT_AGENCY, line_key, parent_stop
+from trip_feed import TripCount
+
+if TYPE_CHECKING:
+    from headways import StopTimes  # imported at call time: NumPy loads with it
+
 log = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
 
-ALERTS_URL = (
-    "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/camsys%2Fsubway-alerts"
-)
-
-TRIP_FEED_URLS = {
-    "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs": [
-        "1", "2", "3", "4", "5", "6", "GS",
-    ],
-    "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-ace": [
-        "A", "C", "E",
-    ],
-    "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-bdfm": [
-        "B", "D", "F", "M",
-    ],
-    "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-g": ["G"],
-    "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-jz": [
-        "J", "Z",
-    ],
-    "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-l": ["L"],
-    "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-nqrw": [
-        "N", "Q", "R", "W",
-    ],
-    "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-si": ["SI"],
-    "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-7": ["7"],
-}
-
-ALL_LINES = [
-    "1", "2", "3", "4", "5", "6", "7",
-    "A", "C", "E", "B", "D", "F", "M",
-    "N", "Q", "R", "W", "G", "J", "Z",
-    "L", "S", "SI",
-]
-
 CATEGORY_SCORES = {
     "No Service": 50,
     "Delays": 30,
@@ -83,14 +66,15 @@ _DOWNTOWN_KEYWORDS = [
     "bedford-nostrand", "church av-bound",
 ]
 
-ROUTE_NORMALIZE = {
-    "GS": "S", "FS": "S", "H": "S",
-    "SI": "SI", "SIR": "SI",
-    "5X": "5", "6X": "6", "7X": "7", "FX": "F",
-}
-
 FETCH_TIMEOUT = 8
 
+# Fetch scheduling. The budget caps a cycle's fetch phase no matter how many
+# feeds are registered; feeds still in flight when it runs out are skipped
+# for that cycle.
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", "8"))
+FETCH_PER_HOST = int(os.environ.get("FETCH_PER_HOST", "4"))
+FETCH_BUDGET = float(os.environ.get("FETCH_BUDGET_SECONDS", "20"))
+
 STATUS_LABEL_MAP = {
     "No Service": "Suspended",
     "Delays": "Delays",
@@ -142,17 +126,20 @@ def classify_alert(header: str) -> tuple[str, int, str]:
     return category, score, direction
 
 
-def normalize_route(route_id: str) -> str | None:
-    rid = ROUTE_NORMALIZE.get(route_id, route_id)
-    return rid if rid in ALL_LINES else None
+_LINE_INDEX = {line: i for i, line in enumerate(ALL_LINES)}
+
+
+def _line_order(key: str) -> tuple[int, str]:
+    """Sort key: subway lines in ALL_LINES order, then other agencies by key."""
+    return _LINE_INDEX.get(key, len(ALL_LINES)), key
 
 
-def status_label(alerts: list[dict]) -> str:
+def status_label(alerts: list[Alert]) -> str:
     """Pick the worst category from classified alerts as the status label."""
     if not alerts:
         return "Good Service"
-    worst = max(alerts, key=lambda a: CATEGORY_SCORES.get(a["category"], 0))
-    return STATUS_LABEL_MAP.get(worst["category"], "Issues")
+    worst = max(alerts, key=lambda a: CATEGORY_SCORES.get(a.category, 0))
+    return STATUS_LABEL_MAP.get(worst.category, "Issues")
 
 
 def add_to_breakdown(bd: dict, category: str, score: int | float):
@@ -167,40 +154,244 @@ def _is_noise(header: str) -> bool:
     ))
 
 
-def _fetch_protobuf(url: str) -> gtfs_realtime_pb2.FeedMessage:
-    resp = http_requests.get(url, timeout=FETCH_TIMEOUT)
-    resp.raise_for_status()
-    feed = gtfs_realtime_pb2.FeedMessage()
-    feed.ParseFromString(resp.content)
-    return feed
+# NYCT platform id ("A27N") -> (index into _PARENTS, 0 for N-bound / 1 for
+# S-bound), or None for ids without an N/S suffix. Filled once per platform
+# and shared by every feed, so the per-row work is one dict lookup.
+_PLATFORMS: dict[str, tuple[int, int] | None] = {}
+_PARENTS: list[str] = []
+_PARENT_INDEX: dict[str, int] = {}
+_platform_lock = threading.Lock()
+
+
+def _platform(stop_id: str) -> tuple[int, int] | None:
+    with _platform_lock:
+        p = _PLATFORMS.get(stop_id, False)
+        if p is False:
+            p = None
+            # NYCT platform ids are the parent station id plus an N/S suffix.
+            if stop_id and stop_id[-1] in "NS":
+                parent = stop_id[:-1]
+                i = _PARENT_INDEX.get(parent)
+                if i is None:
+                    i = _PARENT_INDEX[parent] = len(_PARENTS)
+                    _PARENTS.append(parent)
+                p = (i, int(stop_id[-1] == "S"))
+            _PLATFORMS[stop_id] = p
+        return p
+
+
+def _collect_trips(feed, source: Feed) -> tuple[dict, list, list, list, list]:
+    """Count trips per line and flatten every stop_time_update in one pass.
+
+    `feed` is a full or trip_feed-trimmed FeedMessage. Returns (counts,
+    routes, directions, stops, arrivals): counts are TripCounts of distinct
+    trip ids, split N/S for NYCT feeds. The four lists are parallel and only
+    filled for `source.stop_times` feeds. Routes are ALL_LINES indexes,
+    directions are 0 for N-bound platforms and 1 for S-bound, stops index
+    _PARENTS (parent station ids).
+
+    The loop is bound by protobuf field access (about 1µs per stop time), so
+    it reads each row's arrival and stop id once and nothing else.
+    """
+    counts = trip_feed.tally(
+        trip_feed.trips_by_line(feed, source.line_key),
+        directions=source.agency == DEFAULT_AGENCY,
+    )
+    routes: list[int] = []
+    directions: list[int] = []
+    stops: list[int] = []
+    arrivals: list[int] = []
+    if not source.stop_times:
+        return counts, routes, directions, stops, arrivals
+    platforms = _PLATFORMS
+    for entity in feed.entity:
+        if not entity.HasField("trip_update"):
+            continue
+        tu = entity.trip_update
+        idx = _LINE_INDEX.get(source.line_key(tu.trip.route_id))
+        if idx is None:
+            continue
+        for stu in tu.stop_time_update:
+            t = stu.arrival.time or stu.departure.time
+            if not t:
+                continue
+            sid = stu.stop_id
+            p = platforms.get(sid, False)
+            if p is False:
+                p = _platform(sid)
+            if p is None:
+                continue
+            routes.append(idx)
+            stops.append(p[0])
+            directions.append(p[1])
+            arrivals.append(t)
+    return counts, routes, directions, stops, arrivals
+
+
+def stop_times_batch(routes: list, directions: list, stops: list, arrivals: list) -> "StopTimes":
+    """Parallel lists from _collect_trips as a headways.StopTimes batch."""
+    import numpy as np
+
+    from headways import StopTimes
+
+    if not arrivals:
+        return StopTimes.empty()
+    with _platform_lock:
+        parents = list(_PARENTS)
+    return StopTimes(
+        route=np.array(routes, np.int16),
+        direction=np.array(directions, np.int8),
+        stop=np.array(stops, np.int32),
+        arrival=np.array(arrivals, np.int64),
+        stops=parents,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Fetch scheduling
+# ---------------------------------------------------------------------------
+
+class FeedScheduler:
+    """Fetches registry feeds with global and per-host concurrency limits.
+
+    One long-lived pool of FETCH_CONCURRENCY threads and one keep-alive
+    session serve every cycle. At most FETCH_PER_HOST fetches per origin are
+    on the pool at once; the rest wait in that host's queue, not on a pool
+    thread, so one busy host can't idle the pool while other hosts' feeds
+    wait behind it. A feed whose `interval` hasn't elapsed reuses its last
+    result, and a cycle waits at most FETCH_BUDGET seconds, so cycle time
+    stays flat as feeds are added.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = FETCH_CONCURRENCY,
+        per_host: int = FETCH_PER_HOST,
+        budget: float = FETCH_BUDGET,
+    ):
+        self.per_host = per_host
+        self.budget = budget
+        self._pool = ThreadPoolExecutor(concurrency, thread_name_prefix="feed")
+        self._session = http_requests.Session()
+        adapter = http_requests.adapters.HTTPAdapter(pool_maxsize=per_host)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._active: dict[str, int] = {}  # host -> fetches on the pool
+        self._queued: dict[str, deque] = {}  # host -> (feed, parse, future) waiting
+        self._last: dict[str, tuple[float, object]] = {}  # name -> (fetched at, result)
+        self._inflight: set[str] = set()
+
+    def fetch(self, feed: Feed) -> bytes:
+        """The feed's raw protobuf; each parse callback decodes what it needs."""
+        resp = self._session.get(feed.url, timeout=FETCH_TIMEOUT)
+        resp.raise_for_status()
+        return resp.content
+
+    def _submit(self, feed: Feed, parse, future: Future):
+        """Start the fetch if its host has a free slot, else queue it (lock held)."""
+        if self._active.get(feed.host, 0) < self.per_host:
+            self._active[feed.host] = self._active.get(feed.host, 0) + 1
+            self._pool.submit(self._run_one, feed, parse, future)
+        else:
+            self._queued.setdefault(feed.host, deque()).append((feed, parse, future))
+
+    def _release(self, host: str):
+        """Hand the host's slot to its next queued feed, or free it."""
+        with self._lock:
+            queue = self._queued.get(host)
+            if queue:
+                self._pool.submit(self._run_one, *queue.popleft())
+            else:
+                self._active[host] -= 1
+
+    def _run_one(self, feed: Feed, parse, future: Future):
+        result = None
+        try:
+            try:
+                data = self.fetch(feed)
+            finally:
+                self._release(feed.host)
+            result = parse(feed, data)
+            with self._lock:
+                self._last[feed.name] = (time.monotonic(), result)
+        except Exception as exc:
+            log.warning("Failed to fetch %s feed %s: %s", feed.kind, feed.name, exc)
+        finally:
+            with self._lock:
+                self._inflight.discard(feed.name)
+            future.set_result(result)
+
+    def run(self, sources: list[Feed], parse) -> dict[str, object]:
+        """{feed name: parse(feed, raw bytes)} for every feed with a result.
+
+        Due feeds are fetched and parsed on the pool; the rest (not due, or
+        still in flight from a cycle that ran out of budget) contribute their
+        last good result. Failed and late feeds are logged and left out.
+        """
+        now = time.monotonic()
+        results: dict[str, object] = {}
+        futures = {}
+        with self._lock:
+            for feed in sources:
+                last = self._last.get(feed.name)
+                due = last is None or now - last[0] >= feed.interval
+                if due and feed.name not in self._inflight:
+                    self._inflight.add(feed.name)
+                    future = Future()
+                    futures[future] = feed
+                    self._submit(feed, parse, future)
+                elif last is not None:
+                    results[feed.name] = last[1]
+
+        done, late = wait(futures, timeout=self.budget)
+        for future in done:
+            result = future.result()
+            if result is not None:
+                results[futures[future].name] = result
+        if late:
+            log.warning(
+                "Fetch budget (%.0fs) spent; skipping %d feeds this cycle: %s",
+                self.budget, len(late), ", ".join(sorted(futures[f].name for f in late)),
+            )
+        return results
+
+
+_scheduler: FeedScheduler | None = None
+
+
+def scheduler() -> FeedScheduler:
+    """The process-wide scheduler, created on first use."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FeedScheduler()
+    return _scheduler
 
 
 # ---------------------------------------------------------------------------
 # Feed fetching
 # ---------------------------------------------------------------------------
 
-def fetch_alerts() -> dict[str, dict]:
-    """Fetch the MTA alerts feed and compute per-line alert data."""
-    empty = lambda: {
-        "score": 0,
-        "alerts": [],
-        "breakdown": {},
-        "by_direction": {
-            "uptown": {"score": 0, "breakdown": {}},
-            "downtown": {"score": 0, "breakdown": {}},
-        },
-    }
-    result: dict[str, dict] = {line: empty() for line in ALL_LINES}
-
-    try:
-        feed = _fetch_protobuf(ALERTS_URL)
-    except Exception as exc:
-        log.warning("Failed to fetch alerts feed: %s", exc)
-        return result
+def _alert_feed(feed: Feed, data: bytes) -> gtfs_realtime_pb2.FeedMessage:
+    message = gtfs_realtime_pb2.FeedMessage()
+    message.ParseFromString(data)
+    return message
 
-    now = time.time()
 
-    for entity in feed.entity:
+def _trip_feed(feed: Feed, data: bytes) -> tuple[dict, list, list, list, list]:
+    # Trimmed decode: stop_time_updates only for headway feeds
+    return _collect_trips(trip_feed.parse(data, stop_times=feed.stop_times), feed)
+
+
+def _score_alerts(
+    source: Feed,
+    message: gtfs_realtime_pb2.FeedMessage,
+    now: float,
+    result: dict[str, LineState],
+    station_alerts: dict[str, list[Alert]] | None,
+):
+    """Classify one alerts feed's active alerts into `result`, in place."""
+    for entity in message.entity:
         if not entity.HasField("alert"):
             continue
         alert = entity.alert
@@ -234,73 +425,78 @@ def fetch_alerts() -> dict[str, dict]:
         category, score, direction = classify_alert(header)
 
         routes_affected = set()
+        stops_affected = set()
         for ie in alert.informed_entity:
             if ie.route_id:
-                norm = normalize_route(ie.route_id)
-                if norm:
-                    routes_affected.add(norm)
-
-        alert_obj = {
-            "text": header,
-            "category": category,
-            "score": score,
-            "direction": direction,
-        }
+                key = source.line_key(ie.route_id)
+                if key:
+                    routes_affected.add(key)
+            if ie.stop_id:
+                # Stop ids are only unique within an agency
+                stops_affected.add(line_key(source.agency, parent_stop(ie.stop_id)))
+
+        alert_obj = Alert(header, category, score, direction)
+
+        if station_alerts is not None and stops_affected:
+            station_obj = Alert(
+                header, category, score, direction,
+                lines=sorted(routes_affected, key=_line_order),
+            )
+            for stop in stops_affected:
+                alerts_at = station_alerts.setdefault(stop, [])
+                if not any(a.text == header for a in alerts_at):
+                    alerts_at.append(station_obj)
 
         for route in routes_affected:
-            r = result[route]
-            r["score"] += score
+            r = result.get(route)
+            if r is None:
+                r = result[route] = LineState(route)
+            r.add_alert(alert_obj)
 
-            if not any(a["text"] == header for a in r["alerts"]):
-                r["alerts"].append(alert_obj)
 
-            add_to_breakdown(r["breakdown"], category, score)
+def fetch_alerts(station_alerts: dict[str, list[Alert]] | None = None) -> dict[str, LineState]:
+    """Fetch every registered alerts feed and compute per-line alert state.
 
-            if direction == "both":
-                half = score / 2
-                for d in ("uptown", "downtown"):
-                    r["by_direction"][d]["score"] += half
-                    add_to_breakdown(r["by_direction"][d]["breakdown"], category, half)
-            else:
-                r["by_direction"][direction]["score"] += score
-                add_to_breakdown(
-                    r["by_direction"][direction]["breakdown"], category, score
-                )
+    Keyed by line key (see routes.line_key). If `station_alerts` is given it
+    is filled in place with parent stop id -> active alerts naming that stop,
+    each tagged with the lines it affects.
+    """
+    sources = [f for f in feeds.registry() if f.kind == "alerts"]
+    result = {line: LineState(line) for line in feeds.known_lines()}
+    messages = scheduler().run(sources, _alert_feed)
 
-    # Round direction scores to ints
-    for line_data in result.values():
-        for d in ("uptown", "downtown"):
-            dd = line_data["by_direction"][d]
-            dd["score"] = int(round(dd["score"]))
-            dd["breakdown"] = {
-                k: int(round(v)) for k, v in dd["breakdown"].items()
-            }
+    now = time.time()
 
-    return result
+    for source in sources:
+        if source.name in messages:
+            _score_alerts(source, messages[source.name], now, result, station_alerts)
 
+    # Round direction scores to ints
+    for state in result.values():
+        state.round_directions()
 
-def fetch_trip_counts() -> dict[str, int]:
-    """Fetch all trip-update feeds and count active trips per line."""
-    counts: dict[str, int] = {line: 0 for line in ALL_LINES}
+    return result
 
-    def _fetch_one(url: str):
-        try:
-            feed = _fetch_protobuf(url)
-            local_counts: dict[str, int] = {}
-            for entity in feed.entity:
-                if entity.HasField("trip_update"):
-                    rid = normalize_route(entity.trip_update.trip.route_id)
-                    if rid:
-                        local_counts[rid] = local_counts.get(rid, 0) + 1
-            return local_counts
-        except Exception as exc:
-            log.warning("Failed to fetch trip feed %s: %s", url, exc)
-            return {}
 
-    with ThreadPoolExecutor(max_workers=6) as pool:
-        futures = {pool.submit(_fetch_one, url): url for url in TRIP_FEED_URLS}
-        for future in as_completed(futures):
-            for route, count in future.result().items():
-                counts[route] = counts.get(route, 0) + count
+def fetch_trip_data() -> tuple[dict[str, TripCount], "StopTimes"]:
+    """Fetch all registered trip feeds once; return trip counts and stop times.
 
-    return counts
+    Stop times come back as a `headways.StopTimes` batch of NumPy arrays so
+    the analysis stage never touches per-row Python objects.
+    """
+    sources = [f for f in feeds.registry() if f.kind == "trips"]
+    counts: dict[str, TripCount] = {line: TripCount() for line in feeds.known_lines()}
+    routes: list[int] = []
+    directions: list[int] = []
+    stops: list[int] = []
+    arrivals: list[int] = []
+
+    collected = scheduler().run(sources, _trip_feed)
+    for local_counts, r, d, s, a in collected.values():
+        for route, count in local_counts.items():
+            counts[route] = counts.get(route, TripCount()) + count
+        routes.extend(r)
+        directions.extend(d)
+        stops.extend(s)
+        arrivals.extend(a)
+    return counts, stop_times_batch(routes, directions, stops, arrivals)
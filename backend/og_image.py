@@ -0,0 +1,100 @@
+"""Pre-rendered 1200x630 share / OG card for /api/og.png.
+
+No DB, no Flask, no PIL at import. The ingest worker hands each cycle's
+status document to `publish`, which re-renders the PNG (og_render.py) only
+when what the card shows changes: the ET date, the winner, its score tier or
+the podium. The PNG goes to one shared file (see shared_file.py), with its
+card key in a PNG text chunk so a restarted worker doesn't redraw an
+identical card. Web workers serve the file through `OgImageReader`, which
+holds the bytes and ETag until the file is replaced.
+
+The card carries no score or clock, since those change every cycle and the
+card does not. Pillow is optional: without it ingest skips rendering and
+/api/og.png falls back to the static og.png.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+
+from shared_file import SHARED_DIR, write_atomic
+
+log = logging.getLogger(__name__)
+
+OG_IMAGE_PATH = os.environ.get("OG_IMAGE_PATH", os.path.join(SHARED_DIR, "subway-shame-og.png"))
+
+KEY_CHUNK = "card-key"
+
+# (min daily score, label, color, stamp background alpha)
+SCORE_TIERS = (
+    (120, "Dumpster Fire", "#E8353A", 0.45),
+    (60, "Full Meltdown", "#F97316", 0.20),
+    (30, "Pain Train", "#EAB308", 0.20),
+    (1, "Limping Along", "#9CA3AF", 0.20),
+    (0, "Good Service", "#22C55E", 0.20),
+)
+
+
+def score_tier(score: int) -> tuple:
+    return next((t for t in SCORE_TIERS if score >= t[0]), SCORE_TIERS[-1])
+
+
+def card_key(doc: dict) -> str:
+    """Everything the card draws; a new key means a new image."""
+    winner = doc.get("winner")
+    if not winner:
+        return f"{doc.get('date', '')}|clear"
+    podium = ",".join(l["id"] for l in doc.get("podium", []))
+    return f"{doc.get('date', '')}|{winner['id']}|{score_tier(winner['daily_score'])[1]}|{podium}"
+
+
+def publish(doc: dict, path: str = OG_IMAGE_PATH) -> bool:
+    """Re-render the card if its key changed; return whether it was written."""
+    try:
+        import og_render
+    except ImportError:  # Pillow not installed
+        return False
+    if card_key(doc) == og_render.published_key(path):
+        return False
+    write_atomic(path, [og_render.render(doc)], prefix=".og-")
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Serving
+# ---------------------------------------------------------------------------
+
+class OgImageReader:
+    """Per-process copy of the published card, reloaded when it is replaced."""
+
+    def __init__(self, path: str = OG_IMAGE_PATH):
+        self.path = path
+        self._image: tuple[bytes, str] | None = None
+        self._key: tuple | None = None
+        self._lock = threading.Lock()
+
+    def current(self) -> tuple[bytes, str] | None:
+        """(PNG bytes, ETag) of the latest card, or None if none is published.
+
+        Costs one stat() per call; the file is only read again after ingest
+        replaces it.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        key = (st.st_ino, st.st_mtime_ns)
+        if key == self._key:
+            return self._image
+        with self._lock:
+            if key != self._key:
+                try:
+                    with open(self.path, "rb") as f:
+                        png = f.read()
+                except OSError as e:
+                    log.warning("Ignoring unreadable OG image: %s", e)
+                    return None
+                self._image = (png, hashlib.sha256(png).hexdigest()[:32])
+                self._key = key
+        return self._image
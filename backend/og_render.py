@@ -0,0 +1,181 @@
+"""Drawing the 1200x630 share card (Pillow).
+
+Ingest-only: og_image.publish imports this module when it needs a new card,
+so the web tier never loads PIL. Layout and palette follow
+frontend/api/og.tsx; the face is the brand's Bebas Neue
+(frontend/scripts/BebasNeue.ttf).
+"""
+
+import io
+import os
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont, PngImagePlugin
+
+from og_image import KEY_CHUNK, card_key, score_tier
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+OG_FONT_PATH = os.environ.get("OG_FONT_PATH") or next(
+    (p for p in (
+        os.path.join(_HERE, "fonts", "BebasNeue.ttf"),
+        os.path.join(_HERE, "..", "frontend", "scripts", "BebasNeue.ttf"),
+    ) if os.path.exists(p)),
+    None,
+)
+
+WIDTH, HEIGHT = 1200, 630
+
+# ---------------------------------------------------------------------------
+# Brand (mirrors frontend/api/og.tsx and src/constants/lines.js)
+# ---------------------------------------------------------------------------
+
+TUNNEL = "#000000"
+CONCRETE = "#2A2A2A"
+PLATFORM = "#F5F0E8"
+NEWSPRINT = "#999077"
+SIGNAL_RED = "#E8353A"
+
+LINE_COLORS = {
+    "1": "#EE352E", "2": "#EE352E", "3": "#EE352E",
+    "4": "#00933C", "5": "#00933C", "6": "#00933C",
+    "7": "#B933AD",
+    "A": "#0039A6", "C": "#0039A6", "E": "#0039A6",
+    "B": "#FF6319", "D": "#FF6319", "F": "#FF6319", "M": "#FF6319",
+    "N": "#FCCC0A", "Q": "#FCCC0A", "R": "#FCCC0A", "W": "#FCCC0A",
+    "G": "#6CBE45",
+    "J": "#996633", "Z": "#996633",
+    "L": "#A7A9AC",
+    "S": "#808183", "SI": "#0078C6",
+}
+DARK_TEXT_LINES = ("N", "Q", "R", "W", "L")
+
+
+# ---------------------------------------------------------------------------
+# Drawing
+# ---------------------------------------------------------------------------
+
+def _font(size: int):
+    if OG_FONT_PATH:
+        return ImageFont.truetype(OG_FONT_PATH, size)
+    return ImageFont.load_default(size)
+
+
+def _rgba(color: str, alpha: float = 1.0) -> tuple[int, int, int, int]:
+    return (int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16), int(alpha * 255))
+
+
+def _spaced(draw, xy: tuple[int, int], text: str, font, fill, tracking: int = 0) -> int:
+    """Draw text with letter spacing from its top-left corner; return the end x."""
+    x, y = xy
+    for ch in text:
+        draw.text((x, y), ch, font=font, fill=fill)
+        x += draw.textlength(ch, font=font) + tracking
+    return int(x - tracking)
+
+
+def _bullet(card, center: tuple[int, int], line_id: str, size: int):
+    draw = ImageDraw.Draw(card)
+    cx, cy = center
+    r = size // 2
+    draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=LINE_COLORS.get(line_id, "#808183"))
+    font = _font(int(size * (0.62 if len(line_id) == 1 else 0.48)))
+    color = "#000000" if line_id in DARK_TEXT_LINES else "#FFFFFF"
+    draw.text((cx, cy), line_id, font=font, fill=color, anchor="mm")
+
+
+def _glow(card, center: tuple[int, int], color: str, radius: int):
+    """The one permitted glow: the villain's color behind its bullet."""
+    layer = Image.new("RGBA", card.size, (0, 0, 0, 0))
+    cx, cy = center
+    ImageDraw.Draw(layer).ellipse(
+        (cx - radius, cy - radius, cx + radius, cy + radius), fill=_rgba(color, 0.25),
+    )
+    card.alpha_composite(layer.filter(ImageFilter.GaussianBlur(radius // 3)))
+
+
+def _shell():
+    card = Image.new("RGBA", (WIDTH, HEIGHT), TUNNEL)
+    draw = ImageDraw.Draw(card)
+    draw.rectangle((0, 0, WIDTH - 1, HEIGHT - 1), outline=CONCRETE, width=2)
+    _spaced(draw, (64, 56), "THE LOW LINE", _font(44), PLATFORM, tracking=9)
+    return card
+
+
+def _live_card(doc: dict):
+    winner = doc["winner"]
+    _, label, color, bg_alpha = score_tier(winner["daily_score"])
+    card = _shell()
+    _glow(card, (184, 330), LINE_COLORS.get(winner["id"], "#808183"), 260)
+    draw = ImageDraw.Draw(card)
+
+    _bullet(card, (184, 330), winner["id"], 240)
+    _spaced(draw, (352, 222), "WORST LINE TODAY", _font(44), NEWSPRINT, tracking=4)
+    draw.text((348, 268), label.upper(), font=_font(150), fill=color)
+
+    # Date stamp in the tier's tint with a left rule, as the .stamp-* classes
+    stamp_font = _font(40)
+    text = doc.get("date", "").upper()
+    width = sum(draw.textlength(ch, font=stamp_font) + 3 for ch in text) - 3
+    stamp = Image.new("RGBA", card.size, (0, 0, 0, 0))
+    sd = ImageDraw.Draw(stamp)
+    sd.rectangle((64, 516, 88 + width + 28, 580), fill=_rgba(color, bg_alpha))
+    sd.rectangle((64, 516, 69, 580), fill=color)
+    card.alpha_composite(stamp)
+    draw = ImageDraw.Draw(card)
+    _spaced(draw, (88, 528), text, stamp_font, PLATFORM, tracking=3)
+
+    # Rest of the podium, right-aligned
+    others = [l["id"] for l in doc.get("podium", []) if l["id"] != winner["id"]][:4]
+    if others:
+        x = WIDTH - 64 - 36
+        for line_id in reversed(others):
+            _bullet(card, (x, 548), line_id, 64)
+            x -= 76
+        label_font = _font(36)
+        label_width = sum(draw.textlength(ch, font=label_font) + 3 for ch in "ALSO BAD") - 3
+        # Right edge 24px left of the first bullet
+        _spaced(draw, (x + 76 - 32 - 24 - label_width, 530), "ALSO BAD", label_font, NEWSPRINT,
+                tracking=3)
+    return card
+
+
+def _fallback_card(doc: dict):
+    """No line scored today: stay honest, no fabricated villain."""
+    card = _shell()
+    draw = ImageDraw.Draw(card)
+    font = _font(110)
+    for i, text in enumerate(("WHICH LINE IS RUINING", "THE MOST MORNINGS")):
+        draw.text((64, 190 + i * 112), text, font=font, fill=PLATFORM)
+    _spaced(draw, (64, 540), "ALL CLEAR RIGHT NOW", _font(40), NEWSPRINT, tracking=3)
+    w = draw.textlength("SUBWAY-SHAME.VERCEL.APP", font=_font(36))
+    draw.text((WIDTH - 64 - w, 544), "SUBWAY-SHAME.VERCEL.APP", font=_font(36), fill=SIGNAL_RED)
+    return card
+
+
+def render(doc: dict) -> bytes:
+    """PNG bytes for the status document, with its card key embedded."""
+    card = _live_card(doc) if doc.get("winner") else _fallback_card(doc)
+    info = PngImagePlugin.PngInfo()
+    info.add_text(KEY_CHUNK, card_key(doc))
+    buf = io.BytesIO()
+    card.convert("RGB").save(buf, "PNG", optimize=True, pnginfo=info)
+    return buf.getvalue()
+
+
+def published_key(path: str) -> str | None:
+    """The card key of the PNG at path, or None if there's no readable card."""
+    try:
+        with Image.open(path) as img:
+            return img.text.get(KEY_CHUNK)
+    except (OSError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    # Render a card from a status JSON file: python og_render.py status.json out.png
+    import json
+    import sys
+
+    with open(sys.argv[1]) as f:
+        document = json.load(f)
+    with open(sys.argv[2], "wb") as f:
+        f.write(render(document))
@@ -0,0 +1,87 @@
+"""Bounded, request-coalescing cache for computed API responses.
+
+Pure module — no DB, no Flask. Callers fold whatever invalidates a response
+(e.g. the ingest generation) into the key, so entries never need expiring:
+stale keys simply stop being asked for and fall off the LRU end.
+
+Concurrent misses on the same key are coalesced: the first caller computes,
+the rest wait for its result (or its exception) instead of repeating the
+work.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: BaseException | None = None
+
+
+class ResponseCache:
+    """LRU of key -> value with single-flight computation on a miss."""
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._inflight: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, compute: Callable[[], object]):
+        """Return the cached value for key, computing it at most once at a time."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if call.error is None:
+                    self._entries[key] = call.value
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            call.done.set()
+        return call.value
+
+    def stats(self) -> dict:
+        with self._lock:
+            served = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                # Coalesced waiters didn't compute either, so they count as hits
+                "hit_rate": round((self.hits + self.coalesced) / served, 4) if served else None,
+            }
@@ -0,0 +1,29 @@
+"""Static route and stop identifiers shared by ingest and the API.
+
+Standard library only: the web tier imports this instead of mta so it never
+loads requests or the protobuf bindings.
+"""
+
+ALL_LINES = [
+    "1", "2", "3", "4", "5", "6", "7",
+    "A", "C", "E", "B", "D", "F", "M",
+    "N", "Q", "R", "W", "G", "J", "Z",
+    "L", "S", "SI",
+]
+
+
+def parent_stop(stop_id: str) -> str:
+    """Collapse a platform id ("127N") to its parent station id ("127")."""
+    if len(stop_id) > 1 and stop_id[-1] in "NS" and stop_id[-2].isdigit():
+        return stop_id[:-1]
+    return stop_id
+
+
+# Agency whose line keys are bare route ids (what the API and frontend use).
+# Every other agency's lines are stored as "agency:route"; see feeds.py.
+DEFAULT_AGENCY = "nyct"
+
+
+def line_key(agency: str, route: str) -> str:
+    """Storage key for an agency's route: "A" for the subway, "lirr:1" otherwise."""
+    return route if agency == DEFAULT_AGENCY else f"{agency}:{route}"
@@ -0,0 +1,29 @@
+"""Files the ingest worker publishes for the web workers to read.
+
+No DB, no Flask — stdlib only. The status snapshot (snapshot.py) and the
+share card (og_image.py) are each one file, by default under /dev/shm, that
+ingest replaces whole: the new content is written to a temp file beside it
+and os.replace()d over it, so a reader sees the old file or the new one,
+never a partial write.
+"""
+
+import os
+import tempfile
+from typing import Iterable
+
+_SHM = "/dev/shm"
+SHARED_DIR = _SHM if os.path.isdir(_SHM) else tempfile.gettempdir()
+
+
+def write_atomic(path: str, parts: Iterable[bytes], prefix: str = ".shared-"):
+    """Replace the file at path with the concatenated parts in one rename."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(prefix=prefix, dir=directory)
+    try:
+        os.fchmod(fd, 0o644)  # web workers may run as a different user
+        with os.fdopen(fd, "wb") as f:
+            f.writelines(parts)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,145 @@
+"""Shared-memory snapshot of the finished /api/status document.
+
+The ingest worker encodes each cycle's document once (JSON and MessagePack,
+plain and gzipped) and publishes all variants in one file, by default under
+/dev/shm. Writers build a temp file and os.replace() it, so readers always see
+a complete generation. Every gunicorn worker maps the same file and serves
+the bytes as-is, so adding workers adds no DB reads.
+
+File layout (little-endian):
+
+    b"SSNP" | u32 format | u64 generation | u32 count
+    count x (u16 name_len | name | u64 offset | u64 length)
+    variant bodies...
+
+No Flask dependency — stdlib plus encoding.py.
+"""
+
+import gzip
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+import encoding
+from shared_file import SHARED_DIR, write_atomic
+
+log = logging.getLogger(__name__)
+
+STATUS_SNAPSHOT_PATH = os.environ.get(
+    "STATUS_SNAPSHOT_PATH", os.path.join(SHARED_DIR, "subway-shame-status.snap"),
+)
+
+# Readers ignore a snapshot older than this (ingest stopped or moved hosts)
+# and fall back to Postgres.
+SNAPSHOT_MAX_AGE = 300
+
+_MAGIC = b"SSNP"
+_FORMAT = 1
+_HEADER = struct.Struct("<4sIQI")
+_ENTRY = struct.Struct("<QQ")
+
+
+def variant_name(mimetype: str, gzipped: bool) -> str:
+    return mimetype + ("+gzip" if gzipped else "")
+
+
+def encode_variants(doc: dict) -> dict[str, bytes]:
+    """Every representation the API may be asked for, encoded once."""
+    variants = {}
+    mimetypes = [encoding.JSON] + ([encoding.MSGPACK] if encoding.MSGPACK_AVAILABLE else [])
+    for mimetype in mimetypes:
+        body = encoding.encode(doc, mimetype)
+        variants[variant_name(mimetype, False)] = body
+        variants[variant_name(mimetype, True)] = gzip.compress(body, 6)
+    return variants
+
+
+def publish(generation: int, doc: dict, path: str = STATUS_SNAPSHOT_PATH):
+    """Atomically replace the snapshot file with this generation's variants."""
+    variants = encode_variants(doc)
+    names = [n.encode() for n in variants]
+    index_size = sum(2 + len(n) + _ENTRY.size for n in names)
+    offset = _HEADER.size + index_size
+
+    parts = [_HEADER.pack(_MAGIC, _FORMAT, generation, len(variants))]
+    for name, body in zip(names, variants.values()):
+        parts.append(struct.pack("<H", len(name)) + name + _ENTRY.pack(offset, len(body)))
+        offset += len(body)
+    parts.extend(variants.values())
+    write_atomic(path, parts, prefix=".status-")
+
+
+class Snapshot:
+    """One mapped generation. Variants are memoryview slices of the mapping."""
+
+    def __init__(self, path: str, f, mapped: mmap.mmap):
+        self.path = path
+        self.file = f
+        self._map = mapped
+        magic, fmt, self.generation, count = _HEADER.unpack_from(mapped, 0)
+        if magic != _MAGIC or fmt != _FORMAT:
+            raise ValueError(f"{path} is not a status snapshot")
+        self.variants: dict[str, tuple[int, int]] = {}
+        pos = _HEADER.size
+        for _ in range(count):
+            (name_len,) = struct.unpack_from("<H", mapped, pos)
+            name = bytes(mapped[pos + 2:pos + 2 + name_len]).decode()
+            pos += 2 + name_len
+            self.variants[name] = _ENTRY.unpack_from(mapped, pos)
+            pos += _ENTRY.size
+        self._doc: dict | None = None
+
+    def body(self, name: str) -> memoryview | None:
+        span = self.variants.get(name)
+        if span is None:
+            return None
+        offset, length = span
+        return memoryview(self._map)[offset:offset + length]
+
+    def document(self) -> dict:
+        """Decoded document, for projections and deltas (once per generation)."""
+        if self._doc is None:
+            self._doc = json.loads(bytes(self.body(variant_name(encoding.JSON, False))))
+        return self._doc
+
+
+class SnapshotReader:
+    """Per-process view of the snapshot file, remapped when it is replaced."""
+
+    def __init__(self, path: str = STATUS_SNAPSHOT_PATH):
+        self.path = path
+        self._snap: Snapshot | None = None
+        self._key: tuple | None = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Snapshot | None:
+        """The latest published snapshot, or None if missing or stale.
+
+        Costs one stat() per call; the file is only reopened when its inode
+        changes, i.e. once per published generation.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        if time.time() - st.st_mtime > SNAPSHOT_MAX_AGE:
+            return None
+        key = (st.st_ino, st.st_mtime_ns)
+        if key == self._key:
+            return self._snap
+        with self._lock:
+            if key != self._key:
+                try:
+                    f = open(self.path, "rb")
+                    snap = Snapshot(self.path, f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                except (OSError, ValueError, struct.error) as e:
+                    log.warning("Ignoring unreadable status snapshot: %s", e)
+                    return None
+                # The previous mapping is released when the last response
+                # holding one of its memoryviews finishes.
+                self._snap, self._key = snap, key
+        return self._snap
@@ -0,0 +1,194 @@
+"""In-process index of the built frontend (Vite's dist/, copied to static/).
+
+No Flask dependency — stdlib only. The tree is walked once at startup: every
+file gets a content-hash ETag, a Cache-Control policy and its compressed
+variants. Precompressed `.br` / `.gz` siblings (see `precompress`, run in the
+Docker build) are used when present; small compressible files without one
+are gzipped in memory. Files up to SMALL_FILE_LIMIT are held in memory, the
+rest are streamed from disk.
+
+Vite emits content-hashed names under assets/ (`index-B3kX9aZ1.js`), so those
+are immutable; everything else (index.html, public/ files) is revalidated.
+
+    python static_files.py static/    # write .gz (and .br) siblings
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import sys
+from typing import NamedTuple
+
+try:
+    import brotli
+
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+log = logging.getLogger(__name__)
+
+SMALL_FILE_LIMIT = 256 * 1024
+MIN_COMPRESS_SIZE = 1024  # below this the headers outweigh the savings
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Vite's default asset names: <name>-<8+ char base64url hash>.<ext>
+_HASHED = re.compile(r"(^|/)assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+_COMPRESSIBLE = (
+    "text/", "application/javascript", "application/json",
+    "application/manifest+json", "image/svg+xml", "application/wasm",
+)
+
+# Content-Encoding -> sibling suffix, in server preference order
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+
+class Variant(NamedTuple):
+    """One representation of a file. `data` is None when served from `path`."""
+
+    path: str
+    size: int
+    etag: str
+    data: bytes | None
+
+
+class Asset(NamedTuple):
+    content_type: str  # full header value, charset included
+    cache_control: str
+    identity: Variant
+    encoded: dict[str, Variant]  # Content-Encoding -> variant
+
+
+def _content_type(path: str) -> str:
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if mimetype.startswith("text/") or mimetype == "application/javascript":
+        mimetype += "; charset=utf-8"
+    return mimetype
+
+
+def _compressible(mimetype: str) -> bool:
+    return mimetype.startswith(_COMPRESSIBLE)
+
+
+def _is_sibling(dirpath: str, filename: str) -> bool:
+    """True for foo.js.gz / foo.js.br next to foo.js."""
+    base, ext = os.path.splitext(filename)
+    return ext in ENCODINGS.values() and os.path.isfile(os.path.join(dirpath, base))
+
+
+def _variant(path: str, etag: str) -> Variant:
+    size = os.path.getsize(path)
+    data = None
+    if size <= SMALL_FILE_LIMIT:
+        with open(path, "rb") as f:
+            data = f.read()
+    return Variant(path, size, etag, data)
+
+
+def _load(root: str, rel: str) -> Asset:
+    path = os.path.join(root, rel)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    tag = digest.hexdigest()[:20]
+    content_type = _content_type(rel)
+
+    identity = _variant(path, f'"{tag}"')
+    encoded: dict[str, Variant] = {}
+    for name, suffix in ENCODINGS.items():
+        sibling = path + suffix
+        if os.path.isfile(sibling):
+            encoded[name] = _variant(sibling, f'"{tag}-{name}"')
+
+    if ("gzip" not in encoded and identity.data is not None
+            and identity.size >= MIN_COMPRESS_SIZE and _compressible(content_type)):
+        data = gzip.compress(identity.data, 9, mtime=0)
+        if len(data) < identity.size:
+            encoded["gzip"] = Variant(path, len(data), f'"{tag}-gzip"', data)
+
+    cache = IMMUTABLE if _HASHED.search(rel) else REVALIDATE
+    return Asset(content_type, cache, identity, encoded)
+
+
+class StaticIndex:
+    """URL path (no leading slash) -> Asset for every file under `root`."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.assets: dict[str, Asset] = {}
+        self.index_html: Asset | None = None
+        if not os.path.isdir(root):
+            log.info("No frontend build at %s; only the API is served", root)
+            return
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if _is_sibling(dirpath, filename):
+                    continue
+                rel = os.path.relpath(os.path.join(dirpath, filename), root)
+                rel = rel.replace(os.sep, "/")
+                try:
+                    self.assets[rel] = _load(root, rel)
+                except OSError as e:
+                    log.warning("Skipping static file %s: %s", rel, e)
+        self.index_html = self.assets.get("index.html")
+        resident = sum(
+            v.size for a in self.assets.values()
+            for v in (a.identity, *a.encoded.values()) if v.data is not None
+        )
+        log.info("Indexed %d static files (%d KiB in memory)", len(self.assets), resident // 1024)
+
+    def lookup(self, path: str) -> Asset | None:
+        """The file at `path`, else index.html (SPA route), else None."""
+        path = path.strip("/")
+        return (self.assets.get(path)
+                or self.assets.get(f"{path}/index.html")
+                or self.index_html)
+
+
+def choose(asset: Asset, accepts) -> tuple[str | None, Variant]:
+    """Pick (Content-Encoding, variant) given a callable: encoding -> accepted?"""
+    for name in ENCODINGS:
+        variant = asset.encoded.get(name)
+        if variant is not None and accepts(name):
+            return name, variant
+    return None, asset.identity
+
+
+# ---------------------------------------------------------------------------
+# Build step
+# ---------------------------------------------------------------------------
+
+def precompress(root: str) -> int:
+    """Write .gz (and .br, with the `brotli` package) next to compressible files."""
+    written = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if _is_sibling(dirpath, filename):
+                continue
+            path = os.path.join(dirpath, filename)
+            if not _compressible(_content_type(path)) or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            out = {".gz": gzip.compress(data, 9, mtime=0)}
+            if BROTLI_AVAILABLE:
+                out[".br"] = brotli.compress(data, quality=11)
+            for suffix, body in out.items():
+                if len(body) < len(data):
+                    with open(path + suffix, "wb") as f:
+                        f.write(body)
+                    written += 1
+    return written
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    target = sys.argv[1] if len(sys.argv) > 1 else "static"
+    log.info("Wrote %d precompressed files under %s", precompress(target), target)
@@ -0,0 +1,120 @@
+"""Station-level index: which alerts and lines touch each station.
+
+Pure data module — no network, no DB, no Flask. Ingest builds the index once
+per cycle from `fetch_alerts` station output and the trip-update stop times;
+the API loads the stored document and answers lookups from dicts.
+"""
+
+import csv
+import logging
+import os
+from bisect import bisect_left
+
+from model import Alert
+from routes import ALL_LINES, parent_stop
+
+log = logging.getLogger(__name__)
+
+# Optional GTFS static stops.txt (from the MTA developer site) for station
+# names. Without it the index still works, keyed and searchable by stop id.
+GTFS_STOPS_FILE = os.environ.get("GTFS_STOPS_FILE")
+
+_names: dict[str, str] | None = None
+
+
+def stop_names() -> dict[str, str]:
+    """Parent stop id -> station name, loaded once from GTFS_STOPS_FILE."""
+    global _names
+    if _names is not None:
+        return _names
+    _names = {}
+    if not GTFS_STOPS_FILE:
+        return _names
+    try:
+        with open(GTFS_STOPS_FILE, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                sid = row.get("parent_station") or row["stop_id"]
+                _names.setdefault(parent_stop(sid), row.get("stop_name", ""))
+        log.info("Loaded %d station names from %s", len(_names), GTFS_STOPS_FILE)
+    except Exception as e:
+        log.warning("Failed to load GTFS stops file %s: %s", GTFS_STOPS_FILE, e)
+    return _names
+
+
+def build_index(station_alerts: dict[str, list[Alert]], stop_times) -> dict[str, dict]:
+    """Build {parent stop id: {name, lines, alerts}} for every known station.
+
+    `station_alerts` is the stop-keyed output of `fetch_alerts`; `stop_times`
+    is a `headways.StopTimes` batch, used to find which lines serve a stop.
+    """
+    import numpy as np
+
+    names = stop_names()
+    index: dict[str, dict] = {}
+
+    def entry(stop_id: str) -> dict:
+        e = index.get(stop_id)
+        if e is None:
+            e = index[stop_id] = {
+                "name": names.get(stop_id, ""),
+                "lines": [],
+                "alerts": [],
+            }
+        return e
+
+    if len(stop_times):
+        # Unique (stop, route) pairs in one pass instead of a per-row loop.
+        pairs = np.unique(
+            stop_times.stop.astype(np.int64) * len(ALL_LINES) + stop_times.route
+        )
+        stop_idx, route_idx = np.divmod(pairs, len(ALL_LINES))
+        for s, r in zip(stop_idx.tolist(), route_idx.tolist()):
+            entry(stop_times.stops[s])["lines"].append(ALL_LINES[r])
+
+    for stop_id, alerts in station_alerts.items():
+        e = entry(stop_id)
+        e["alerts"] = alerts
+        for a in alerts:
+            for line in a.lines:
+                if line not in e["lines"]:
+                    e["lines"].append(line)
+
+    # Subway lines in ALL_LINES order, then other agencies' line keys
+    order = {line: i for i, line in enumerate(ALL_LINES)}
+    for e in index.values():
+        e["lines"].sort(key=lambda l: (order.get(l, len(order)), l))
+    return index
+
+
+class StationLookup:
+    """Read-side view of a stored index: O(1) by id, O(log n) prefix search."""
+
+    def __init__(self, index: dict[str, dict]):
+        self.index = index
+        self._ids = sorted(index)
+        self._names = sorted(
+            (word, sid)
+            for sid, e in index.items()
+            for word in {e["name"].lower()} | set(e["name"].lower().split())
+            if word
+        )
+
+    def get(self, stop_id: str) -> dict | None:
+        sid = parent_stop(stop_id)
+        e = self.index.get(sid)
+        return None if e is None else {"stop_id": sid, **e}
+
+    def search(self, q: str, limit: int = 20) -> list[dict]:
+        """Match stop ids by prefix, then names by whole-name or word prefix."""
+        q = q.strip()
+        found: dict[str, None] = {}
+        i = bisect_left(self._ids, q.upper())
+        while i < len(self._ids) and self._ids[i].startswith(q.upper()) and len(found) < limit:
+            found[self._ids[i]] = None
+            i += 1
+        q = q.lower()
+        i = bisect_left(self._names, (q, ""))
+        while i < len(self._names) and self._names[i][0].startswith(q) and len(found) < limit:
+            found[self._names[i][1]] = None
+            i += 1
+        return [self.get(sid) for sid in found]
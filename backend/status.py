@@ -0,0 +1,138 @@
+"""The /api/status document, built from Postgres.
+
+Shared by the API (on a cache miss) and the ingest worker (which publishes
+each cycle's document to a shared snapshot, see snapshot.py). No Flask, no
+MTA calls.
+"""
+
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import db
+from routes import ALL_LINES
+
+ET = ZoneInfo("America/New_York")
+
+
+def _empty_line_daily():
+    return {
+        "daily_score": 0,
+        "breakdown": {},
+        "by_direction": {
+            "uptown": {"score": 0, "breakdown": {}},
+            "downtown": {"score": 0, "breakdown": {}},
+        },
+        "peak_alerts": [],
+    }
+
+
+def build_status_document(generation: int | None = None) -> dict:
+    """Build the full API response by reading from Postgres.
+
+    Pass `generation` when the caller just recorded it (ingest) to skip the read.
+    """
+    et_now = datetime.now(ET)
+    today = et_now.strftime("%Y-%m-%d")
+
+    # Read the generation first so the document is never labelled newer than its data
+    if generation is None:
+        generation = db.read_generation()
+
+    # Read latest live snapshot
+    live_rows = db.read_live_snapshot()
+    live_by_line = {row["line_id"]: row for row in live_rows}
+
+    # Read daily accumulated scores
+    daily_data = db.read_daily_scores(today)
+
+    # Read timeseries
+    timeseries = db.read_timeseries(today)
+
+    lines = []
+    for line_id in ALL_LINES:
+        live = live_by_line.get(line_id, {})
+        dd = daily_data.get(line_id, {})
+
+        lines.append({
+            "id": line_id,
+            "score": live.get("score", 0),
+            "daily_score": dd.get("daily_score", 0),
+            "status": live.get("status", "Good Service"),
+            "alerts": live.get("alerts", []),
+            "peak_alerts": dd.get("peak_alerts", []),
+            "breakdown": dd.get("breakdown", {}),
+            "live_breakdown": live.get("breakdown", {}),
+            "by_direction": dd.get("by_direction", {
+                "uptown": {"score": 0, "breakdown": {}},
+                "downtown": {"score": 0, "breakdown": {}},
+            }),
+            "live_by_direction": live.get("by_direction", {
+                "uptown": {"score": 0, "breakdown": {}},
+                "downtown": {"score": 0, "breakdown": {}},
+            }),
+            "trip_count": live.get("trip_count", 0),
+            "metrics": live.get("metrics", {}),
+        })
+
+    lines.sort(key=lambda l: (-l["daily_score"], -l["score"], l["id"]))
+
+    result = {
+        "generation": generation,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "date": et_now.strftime("%A, %B %-d"),
+        "winner": winner(lines),
+        "podium": podium(lines),
+        "lines": lines,
+        "timeseries": timeseries,
+    }
+    return result
+
+
+def podium(ranked: list[dict]) -> list[dict]:
+    """Lines in the top three places by daily score; tied lines share a place."""
+    result = []
+    place = 0
+    prev_score = None
+    for l in ranked:
+        if l["daily_score"] <= 0:
+            break
+        if l["daily_score"] != prev_score:
+            place = len(result) + 1
+            prev_score = l["daily_score"]
+        if place > 3:
+            break
+        result.append(l)
+    return result
+
+
+def winner(ranked: list[dict]) -> dict | None:
+    return ranked[0] if ranked and ranked[0]["daily_score"] > 0 else None
+
+
+def build_day_summary(day: str, daily_data: dict[str, dict], timeseries: list[dict]) -> dict:
+    """The sealed archive of a finished ET day, served by /api/day/<date>.
+
+    Final daily totals only: no live fields, since the day is over.
+    """
+    lines = []
+    for line_id in ALL_LINES:
+        dd = daily_data.get(line_id) or _empty_line_daily()
+        lines.append({
+            "id": line_id,
+            "daily_score": dd["daily_score"],
+            "breakdown": dd["breakdown"],
+            "by_direction": dd["by_direction"],
+            "peak_alerts": dd["peak_alerts"],
+        })
+    lines.sort(key=lambda l: (-l["daily_score"], l["id"]))
+    for rank, line in enumerate(lines, start=1):
+        line["rank"] = rank
+
+    return {
+        "date": day,
+        "label": datetime.strptime(day, "%Y-%m-%d").strftime("%A, %B %-d, %Y"),
+        "winner": winner(lines),
+        "podium": podium(lines),
+        "lines": lines,
+        "timeseries": timeseries,
+    }
@@ -0,0 +1,152 @@
+"""Run the ingest worker as a supervised child process.
+
+Used by gunicorn.conf.py when RUN_INGEST=process: the gunicorn master starts
+`python ingest.py` next to its web workers, restarts it if it dies, and
+SIGTERMs it on shutdown. Ingest then never shares a GIL with request
+threads; results reach the web workers through Postgres as before.
+
+The master doesn't fork ingest directly. Its SIGCHLD handler reaps every
+child with waitpid(-1), which would swallow ingest's exit status (and treat
+exit codes 3 and 4 as a worker boot failure that halts the server). Instead
+it forks a small waiter, `python supervisor.py <fd> <argv...>`, which runs
+ingest, writes its exit status to the pipe `fd` and always exits 0.
+
+No Flask dependency — stdlib only.
+"""
+
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+INGEST_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest.py")
+
+RESTART_BACKOFF = (1, 2, 5, 10, 30)  # seconds; resets after a healthy run
+HEALTHY_RUN_SECONDS = 300
+STOP_TIMEOUT = 30  # a cycle in flight gets this long to finish after SIGTERM
+PARENT_CHECK_SECONDS = 1  # how often the waiter checks the master is alive
+
+
+def describe_exit(code: int | None) -> str:
+    """Human-readable exit status as the waiter reports it."""
+    if code is None:
+        return "no status (waiter killed)"
+    if code < 0:
+        try:
+            return signal.Signals(-code).name
+        except ValueError:
+            return f"signal {-code}"
+    return f"code {code}"
+
+
+class IngestSupervisor:
+    """Keep one `ingest.py` child alive until stop() is called."""
+
+    def __init__(self, argv: list[str] | None = None):
+        self.argv = argv or [sys.executable, INGEST_SCRIPT]
+        self._proc: subprocess.Popen | None = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="ingest-supervisor"
+        )
+        self._thread.start()
+
+    def _spawn(self) -> tuple[subprocess.Popen, int]:
+        """Start a waiter running self.argv; returns it and its status pipe."""
+        env = {**os.environ}
+        env.pop("RUN_INGEST", None)
+        read_fd, write_fd = os.pipe()
+        try:
+            proc = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), str(write_fd), *self.argv],
+                env=env, pass_fds=(write_fd,),
+                start_new_session=True,  # stop() can kill waiter and ingest together
+            )
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        return proc, read_fd
+
+    def _run(self):
+        failures = 0
+        while not self._stopping.is_set():
+            with self._lock:
+                if self._stopping.is_set():
+                    break
+                self._proc, status_fd = self._spawn()
+            log.info("Ingest process started (waiter pid %d)", self._proc.pid)
+            started = time.monotonic()
+            with os.fdopen(status_fd, "rb") as status:
+                report = status.read()  # EOF once the waiter exits
+            self._proc.wait()  # if the master's SIGCHLD handler hasn't already
+            code = int(report) if report else None
+            if self._stopping.is_set():
+                break
+            failures = 0 if time.monotonic() - started > HEALTHY_RUN_SECONDS else failures + 1
+            delay = RESTART_BACKOFF[min(failures, len(RESTART_BACKOFF) - 1)]
+            log.warning(
+                "Ingest process exited with %s; restarting in %ds", describe_exit(code), delay
+            )
+            self._stopping.wait(delay)
+
+    def stop(self):
+        """SIGTERM the child, wait for its current cycle, then SIGKILL."""
+        self._stopping.set()
+        with self._lock:
+            proc = self._proc
+        if proc is None or proc.poll() is not None:
+            return
+        proc.send_signal(signal.SIGTERM)  # the waiter passes it on to ingest
+        try:
+            proc.wait(timeout=STOP_TIMEOUT)
+            log.info("Ingest process stopped")
+        except subprocess.TimeoutExpired:
+            log.warning("Ingest process ignored SIGTERM for %ds; killing", STOP_TIMEOUT)
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            proc.wait()
+
+
+# ---------------------------------------------------------------------------
+# Waiter
+# ---------------------------------------------------------------------------
+
+def wait_child(status_fd: int, argv: list[str]) -> int:
+    """Run argv to completion, write its returncode to status_fd, return 0.
+
+    SIGTERM is passed on to the child. If the master goes away the child is
+    terminated, and it stops by itself if this waiter is killed, since ingest
+    exits when INGEST_PARENT_PID is no longer its parent.
+    """
+    master = os.getppid()
+    child = subprocess.Popen(argv, env={**os.environ, "INGEST_PARENT_PID": str(os.getpid())})
+    signal.signal(signal.SIGTERM, lambda sig, frame: child.send_signal(sig))
+    orphaned = False
+    while True:
+        try:
+            code = child.wait(timeout=PARENT_CHECK_SECONDS)
+            break
+        except subprocess.TimeoutExpired:
+            if not orphaned and os.getppid() != master:
+                orphaned = True
+                child.terminate()
+    os.write(status_fd, str(code).encode())
+    os.close(status_fd)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(wait_child(int(sys.argv[1]), sys.argv[2:]))
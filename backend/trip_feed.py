@@ -0,0 +1,146 @@
+"""Lean decoding of GTFS-realtime trip feeds.
+
+No network, no DB. Ingest reads a handful of fields from each trip feed:
+trip and route ids, and for headway feeds each stop_time_update's stop id and
+arrival/departure time. Parsing into the full `gtfs_realtime_pb2.FeedMessage`
+also materialises vehicle positions, NYCT extensions, delays, schedule
+relationships and so on. The trimmed message definitions below declare only
+the fields ingest reads. Everything else stays as unparsed bytes inside the
+message.
+
+What that buys depends on the message. STOPS_MESSAGE, which every default
+feed uses, decodes in about the same time as the full parse, since
+stop_time_updates dominate both. It holds about a fifth less memory per
+decoded feed. COUNT_MESSAGE skips stop times too, so it is several times
+faster and smaller, but it only applies to feeds registered without
+stop_times. See benchmarks/bench_trip_feed.py.
+
+Field numbers and names match gtfs-realtime.proto, so a trimmed message is
+read with the same attribute access as the full one (`entity.trip_update.trip
+.route_id`, `stu.arrival.time`, ...):
+
+    COUNT_MESSAGE   entity { id, trip_update { trip { trip_id, route_id } } }
+    STOPS_MESSAGE   ... plus trip_update.stop_time_update
+                        { arrival.time, departure.time, stop_id }
+"""
+
+from typing import Callable, NamedTuple
+
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+_F = descriptor_pb2.FieldDescriptorProto
+
+
+def _message_class(package: str, stop_times: bool) -> type:
+    """Build one trimmed FeedMessage class; `package` keeps the pools apart."""
+    fdp = descriptor_pb2.FileDescriptorProto(
+        name=f"{package}.proto", package=package, syntax="proto2",
+    )
+
+    def message(name: str, *fields: tuple):
+        m = fdp.message_type.add(name=name)
+        for field_name, number, kind, type_name, repeated in fields:
+            f = m.field.add(
+                name=field_name, number=number, type=kind,
+                label=_F.LABEL_REPEATED if repeated else _F.LABEL_OPTIONAL,
+            )
+            if type_name:
+                f.type_name = f".{package}.{type_name}"
+
+    message("TripDescriptor",
+            ("trip_id", 1, _F.TYPE_STRING, None, False),
+            ("route_id", 5, _F.TYPE_STRING, None, False))
+    trip_update = [("trip", 1, _F.TYPE_MESSAGE, "TripDescriptor", False)]
+    if stop_times:
+        message("StopTimeEvent", ("time", 2, _F.TYPE_INT64, None, False))
+        message("StopTimeUpdate",
+                ("arrival", 2, _F.TYPE_MESSAGE, "StopTimeEvent", False),
+                ("departure", 3, _F.TYPE_MESSAGE, "StopTimeEvent", False),
+                ("stop_id", 4, _F.TYPE_STRING, None, False))
+        trip_update.append(("stop_time_update", 2, _F.TYPE_MESSAGE, "StopTimeUpdate", True))
+    message("TripUpdate", *trip_update)
+    message("FeedEntity",
+            ("id", 1, _F.TYPE_STRING, None, False),
+            ("trip_update", 3, _F.TYPE_MESSAGE, "TripUpdate", False))
+    message("FeedMessage", ("entity", 2, _F.TYPE_MESSAGE, "FeedEntity", True))
+
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(fdp)
+    return message_factory.GetMessageClass(pool.FindMessageTypeByName(f"{package}.FeedMessage"))
+
+
+COUNT_MESSAGE = _message_class("trip_feed_counts", stop_times=False)
+STOPS_MESSAGE = _message_class("trip_feed_stops", stop_times=True)
+
+
+def parse(data: bytes, stop_times: bool = False):
+    """Decode a trip feed into the trimmed message for what the caller reads."""
+    message = (STOPS_MESSAGE if stop_times else COUNT_MESSAGE)()
+    message.ParseFromString(data)
+    return message
+
+
+# ---------------------------------------------------------------------------
+# Trip counting
+# ---------------------------------------------------------------------------
+
+class TripCount(NamedTuple):
+    """Distinct trips on a line; north / south only for NYCT-style trip ids."""
+
+    trips: int = 0
+    north: int = 0
+    south: int = 0
+
+    def __add__(self, other: "TripCount") -> "TripCount":
+        return TripCount(self.trips + other.trips, self.north + other.north,
+                         self.south + other.south)
+
+
+def trip_direction(trip_id: str) -> str | None:
+    """Return "N" or "S" for an NYCT trip id ("063850_1..N03R", "116250_GS.S01R").
+
+    The direction is the first character after the last dot; ids without a
+    dot aren't NYCT-style and have no direction.
+    """
+    i = trip_id.rfind(".")
+    if i < 0:
+        return None
+    d = trip_id[i + 1:i + 2]
+    return d if d in ("N", "S") else None
+
+
+def trips_by_line(message, line_key: Callable[[str], str | None]) -> dict[str, set[str]]:
+    """Distinct trip ids per line key; entities without a trip id use their own id."""
+    trips: dict[str, set[str]] = {}
+    keys: dict[str, str | None] = {}  # route_id -> line key, once per route
+    for entity in message.entity:
+        if not entity.HasField("trip_update"):
+            continue
+        trip = entity.trip_update.trip
+        route_id = trip.route_id
+        key = keys.get(route_id, False)
+        if key is False:
+            key = keys[route_id] = line_key(route_id)
+        if not key:
+            continue
+        ids = trips.get(key)
+        if ids is None:
+            ids = trips[key] = set()
+        ids.add(trip.trip_id or entity.id)
+    return trips
+
+
+def tally(trips: dict[str, set[str]], directions: bool) -> dict[str, TripCount]:
+    """TripCount per line; `directions` splits by trip id suffix (NYCT only)."""
+    out = {}
+    for key, ids in trips.items():
+        north = south = 0
+        if directions:
+            for trip_id in ids:
+                d = trip_direction(trip_id)
+                if d == "N":
+                    north += 1
+                elif d == "S":
+                    south += 1
+        out[key] = TripCount(len(ids), north, south)
+    return out
@@ -0,0 +1,138 @@
+"""Local write-ahead buffer for ingest cycles the database didn't take.
+
+No DB, no Flask — stdlib plus encoding.py. When db.apply_cycles fails, ingest
+appends the cycle here. Once the database is back, the backlog is read in
+order and handed to db.apply_cycles, which skips any cycle id it has already
+applied. The buffer is cleared only after the whole backlog has been applied.
+
+Segments are append-only files in INGEST_WAL_DIR named by sequence number.
+Each record is framed as:
+
+    u32 payload length | u32 crc32(payload) | payload (JSON)
+
+A torn or corrupt record (e.g. a crash mid-append) ends its segment: the
+reader keeps everything before it and logs what it dropped. Before the
+first append after a restart, a torn tail is truncated away, so records
+buffered after a crash land behind the last intact one and stay readable.
+
+A record the caller can't replay (e.g. written by an older Cycle shape) is
+moved to quarantine/ under the WAL directory, one file per record, and kept
+there for inspection; it is never replayed.
+"""
+
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import zlib
+
+import encoding
+
+log = logging.getLogger(__name__)
+
+WAL_DIR = os.environ.get(
+    "INGEST_WAL_DIR", os.path.join(tempfile.gettempdir(), "subway-shame-wal")
+)
+
+# Start a new segment past this size so a long outage isn't one huge file
+SEGMENT_BYTES = 8 * 1024 * 1024
+
+_FRAME = struct.Struct("<II")
+_SUFFIX = ".seg"
+
+
+def _scan(data: bytes) -> tuple[list[bytes], int]:
+    """Intact payloads in a segment, and the offset just past the last one."""
+    payloads = []
+    pos = 0
+    while pos + _FRAME.size <= len(data):
+        length, crc = _FRAME.unpack_from(data, pos)
+        payload = data[pos + _FRAME.size:pos + _FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        payloads.append(payload)
+        pos += _FRAME.size + length
+    return payloads, pos
+
+
+class WriteAheadLog:
+    def __init__(self, directory: str = WAL_DIR):
+        self.directory = directory
+        # (segment, size) this process last left intact; its tail needs no re-check
+        self._intact: tuple[str, int] | None = None
+
+    def _segments(self) -> list[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            os.path.join(self.directory, n) for n in names if n.endswith(_SUFFIX)
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self._segments())
+
+    def append(self, record: dict):
+        """Durably append one record (fsynced before returning)."""
+        os.makedirs(self.directory, exist_ok=True)
+        payload = encoding.dumps(record, sort_keys=False)
+        segments = self._segments()
+        path = segments[-1] if segments else None
+        if path is None or os.path.getsize(path) >= SEGMENT_BYTES:
+            seq = int(os.path.basename(path)[:-len(_SUFFIX)]) + 1 if path else 1
+            path = os.path.join(self.directory, f"{seq:012d}{_SUFFIX}")
+        else:
+            self._repair_tail(path)
+        with open(path, "ab") as f:
+            f.write(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+            f.flush()
+            os.fsync(f.fileno())
+            self._intact = (path, f.tell())
+
+    def _repair_tail(self, path: str):
+        """Truncate a torn record off the end of the segment about to be appended to."""
+        size = os.path.getsize(path)
+        if self._intact == (path, size):
+            return
+        with open(path, "rb") as f:
+            _, end = _scan(f.read())
+        if end < size:
+            log.warning("WAL segment %s: truncating %d bytes of torn record", path, size - end)
+            os.truncate(path, end)
+        self._intact = (path, end)
+
+    def records(self) -> list[dict]:
+        """Every intact record, oldest first."""
+        out = []
+        for path in self._segments():
+            with open(path, "rb") as f:
+                data = f.read()
+            payloads, end = _scan(data)
+            out.extend(encoding.loads(p) for p in payloads)
+            if end < len(data):
+                log.warning(
+                    "WAL segment %s: dropped %d bytes after a torn or corrupt record",
+                    path, len(data) - end,
+                )
+        return out
+
+    def quarantine(self, record: dict) -> str:
+        """Set a record aside so it is never replayed; return where it went.
+
+        Named by content, so setting the same record aside twice is harmless.
+        """
+        directory = os.path.join(self.directory, "quarantine")
+        os.makedirs(directory, exist_ok=True)
+        payload = encoding.dumps(record, sort_keys=True)
+        path = os.path.join(directory, f"{hashlib.sha256(payload).hexdigest()[:16]}.json")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(payload)
+        return path
+
+    def clear(self):
+        for path in self._segments():
+            os.unlink(path)
+        self._intact = None
@@ -11,4 +11,8 @@ echo "==> Building frontend..."
 npx vite build
 cd ..
 
+echo "==> Precompressing frontend assets..."
+# .gz (and .br, if the brotli package is installed) siblings for serve_frontend
+python backend/static_files.py frontend/dist
+
 echo "==> Build complete!"
@@ -90,6 +90,7 @@ export const CATEGORY_CONFIG = {
   "No Service":     { color: "#E8353A", label: "No trains",       sublabel: "Not running" },
   "Delays":         { color: "#F97316", label: "Delays",          sublabel: "Running late" },
   "Slow Speeds":    { color: "#F97316", label: "Crawling",        sublabel: "Speed restrictions" },
+  "Measured Delay": { color: "#F97316", label: "Long waits",      sublabel: "Gaps between trains" },
   "Skip Stop":      { color: "#EAB308", label: "Skipping stops",  sublabel: "Bypassing stations" },
   "Rerouted":       { color: "#EAB308", label: "Rerouted",        sublabel: "Running alternate route" },
   "Runs Local":     { color: "#EAB308", label: "Running local",   sublabel: "Express running local" },
@@ -100,7 +101,7 @@ export const CATEGORY_CONFIG = {
 
 // Sort order for breakdown display (worst first)
 export const CATEGORY_ORDER = [
-  "No Service", "Delays", "Slow Speeds", "Skip Stop",
+  "No Service", "Delays", "Slow Speeds", "Measured Delay", "Skip Stop",
   "Rerouted", "Runs Local", "Reduced Freq", "Platform Change", "Other",
 ];
 
@@ -123,6 +124,10 @@ export const EDITORIAL_LINES = {
     "Speed restrictions in effect.",
     "Moving, but barely.",
   ],
+  "Measured Delay": [
+    "Trains are late. We timed them.",
+    "Big gaps between trains.",
+  ],
   "Skip Stop": [
     "Skipping your stop, probably.",
     "Bypassing stations. Good luck.",
@@ -17,6 +17,7 @@ export type AlertCategory =
   | "No Service"
   | "Delays"
   | "Slow Speeds"
+  | "Measured Delay"
   | "Skip Stop"
   | "Rerouted"
   | "Runs Local"
@@ -76,6 +77,36 @@ export interface ByDirection {
   downtown: DirectionData;
 }
 
+/** Observed headways for one direction, from trip-update stop times. */
+export interface DirectionHeadways {
+  /** Number of consecutive-arrival pairs measured. */
+  headways: number;
+  /** Median seconds between trains. */
+  median_headway: number;
+  /** Longest gap between trains, in seconds. */
+  max_headway: number;
+  /** Mean seconds of wait beyond the scheduled headway. */
+  excess_wait: number;
+  /** Headways at least twice the scheduled headway. */
+  gaps: number;
+  /** Headways under a quarter of the scheduled headway. */
+  bunched: number;
+  /** Measured-delay points for this direction. */
+  score: number;
+}
+
+/** Live headway metrics; `score` is folded into the line's "Measured Delay". */
+export interface HeadwayMetrics {
+  scheduled_headway: number;
+  headways: number;
+  mean_headway: number;
+  max_headway: number;
+  gaps: number;
+  bunched: number;
+  score: number;
+  by_direction: { uptown: DirectionHeadways; downtown: DirectionHeadways };
+}
+
 // ---------------------------------------------------------------------------
 // Core entities
 // ---------------------------------------------------------------------------
@@ -107,6 +138,8 @@ export interface LineData {
   live_by_direction: ByDirection;
   /** Active trip count from GTFS-RT trip_update feeds. */
   trip_count: number;
+  /** Live headway metrics (empty object until the first ingest cycle). */
+  metrics: HeadwayMetrics | Record<string, never>;
 }
 
 /** A single 15-minute time-series bucket. */
@@ -129,6 +162,8 @@ export interface TimeSeriesPoint {
  * const data: ApiResponse = await res.json();
  */
 export interface ApiResponse {
+  /** Ingest generation this document reflects; pass as ?since= to get a patch. */
+  generation: number;
   /** UTC ISO 8601 timestamp of when the response was generated. */
   timestamp: string;
   /** Human-readable ET date string, e.g. "Monday, January 6". */